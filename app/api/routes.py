@@ -1,15 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Query, Request
 from fastapi.responses import FileResponse, JSONResponse
 import os
+import json
+import time
 import uuid
 import asyncio
-from typing import Optional
+from typing import List, Optional
 import logging
+import numpy as np
 
-from ..models.schemas import VideoAnalysisRequest, AnalysisProgress, ErrorResponse
+from ..models.schemas import VideoAnalysisRequest, AnalysisProgress, ErrorResponse, RescoreRequest, PromptScoreRequest
 from ..services.video_processor import VideoProcessor
-from ..services.image_analyzer import ImageAnalyzer
+from ..services.image_analyzer import ImageAnalyzer, FRAME_ANALYZERS
+from ..services.analysis_pipeline import AnalysisPipeline
+from ..services.frame_ring_buffer import MultiProcessFrameAnalyzer
+from ..services.frame_sources import OpenCVFrameSource, get_tier_frame_source
+from ..services.sampling_planner import SamplingPlanner, cost_model
+from ..services.progressive_sampler import ProgressiveSampler
+from ..services.early_stopping import QualityVerdictEstimator
+from ..services.checkpoint_store import AnalysisCheckpoint, list_checkpoints
+from ..services.scoring import ScoringEngine, summarize_frames
+from ..services.online_stats import SummaryAggregator
+from ..services.frame_results import frame_result_container
+from ..services.feature_store import get_feature_store
+from ..services.video_similarity import get_similarity_index
+from ..services.results_index import get_results_index
+from ..services.result_storage import ColumnarResultStore, TABLE_TIME_COLUMNS, load_result_file
+from ..services.inference_backends import get_inference_backend
 from ..utils.report_generator import ReportGenerator
+from ..utils.http_cache import cached_json_response, file_etag
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +38,12 @@ router = APIRouter()
 # 全局变量存储分析任务状态
 analysis_tasks = {}
 
+# 请求停止渐进细化的任务
+refinement_stop_requests = set()
+
+# 特征库查询只需要CLIP文本编码，推理后端按需加载一次
+_text_backend = None
+
 @router.post("/upload-video")
 async def upload_video(file: UploadFile = File(...)):
     """上传视频文件"""
@@ -98,22 +124,290 @@ async def get_analysis_progress(task_id: str):
     
     return analysis_tasks[task_id]
 
+def split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+
 @router.get("/analysis-result/{task_id}")
-async def get_analysis_result(task_id: str):
-    """获取分析结果"""
+async def get_analysis_result(task_id: str, request: Request, start: Optional[float] = None,
+                              end: Optional[float] = None, fields: Optional[str] = None,
+                              limit: Optional[int] = None, offset: int = 0):
+    """获取分析结果
+    
+    不带参数时返回结果文件（列式存储时为精简结果）。指定 start/end（秒）、fields（逗号分隔的帧字段，
+    可用嵌套前缀如 metrics）、limit/offset 时，frame_analyses 只包含时间范围内该页的帧和所选字段
+    （frame_number、timestamp 始终包含），frame_page 给出总帧数。支持 ETag/If-None-Match 和 gzip/br 压缩。
+    """
     if task_id not in analysis_tasks:
         raise HTTPException(status_code=404, detail="任务不存在")
     
     task = analysis_tasks[task_id]
-    if task.status != "completed":
+    # 渐进分析在每轮细化后保存初步结果，完成前即可读取
+    if task.status != "completed" and task.refinement_level is None:
         raise HTTPException(status_code=400, detail="分析尚未完成")
     
     # 读取结果文件
     result_file = f"outputs/{task_id}_result.json"
     if not os.path.exists(result_file):
         raise HTTPException(status_code=404, detail="结果文件不存在")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="分页参数无效")
+    
+    projected = any(value is not None for value in (start, end, fields, limit)) or offset > 0
+    
+    def build():
+        if not projected:
+            with open(result_file, 'rb') as f:
+                return f.read()
+        with open(result_file, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        names = split_fields(fields)
+        if names is not None:
+            names = ['frame_number', 'timestamp', *names]
+        store = ColumnarResultStore(os.path.dirname(result_file))
+        frames, total = store.records(result, 'frames', names, start, end, offset, limit)
+        result.pop('columnar', None)
+        result['frame_analyses'] = frames
+        result['frame_page'] = {'total': total, 'offset': offset, 'limit': limit, 'count': len(frames)}
+        return result
+    
+    etag = file_etag(result_file, start, end, fields, limit, offset)
+    return cached_json_response(request, etag, build)
+
+@router.get("/analysis-result/{task_id}/{table}")
+async def get_analysis_result_table(task_id: str, table: str, request: Request, columns: Optional[str] = None,
+                                    start: Optional[float] = None, end: Optional[float] = None,
+                                    limit: Optional[int] = None, offset: int = 0):
+    """按列、时间范围和分页读取逐帧结果（table=frames）或转录分段（table=segments）
+    
+    columns 以逗号分隔，可用嵌套字段前缀（如 metrics）；start/end 为秒（帧按 timestamp，分段按 start）。
+    列式存储的结果只读取所需的列和行。支持 ETag/If-None-Match 和 gzip/br 压缩。
+    """
+    if table not in TABLE_TIME_COLUMNS:
+        raise HTTPException(status_code=404, detail="未知的结果表")
+    result_file = f"outputs/{task_id}_result.json"
+    if not os.path.exists(result_file):
+        raise HTTPException(status_code=404, detail="结果文件不存在")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="分页参数无效")
+    
+    def build():
+        with open(result_file, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        store = ColumnarResultStore(os.path.dirname(result_file))
+        values, count, total = store.read(result, table, split_fields(columns), start, end, offset, limit)
+        return {"task_id": task_id, "table": table, "count": count, "total": total, "offset": offset, "columns": values}
+    
+    etag = file_etag(result_file, table, columns, start, end, limit, offset)
+    return cached_json_response(request, etag, build)
+
+@router.post("/stop-refinement/{task_id}")
+async def stop_refinement(task_id: str):
+    """停止渐进分析的后续细化，当前轮结束后生成最终结果"""
+    if task_id not in analysis_tasks:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    refinement_stop_requests.add(task_id)
+    return {
+        "task_id": task_id,
+        "refinement_level": analysis_tasks[task_id].refinement_level,
+        "message": "将在当前细化轮结束后停止"
+    }
+
+@router.get("/checkpoints")
+async def get_checkpoints():
+    """列出有检查点、可以恢复的中断任务"""
+    return {"tasks": list_checkpoints()}
+
+@router.post("/resume-analysis/{task_id}")
+async def resume_analysis(task_id: str, background_tasks: BackgroundTasks):
+    """从检查点恢复中断的分析任务，已分析的帧和音频不再重复分析"""
+    if task_id in analysis_tasks and analysis_tasks[task_id].status in ("pending", "processing"):
+        raise HTTPException(status_code=400, detail="任务正在运行")
+    
+    header = AnalysisCheckpoint(task_id).read_header()
+    if header is None:
+        raise HTTPException(status_code=404, detail="没有可恢复的检查点")
+    
+    # 使用已下载的视频文件，不重新下载
+    request = VideoAnalysisRequest(**header['request'])
+    request.video_file = header['video_path']
+    request.video_url = None
+    
+    analysis_tasks[task_id] = AnalysisProgress(
+        task_id=task_id,
+        status="pending",
+        progress=0.0,
+        current_frame=0,
+        total_frames=0,
+        message="准备从检查点恢复..."
+    )
+    background_tasks.add_task(run_video_analysis, task_id, request)
+    
+    logger.info(f"恢复分析任务: {task_id}")
+    return {
+        "task_id": task_id,
+        "status": "resumed",
+        "message": "分析任务已从检查点恢复"
+    }
+
+def index_result(result: dict, result_file: str):
+    """已保存的结果写入结果索引（索引失败不影响结果文件）"""
+    if not Config.RESULTS_INDEX_ENABLED:
+        return
+    try:
+        get_results_index().ingest(result, source_mtime=os.path.getmtime(result_file))
+    except Exception as e:
+        logger.warning(f"结果入库失败 {result.get('video_id')}: {str(e)}")
+
+def load_result(task_id: str) -> dict:
+    result_file = f"outputs/{task_id}_result.json"
+    if not os.path.exists(result_file):
+        raise HTTPException(status_code=404, detail="结果文件不存在")
+    return load_result_file(result_file)
+
+@router.post("/rescore/{task_id}")
+async def rescore_result(task_id: str, request: RescoreRequest):
+    """用新的权重/阈值由已保存的原始指标重新评分，不重新分析"""
+    try:
+        engine = ScoringEngine(request.weights, request.thresholds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return FileResponse(result_file, media_type="application/json")
+    result = load_result(task_id)
+    engine.rescore_results([result])
+    if request.save:
+        ReportGenerator().save_json_result(result, f"outputs/{task_id}_result.json")
+        index_result(result, f"outputs/{task_id}_result.json")
+    return result
+
+@router.post("/rescore")
+async def rescore_all_results(request: RescoreRequest):
+    """批量重新评分全部已保存的结果，所有结果的帧拼接后一次向量化计算"""
+    try:
+        engine = ScoringEngine(request.weights, request.thresholds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    start = time.perf_counter()
+    results = []
+    output_dir = Config.OUTPUT_DIR
+    for filename in sorted(os.listdir(output_dir)) if os.path.isdir(output_dir) else []:
+        if not filename.endswith("_result.json"):
+            continue
+        try:
+            results.append(load_result_file(os.path.join(output_dir, filename)))
+        except Exception as e:
+            logger.warning(f"读取结果文件失败 {filename}: {str(e)}")
+    
+    previous = {result.get('video_id'): result.get('overall_quality_score') for result in results}
+    rescored = engine.rescore_results(results)
+    if request.save:
+        report_generator = ReportGenerator()
+        for result in rescored:
+            result_file = os.path.join(output_dir, f"{result['video_id']}_result.json")
+            report_generator.save_json_result(result, result_file)
+            index_result(result, result_file)
+    
+    elapsed = time.perf_counter() - start
+    logger.info(f"批量重新评分 {len(rescored)} 个结果, 耗时 {elapsed:.2f}秒")
+    return {
+        "count": len(rescored),
+        "elapsed_seconds": round(elapsed, 3),
+        "scoring": engine.profile(),
+        "results": [
+            {
+                "video_id": result['video_id'],
+                "previous_score": previous.get(result['video_id']),
+                "overall_quality_score": result['overall_quality_score']
+            }
+            for result in rescored
+        ]
+    }
+
+def query_results_index(table: str, filters: List[str], sort: Optional[str], limit: int, offset: int,
+                        task_id: Optional[str] = None) -> dict:
+    if not Config.RESULTS_INDEX_ENABLED:
+        raise HTTPException(status_code=404, detail="结果索引未启用")
+    
+    start = time.perf_counter()
+    try:
+        response = get_results_index().query(table, filters, sort, limit, offset, task_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response["query_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return response
+
+@router.get("/results")
+async def query_results(filter: List[str] = Query([]), sort: Optional[str] = "-completed_at",
+                        limit: int = 50, offset: int = 0):
+    """按 summary 指标过滤、排序、分页查询已完成的分析结果
+    
+    filter 可重复，如 ?filter=watermark_detection_rate>0.5&filter=completed_at>=2024-06-01&sort=avg_clarity
+    """
+    return query_results_index('videos', filter, sort, limit, offset)
+
+@router.get("/results/frames")
+async def query_result_frames(task_id: Optional[str] = None, filter: List[str] = Query([]),
+                              sort: Optional[str] = None, limit: int = 100, offset: int = 0):
+    """跨任务查询逐帧指标，如 ?filter=clarity<30&sort=clarity"""
+    return query_results_index('frames', filter, sort, limit, offset, task_id)
+
+@router.post("/features/prompt-scores")
+async def feature_prompt_scores(request: PromptScoreRequest):
+    """用新的文本提示对特征库中已保存的帧嵌入打分，只编码文本，不重新分析帧"""
+    global _text_backend
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="提示文本不能为空")
+    
+    store = get_feature_store()
+    task_ids = None
+    if request.task_id:
+        if request.task_id not in store.tasks:
+            raise HTTPException(status_code=404, detail="特征库中没有该任务")
+        task_ids = [request.task_id]
+    
+    try:
+        if _text_backend is None:
+            _text_backend = get_inference_backend()
+        text_embeds = _text_backend.encode_texts(request.prompts)
+        entries, similarity = store.similarity(text_embeds, task_ids)
+        
+        # 与 CLIPModel.logits_per_image 一致，并给出各提示间的softmax概率
+        logits = _text_backend.logit_scale * similarity.astype(np.float64)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities = exp / exp.sum(axis=1, keepdims=True)
+    except Exception as e:
+        logger.error(f"特征库打分失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"特征库打分失败: {str(e)}")
+    
+    return {
+        "prompts": request.prompts,
+        "frames": [
+            {
+                "task_id": task_id,
+                "frame_number": frame_number,
+                "timestamp": timestamp,
+                "logits": logits[i].round(4).tolist(),
+                "probabilities": probabilities[i].round(4).tolist()
+            }
+            for i, (task_id, frame_number, timestamp, _) in enumerate(entries)
+        ]
+    }
+
+@router.get("/similar-videos/{task_id}")
+async def get_similar_videos(task_id: str, top_k: int = 10):
+    """与指定任务最相似的已分析视频（CLIP签名相似度 + 感知哈希近重复确认）"""
+    start = time.perf_counter()
+    try:
+        similar = get_similarity_index().search(task_id, top_k)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="特征库中没有该任务")
+    
+    return {
+        "task_id": task_id,
+        "similar": similar,
+        "search_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
 
 @router.get("/download-report/{task_id}")
 async def download_report(task_id: str, format: str = "json"):
@@ -139,6 +433,13 @@ async def download_report(task_id: str, format: str = "json"):
     if not os.path.exists(report_file):
         raise HTTPException(status_code=404, detail="报告文件不存在")
     
+    if media_type == "application/json":
+        # 列式存储的结果下载时还原为完整JSON
+        return JSONResponse(
+            load_result_file(report_file),
+            headers={"Content-Disposition": f'attachment; filename="video_analysis_report_{task_id}.{format}"'}
+        )
+    
     return FileResponse(
         report_file,
         media_type=media_type,
@@ -161,8 +462,37 @@ async def get_video_formats(url: str):
         logger.error(f"获取视频格式失败: {str(e)}")
         raise HTTPException(status_code=400, detail=f"获取视频格式失败: {str(e)}")
 
+def build_analysis_result(task_id: str, video_path: str, video_info: dict, frame_analyses: list,
+                          audio_analysis: dict, analysis_time: float, aggregator: SummaryAggregator = None) -> dict:
+    """由帧分析和音频分析结果生成分析结果
+    
+    aggregator 为逐帧更新的汇总（与 frame_analyses 帧数一致时直接使用，不再遍历帧）
+    """
+    if aggregator is not None and aggregator.count == len(frame_analyses):
+        overall_score = aggregator.overall_score
+        summary = aggregator.summary(audio_analysis)
+    else:
+        overall_score = sum(frame['overall_score'] for frame in frame_analyses) / len(frame_analyses)
+        summary = summarize_frames(frame_analyses, audio_analysis)
+    
+    return {
+        "video_id": task_id,
+        "video_name": os.path.basename(video_path),
+        "video_path": video_path,
+        "duration": video_info['duration'],
+        "total_frames": video_info['total_frames'],
+        "analyzed_frames": len(frame_analyses),
+        "analysis_time": analysis_time,
+        "overall_quality_score": overall_score,
+        "frame_analyses": frame_analyses,
+        "audio_analysis": audio_analysis,
+        "summary": summary
+    }
+
 async def run_video_analysis(task_id: str, request: VideoAnalysisRequest):
     """在后台运行视频分析"""
+    analysis_start = time.perf_counter()
+    checkpoint = None
     try:
         # 更新任务状态
         analysis_tasks[task_id].status = "processing"
@@ -170,7 +500,9 @@ async def run_video_analysis(task_id: str, request: VideoAnalysisRequest):
         
         # 初始化服务
         video_processor = VideoProcessor()
-        image_analyzer = ImageAnalyzer()
+        # 多进程模式下模型只在各分析组进程中加载，主进程不持有分析器
+        use_multiprocess = Config.MULTIPROCESS_ANALYSIS and request.verdict_threshold is None and not request.progressive
+        image_analyzer = None if use_multiprocess else ImageAnalyzer()
         report_generator = ReportGenerator()
         
         # 获取视频路径
@@ -189,73 +521,281 @@ async def run_video_analysis(task_id: str, request: VideoAnalysisRequest):
         video_info = video_processor.get_video_info(video_path)
         analysis_tasks[task_id].total_frames = video_info['total_frames']
         
-        # 提取帧
-        analysis_tasks[task_id].message = "正在提取视频帧..."
-        frames = video_processor.extract_frames(video_path)
-        
-        # 分析每一帧
-        frame_analyses = []
-        for i, (frame_idx, timestamp, frame_path) in enumerate(frames):
-            # 更新进度
-            progress = (i + 1) / len(frames) * 100
-            analysis_tasks[task_id].progress = progress
-            analysis_tasks[task_id].current_frame = i + 1
-            analysis_tasks[task_id].message = f"正在分析第 {i+1}/{len(frames)} 帧..."
+        # 按分析档位选择帧来源（quick 档仅解码关键帧并在解码端缩小）
+        frame_source = get_tier_frame_source(request.analysis_type, request.frame_sampling)
+        
+        # 检查点：逐帧追加写，以同一 task_id 恢复时跳过已分析的帧（判定和渐进模式本身很快，不使用）
+        resumed_header = None
+        if Config.CHECKPOINT_ENABLED and request.verdict_threshold is None and not request.progressive:
+            checkpoint = AnalysisCheckpoint(task_id)
+            resumed_header = checkpoint.read_header()
+        
+        # 按帧数预算或完成时限规划采样间隔和分析项
+        sampling_plan = None
+        interval = None
+        analyzers = None
+        if resumed_header and resumed_header.get('sampling_plan'):
+            # 恢复时沿用原规划，保证采样位置与检查点一致
+            sampling_plan = resumed_header['sampling_plan']
+            interval = sampling_plan['interval']
+            analyzers = sampling_plan['analyzers']
+            if hasattr(frame_source, 'budget'):
+                frame_source.budget = sampling_plan['planned_frames']
+        elif request.frame_budget or request.deadline_seconds:
+            analysis_tasks[task_id].message = "正在规划采样..."
+            if cost_model.missing(FRAME_ANALYZERS):
+                if image_analyzer is None:
+                    # 多进程模式下主进程不加载模型，不现场标定，用默认估计（任务完成后按实测耗时更新）
+                    cost_model.apply_defaults(FRAME_ANALYZERS)
+                else:
+                    cost_model.calibrate(image_analyzer, video_path, Config.PLANNER_CALIBRATION_FRAMES)
+            remaining = None
+            if request.deadline_seconds:
+                remaining = max(0.0, request.deadline_seconds - (time.perf_counter() - analysis_start))
+            sampling_plan = SamplingPlanner().plan(video_info['duration'], request.frame_budget, remaining)
+            interval = sampling_plan['interval']
+            analyzers = sampling_plan['analyzers']
+            if hasattr(frame_source, 'budget'):
+                frame_source.budget = sampling_plan['planned_frames']
+        
+        restored = 0
+        if checkpoint is not None:
+            restored = len(checkpoint.open({
+                'task_id': task_id,
+                'request': request.dict(),
+                'video_path': video_path,
+                'fps': video_info['fps'],
+                'sampling_plan': sampling_plan,
+                'fingerprint': AnalysisCheckpoint.fingerprint(
+                    video_path, interval=interval, analyzers=analyzers,
+                    analysis_type=request.analysis_type, frame_source=frame_source.name
+                )
+            })[0])
+        
+        # 汇总统计逐帧在线更新，进度中附带实时汇总（从检查点恢复的帧先计入）
+        aggregator = SummaryAggregator()
+        if restored:
+            aggregator.extend(checkpoint.restored.values())
+        
+        # 帧的CLIP嵌入和检测框写入特征库（从帧结果中移除），帧结果写入检查点
+        feature_store = get_feature_store() if Config.FEATURE_STORE_ENABLED else None
+        
+        def save_frame(frame_analysis):
+            features = frame_analysis.pop('features', None)
+            if features is not None and feature_store is not None:
+                feature_store.append(task_id, frame_analysis['frame_number'], frame_analysis['timestamp'], features)
+            if checkpoint is not None:
+                checkpoint.append_frame(frame_analysis)
+            if not request.progressive:
+                aggregator.add(frame_analysis)
+                analysis_tasks[task_id].live_summary = aggregator.summary()
+        
+        frames_start = time.perf_counter()
+        pipeline_metrics = None
+        quality_verdict = None
+        if request.verdict_threshold is not None:
+            # 判定模式：分层随机采样，置信区间越过阈值即停止
+            frames = []
+            positions = video_processor.get_sample_positions(video_path, interval)
+            estimator = QualityVerdictEstimator(image_analyzer, request.verdict_threshold, request.verdict_confidence,
+                                                analyzers=analyzers)
+            
+            def on_frame(frame_analysis, count):
+                save_frame(frame_analysis)
+                analysis_tasks[task_id].current_frame = count
+                analysis_tasks[task_id].progress = count / max(len(positions), 1) * 100
+                analysis_tasks[task_id].message = f"质量判定中，已分析 {count} 帧..."
+            
+            analysis_tasks[task_id].message = "正在进行质量判定..."
+            quality_verdict, frame_analyses = estimator.run(video_path, positions, on_frame)
+            analysis_tasks[task_id].quality_verdict = quality_verdict
+            if not frame_analyses:
+                # 没有可分析的帧：判定为 inconclusive，不生成分析结果
+                analysis_tasks[task_id].status = "completed"
+                analysis_tasks[task_id].progress = 100.0
+                analysis_tasks[task_id].message = "没有可分析的帧，质量判定不确定"
+                logger.warning(f"质量判定没有可分析的帧: {task_id}")
+                return
+        elif request.progressive:
+            # 渐进式：稀疏首轮尽快给出初步结果，之后逐轮细化指标突变或有问题的区间
+            frames = []
+            # 有采样规划时首轮按规划的间隔采样
+            sampler = ProgressiveSampler(image_analyzer, analyzers=analyzers, initial_interval=interval,
+                                         max_levels=request.refinement_levels)
+            
+            def on_pass(pass_frames, level):
+                nonlocal aggregator
+                # 之前各轮的帧已写入检查点，只保存本轮新增的帧
+                for frame_analysis in pass_frames:
+                    if frame_analysis['refinement_level'] == level:
+                        save_frame(frame_analysis)
+                # 每轮的帧集合包含之前各轮的帧，汇总按本轮全部帧重建
+                aggregator = SummaryAggregator()
+                aggregator.extend(pass_frames)
+                analysis_tasks[task_id].live_summary = aggregator.summary()
+                analysis_tasks[task_id].refinement_level = level
+                analysis_tasks[task_id].current_frame = len(pass_frames)
+                analysis_tasks[task_id].progress = min(99.0, (level + 1) / (sampler.max_levels + 1) * 100)
+                analysis_tasks[task_id].message = f"第 {level} 轮细化完成，已分析 {len(pass_frames)} 帧"
+                
+                # 每轮保存一次初步结果（尚无音频分析）
+                provisional = build_analysis_result(task_id, video_path, video_info, pass_frames, {},
+                                                    time.perf_counter() - analysis_start, aggregator)
+                provisional["provisional"] = True
+                provisional["refinement_level"] = level
+                os.makedirs("outputs", exist_ok=True)
+                report_generator.save_json_result(provisional, f"outputs/{task_id}_result.json")
+            
+            analysis_tasks[task_id].message = "正在进行首轮稀疏分析..."
+            frame_analyses = sampler.run(video_path, on_pass, lambda: task_id in refinement_stop_requests)
+        elif use_multiprocess:
+            # 多进程：解码帧写入共享内存环，各分析进程零拷贝读取
+            frames = []
+            total = frame_source.sample_count(video_path, interval)
+            # OpenCV 帧来源直接解码到槽位；其他帧来源（ffmpeg 档位、镜头自适应）的帧复制到槽位
+            frame_iter = None
+            if frame_source.name != OpenCVFrameSource.name:
+                frame_iter = video_processor.iter_frames(video_path, interval, source=frame_source)
+                if checkpoint is not None:
+                    frame_iter = checkpoint.pending(frame_iter)
+            groups = None
+            if analyzers is not None:
+                groups = [[name for name in group if name in analyzers] for group in Config.ANALYZER_PROCESS_GROUPS]
+                groups = [group for group in groups if group]
+            
+            def on_frame(frame_analysis, count):
+                save_frame(frame_analysis)
+                count += restored
+                analysis_tasks[task_id].progress = count / max(total, 1) * 100
+                analysis_tasks[task_id].current_frame = count
+                analysis_tasks[task_id].message = f"正在分析第 {count}/{total} 帧..."
             
-            # 分析帧
-            frame_analysis = image_analyzer.analyze_frame(frame_path)
-            frame_analysis['frame_number'] = frame_idx
-            frame_analysis['timestamp'] = timestamp
-            frame_analyses.append(frame_analysis)
+            analysis_tasks[task_id].message = "正在分析视频帧..."
+            frame_analyses = MultiProcessFrameAnalyzer(groups).run(
+                video_processor, video_path, interval=interval, on_frame=on_frame,
+                skip_positions=set(checkpoint.restored) if checkpoint is not None else None,
+                frame_results=frame_result_container(), frames=frame_iter
+            )
+        elif Config.PIPELINE_ENABLED:
+            # 流水线：解码、预处理、批量推理、聚合并行进行，帧不落盘
+            frames = []
+            total = frame_source.sample_count(video_path, interval)
+            pipeline = AnalysisPipeline(image_analyzer, analyzers=analyzers, frame_results=frame_result_container())
+            
+            def on_frame(frame_analysis, count):
+                save_frame(frame_analysis)
+                count += restored
+                analysis_tasks[task_id].progress = count / max(total, 1) * 100
+                analysis_tasks[task_id].current_frame = count
+                analysis_tasks[task_id].message = f"正在分析第 {count}/{total} 帧..."
+                analysis_tasks[task_id].pipeline_metrics = pipeline.get_metrics()
+            
+            pipeline.on_frame = on_frame
+            analysis_tasks[task_id].message = "正在分析视频帧..."
+            frame_iter = video_processor.iter_frames(video_path, interval, source=frame_source)
+            if checkpoint is not None:
+                frame_iter = checkpoint.pending(frame_iter)
+            frame_analyses = pipeline.run(frame_iter)
+            pipeline_metrics = pipeline.get_metrics()
+            analysis_tasks[task_id].pipeline_metrics = pipeline_metrics
+        else:
+            # 提取帧
+            analysis_tasks[task_id].message = "正在提取视频帧..."
+            frames = video_processor.extract_frames(video_path, interval, source=frame_source)
+            
+            # 分析每一帧
+            frame_analyses = frame_result_container()
+            for i, (frame_idx, timestamp, frame_path) in enumerate(frames):
+                # 更新进度
+                progress = (i + 1) / len(frames) * 100
+                analysis_tasks[task_id].progress = progress
+                analysis_tasks[task_id].current_frame = i + 1
+                analysis_tasks[task_id].message = f"正在分析第 {i+1}/{len(frames)} 帧..."
+                if checkpoint is not None and checkpoint.is_completed(checkpoint.position(timestamp)):
+                    continue
+                
+                # 分析帧
+                frame_analysis = image_analyzer.analyze_frame(frame_path, analyzers)
+                frame_analysis['frame_number'] = frame_idx
+                frame_analysis['timestamp'] = timestamp
+                frame_analyses.append(frame_analysis)
+                save_frame(frame_analysis)
         
-        # 音频分析
-        analysis_tasks[task_id].message = "正在分析音频..."
-        audio_analysis = video_processor.analyze_video_audio(video_path)
+        frames_seconds = time.perf_counter() - frames_start
+        cost_model.update_from_frames(frame_analyses)
+        if checkpoint is not None:
+            frame_analyses = checkpoint.merge(frame_analyses)
         
-        # 计算综合评分
-        overall_score = sum(frame['overall_score'] for frame in frame_analyses) / len(frame_analyses)
+        # 音频分析（判定模式只关心画面综合评分，跳过）
+        if quality_verdict is not None:
+            audio_analysis = {'success': False, 'error': '质量判定模式不分析音频'}
+        elif checkpoint is not None and checkpoint.audio is not None:
+            audio_analysis = checkpoint.audio
+        else:
+            analysis_tasks[task_id].message = "正在分析音频..."
+            audio_analysis = video_processor.analyze_video_audio(video_path)
+            if checkpoint is not None and audio_analysis.get('success'):
+                # 失败的音频分析不记录，恢复时重试
+                checkpoint.append_audio(audio_analysis)
         
         # 生成分析结果
-        result = {
-            "video_id": task_id,
-            "video_name": os.path.basename(video_path),
-            "video_path": video_path,
-            "duration": video_info['duration'],
-            "total_frames": video_info['total_frames'],
-            "analyzed_frames": len(frame_analyses),
-            "analysis_time": 0,  # TODO: 计算实际分析时间
-            "overall_quality_score": overall_score,
-            "frame_analyses": frame_analyses,
-            "audio_analysis": audio_analysis,
-            "summary": {
-                "avg_clarity": sum(f['clarity_score'] for f in frame_analyses) / len(frame_analyses),
-                "avg_lighting": sum(f['lighting_score'] for f in frame_analyses) / len(frame_analyses),
-                "face_detection_rate": sum(1 for f in frame_analyses if f['face_detected']) / len(frame_analyses),
-                "watermark_detection_rate": sum(1 for f in frame_analyses if f['watermark_detected']) / len(frame_analyses),
-                "avg_content_richness": sum(f['content_richness'] for f in frame_analyses) / len(frame_analyses),
-                "audio_quality_score": audio_analysis.get('audio_quality', {}).get('quality_score', 0) if audio_analysis.get('success') else 0,
-                "has_audio_transcription": audio_analysis.get('success', False) and bool(audio_analysis.get('transcription', {}).get('text', ''))
-            }
-        }
+        analysis_time = time.perf_counter() - analysis_start
+        result = build_analysis_result(task_id, video_path, video_info, frame_analyses, audio_analysis, analysis_time,
+                                       aggregator)
+        if request.progressive:
+            result["refinement_level"] = analysis_tasks[task_id].refinement_level
+        
+        if pipeline_metrics is not None:
+            result["pipeline_metrics"] = pipeline_metrics
+        if quality_verdict is not None:
+            result["quality_verdict"] = quality_verdict
+        if restored:
+            result["resumed_frames"] = restored
+        # 规划与实际耗时对比
+        if sampling_plan is not None:
+            sampling_plan['actual_frames'] = len(frame_analyses)
+            sampling_plan['actual_frame_seconds'] = round(frames_seconds, 2)
+            sampling_plan['actual_seconds'] = round(analysis_time, 2)
+            if request.deadline_seconds:
+                sampling_plan['within_deadline'] = analysis_time <= request.deadline_seconds
+            result["sampling_plan"] = sampling_plan
+        # 镜头自适应采样时附带镜头边界
+        if getattr(frame_source, 'shots', None):
+            result["scene_shots"] = frame_source.shots
         
         # 保存结果
         os.makedirs("outputs", exist_ok=True)
         report_generator.save_json_result(result, f"outputs/{task_id}_result.json")
         report_generator.generate_pdf_report(result, f"outputs/{task_id}_report.pdf")
         report_generator.generate_excel_report(result, f"outputs/{task_id}_report.xlsx")
+        index_result(result, f"outputs/{task_id}_result.json")
         
-        # 清理临时文件
+        # 清理临时文件，结果已保存，检查点不再需要
         frame_paths = [frame[2] for frame in frames]
         video_processor.cleanup_temp_files(frame_paths)
+        if checkpoint is not None:
+            checkpoint.remove()
+        
+        # 加入跨视频相似索引
+        if feature_store is not None:
+            try:
+                get_similarity_index().add_task(task_id, replace=True)
+            except Exception as e:
+                logger.warning(f"更新视频相似索引失败 {task_id}: {str(e)}")
         
         # 更新任务状态
         analysis_tasks[task_id].status = "completed"
         analysis_tasks[task_id].progress = 100.0
         analysis_tasks[task_id].message = "分析完成"
         
+        refinement_stop_requests.discard(task_id)
         logger.info(f"分析任务完成: {task_id}")
         
     except Exception as e:
         logger.error(f"分析任务失败 {task_id}: {str(e)}")
         analysis_tasks[task_id].status = "failed"
-        analysis_tasks[task_id].message = f"分析失败: {str(e)}" 
\ No newline at end of file
+        analysis_tasks[task_id].message = f"分析失败: {str(e)}"
+        if checkpoint is not None:
+            # 保留检查点，可通过 /resume-analysis 恢复
+            checkpoint.close()
+        refinement_stop_requests.discard(task_id) 
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
 
 class VideoAnalysisRequest(BaseModel):
@@ -7,6 +7,13 @@ class VideoAnalysisRequest(BaseModel):
     video_url: Optional[str] = None
     video_file: Optional[str] = None
     analysis_type: str = "full"  # full, quick, custom
+    frame_sampling: Optional[Literal["interval", "scene"]] = None  # 固定间隔或按镜头自适应采样（默认 Config.FRAME_SAMPLING）
+    frame_budget: Optional[int] = None  # 最多分析的帧数
+    deadline_seconds: Optional[float] = None  # 期望完成时限（秒），据此规划采样间隔和分析项
+    progressive: bool = False  # 由粗到细渐进分析，每轮细化后更新结果
+    refinement_levels: Optional[int] = None  # 最多细化轮数（默认 Config.PROGRESSIVE_MAX_LEVELS）
+    verdict_threshold: Optional[float] = None  # 只判断综合评分是否高于该阈值，统计上确定即停止
+    verdict_confidence: Optional[float] = Field(None, gt=0, lt=1)  # 判定的置信水平（默认 Config.VERDICT_CONFIDENCE）
 
 class FrameAnalysis(BaseModel):
     """单帧分析结果"""
@@ -21,6 +28,9 @@ class FrameAnalysis(BaseModel):
     content_richness: float  # 内容丰富度 0-100
     overall_score: float  # 综合评分 0-100
     issues: List[str] = []  # 发现的问题
+    metrics: Dict[str, Any] = {}  # 已执行分析项的原始指标（重新评分的依据）
+    timings: Dict[str, float] = {}  # 各项分析耗时（秒）
+    video_frame: Optional[int] = None  # 视频中的帧序号（渐进分析时提供，frame_number 为采样序号）
 
 class VideoAnalysisResult(BaseModel):
     """视频分析结果"""
@@ -45,6 +55,21 @@ class AnalysisProgress(BaseModel):
     total_frames: int
     message: str
     estimated_time: Optional[float] = None
+    pipeline_metrics: Optional[Dict[str, Any]] = None  # 流水线各阶段占用率与等待指标
+    refinement_level: Optional[int] = None  # 渐进分析已完成的细化轮次
+    live_summary: Optional[Dict[str, Any]] = None  # 已完成帧的实时汇总（与结果 summary 结构相同，不含音频项）
+    quality_verdict: Optional[Dict[str, Any]] = None  # 判定模式的判定结果
+
+class RescoreRequest(BaseModel):
+    """重新评分请求（由已保存的原始指标计算，不重新分析）"""
+    weights: Optional[Dict[str, float]] = None  # 分析项权重，缺省项取 Config.ANALYSIS_WEIGHTS
+    thresholds: Optional[Dict[str, float]] = None  # clarity/lighting/content 阈值，缺省取 Config
+    save: bool = False  # 是否写回结果文件
+
+class PromptScoreRequest(BaseModel):
+    """用新的文本提示对特征库中的帧嵌入打分"""
+    prompts: List[str]
+    task_id: Optional[str] = None  # 为空时对特征库中全部任务打分
 
 class ErrorResponse(BaseModel):
     """错误响应"""
@@ -0,0 +1,307 @@
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.frame_results import sort_by_timestamp
+from app.services.image_analyzer import FRAME_ANALYZERS, faces_from_detections, get_analysis_executor
+from app.services.video_similarity import perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_END = object()
+
+class StageMetrics:
+    """单个流水线阶段的运行指标
+    
+    - busy_seconds: 实际处理耗时
+    - starved_seconds: 等待上游输入的时间（输入队列为空）
+    - blocked_seconds: 等待下游队列腾出空间的时间（背压）
+    - 输入队列占用率：每次取数据时对输入队列长度采样
+    """
+    
+    def __init__(self, name: str, queue_capacity: int = 0):
+        self.name = name
+        self.queue_capacity = queue_capacity
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.starved_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._occupancy_sum = 0
+        self._occupancy_samples = 0
+        self._occupancy_max = 0
+        self._started_at = None
+        self._finished_at = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        self._started_at = time.perf_counter()
+    
+    def finish(self):
+        self._finished_at = time.perf_counter()
+    
+    def sample_queue(self, size: int):
+        with self._lock:
+            self._occupancy_sum += size
+            self._occupancy_samples += 1
+            self._occupancy_max = max(self._occupancy_max, size)
+    
+    def to_dict(self) -> Dict:
+        with self._lock:
+            end = self._finished_at or time.perf_counter()
+            wall = (end - self._started_at) if self._started_at else 0.0
+            avg_occupancy = self._occupancy_sum / self._occupancy_samples if self._occupancy_samples else 0.0
+            return {
+                'items': self.items,
+                'wall_seconds': round(wall, 3),
+                'busy_seconds': round(self.busy_seconds, 3),
+                'starved_seconds': round(self.starved_seconds, 3),
+                'blocked_seconds': round(self.blocked_seconds, 3),
+                'utilization': round(self.busy_seconds / wall, 3) if wall else 0.0,
+                'queue_capacity': self.queue_capacity,
+                'avg_queue_occupancy': round(avg_occupancy, 2),
+                'max_queue_occupancy': self._occupancy_max
+            }
+
+class AnalysisPipeline:
+    """解码 -> 预处理 -> 批量推理 -> 聚合 的流水线
+    
+    各阶段运行在独立线程中，通过有界队列连接：下游处理不过来时上游阻塞（背压），
+    解码和模型推理得以重叠执行。各阶段的占用率与等待时间可用于定位瓶颈。
+    """
+    
+    STAGES = ['decode', 'preprocess', 'inference', 'aggregate']
+    
+    def __init__(self, image_analyzer, queue_size: int = None, batch_size: int = None,
+                 on_frame: Callable[[Dict, int], None] = None, analyzers: Sequence[str] = None,
+                 frame_results: List[Dict] = None):
+        """frame_results 为收集帧结果的容器（如 FrameResultTable），默认为列表"""
+        self.image_analyzer = image_analyzer
+        self.analyzers = list(analyzers or FRAME_ANALYZERS)
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.batch_size = batch_size or Config.PIPELINE_BATCH_SIZE
+        self.on_frame = on_frame
+        
+        self._queues = {
+            'preprocess': queue.Queue(maxsize=self.queue_size),
+            'inference': queue.Queue(maxsize=self.queue_size),
+            'aggregate': queue.Queue(maxsize=self.queue_size)
+        }
+        self.metrics = {
+            'decode': StageMetrics('decode'),
+            'preprocess': StageMetrics('preprocess', self.queue_size),
+            'inference': StageMetrics('inference', self.queue_size),
+            'aggregate': StageMetrics('aggregate', self.queue_size)
+        }
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.frame_analyses: List[Dict] = frame_results if frame_results is not None else []
+    
+    def get_metrics(self) -> Dict[str, Dict]:
+        """各阶段指标，以及按繁忙度推断的瓶颈阶段"""
+        stages = {name: self.metrics[name].to_dict() for name in self.STAGES}
+        bottleneck = max(self.STAGES, key=lambda name: stages[name]['utilization'])
+        return {'stages': stages, 'bottleneck': bottleneck}
+    
+    def _put(self, stage: str, target: str, item):
+        """放入下游队列，队列满时阻塞并计入背压时间"""
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queues[target].put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.metrics[stage].blocked_seconds += time.perf_counter() - start
+    
+    def _get(self, stage: str):
+        """从本阶段输入队列取数据，计入空等时间"""
+        q = self._queues[stage]
+        self.metrics[stage].sample_queue(q.qsize())
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return _END
+        finally:
+            self.metrics[stage].starved_seconds += time.perf_counter() - start
+    
+    def _run_stage(self, stage: str, body: Callable[[], None], downstream: Optional[str]):
+        """阶段线程外壳：记录起止时间，异常时终止整个流水线"""
+        self.metrics[stage].start()
+        try:
+            body()
+        except BaseException as e:
+            logger.error(f"流水线阶段 {stage} 失败: {str(e)}")
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            self.metrics[stage].finish()
+            if downstream is not None:
+                self._put(stage, downstream, _END)
+    
+    def _decode(self, frames: Iterable[Tuple[int, float, np.ndarray]]):
+        iterator = iter(frames)
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    self.metrics['decode'].busy_seconds += time.perf_counter() - start
+                self.metrics['decode'].items += 1
+                self._put('decode', 'preprocess', item)
+        finally:
+            # 提前停止时关闭帧来源（如分段解码的工作进程）
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+    
+    def _preprocess(self):
+        """CPU轻量指标（清晰度、光照）在此阶段计算"""
+        analyzer = self.image_analyzer
+        while True:
+            item = self._get('preprocess')
+            if item is _END:
+                break
+            frame_idx, timestamp, frame = item
+            
+            start = time.perf_counter()
+            values, timings = {}, {}
+            for name, func in (('clarity', analyzer.analyze_clarity), ('lighting', analyzer.analyze_lighting)):
+                if name not in self.analyzers:
+                    continue
+                t0 = time.perf_counter()
+                values[name] = func(frame)
+                timings[name] = round(time.perf_counter() - t0, 4)
+            if Config.FEATURE_STORE_ENABLED:
+                values['phash'] = perceptual_hash(frame)
+            self.metrics['preprocess'].busy_seconds += time.perf_counter() - start
+            self.metrics['preprocess'].items += 1
+            
+            self._put('preprocess', 'inference', (frame_idx, timestamp, frame, values, timings))
+    
+    def _next_batch(self) -> Tuple[List, bool]:
+        """凑一批待推理的帧：阻塞等待第一帧，之后只取队列中已就绪的帧"""
+        first = self._get('inference')
+        if first is _END:
+            return [], True
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queues['inference'].get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+    
+    def _inference(self):
+        """模型推理：YOLO/OCR 逐帧（并行模式下提交到共享线程池），CLIP 整批一次前向"""
+        analyzer = self.image_analyzer
+        executor = get_analysis_executor() if Config.PARALLEL_FRAME_ANALYSIS else None
+        per_frame = [(name, func) for name, func in (('face', analyzer.detect_objects), ('watermark', analyzer.detect_watermark))
+                     if name in self.analyzers]
+        run_content = 'content' in self.analyzers
+        capture_features = Config.FEATURE_STORE_ENABLED
+        
+        def timed(func, frame):
+            t0 = time.perf_counter()
+            value = func(frame)
+            return value, time.perf_counter() - t0
+        
+        finished = False
+        while not finished:
+            batch, finished = self._next_batch()
+            if not batch:
+                break
+            
+            start = time.perf_counter()
+            frames = [item[2] for item in batch]
+            
+            futures = None
+            if executor is not None:
+                futures = [{name: executor.submit(timed, func, frame) for name, func in per_frame} for frame in frames]
+            
+            t0 = time.perf_counter()
+            content_scores, embeddings = [None] * len(batch), [None] * len(batch)
+            if run_content:
+                content_scores, embeddings = analyzer.analyze_content_features_batch(frames)
+            content_seconds = (time.perf_counter() - t0) / len(batch)
+            
+            for i, (item, content, embedding) in enumerate(zip(batch, content_scores, embeddings)):
+                frame_idx, timestamp, frame, values, timings = item
+                for name, func in per_frame:
+                    value, seconds = futures[i][name].result() if futures else timed(func, frame)
+                    if name == 'face':
+                        # 保留全部检测框作为特征，分析项结果为人物检测
+                        if capture_features:
+                            values['detections'] = value
+                        value = faces_from_detections(value)
+                    values[name] = value
+                    timings[name] = round(seconds, 4)
+                if run_content:
+                    values['content'] = content
+                    timings['content'] = round(content_seconds, 4)
+                    if capture_features and embedding is not None:
+                        values['clip_embedding'] = embedding
+            
+            self.metrics['inference'].busy_seconds += time.perf_counter() - start
+            self.metrics['inference'].items += len(batch)
+            
+            for frame_idx, timestamp, _, values, timings in batch:
+                # 帧像素不再向下游传递
+                self._put('inference', 'aggregate', (frame_idx, timestamp, values, timings))
+    
+    def _aggregate(self):
+        """流式聚合：计算综合评分、回调进度"""
+        while True:
+            item = self._get('aggregate')
+            if item is _END:
+                break
+            frame_idx, timestamp, values, timings = item
+            
+            start = time.perf_counter()
+            frame_analysis = self.image_analyzer.build_frame_result(values, timings)
+            frame_analysis['frame_number'] = frame_idx
+            frame_analysis['timestamp'] = timestamp
+            self.frame_analyses.append(frame_analysis)
+            if self.on_frame is not None:
+                self.on_frame(frame_analysis, len(self.frame_analyses))
+            self.metrics['aggregate'].busy_seconds += time.perf_counter() - start
+            self.metrics['aggregate'].items += 1
+    
+    def run(self, frames: Iterable[Tuple[int, float, np.ndarray]]) -> List[Dict]:
+        """运行流水线，frames 产出 (序号, 时间戳, BGR帧)，返回按时间顺序的帧分析结果"""
+        threads = [
+            threading.Thread(target=self._run_stage, args=('decode', lambda: self._decode(frames), 'preprocess'),
+                             name='pipeline-decode', daemon=True),
+            threading.Thread(target=self._run_stage, args=('preprocess', self._preprocess, 'inference'),
+                             name='pipeline-preprocess', daemon=True),
+            threading.Thread(target=self._run_stage, args=('inference', self._inference, 'aggregate'),
+                             name='pipeline-inference', daemon=True),
+            threading.Thread(target=self._run_stage, args=('aggregate', self._aggregate, None),
+                             name='pipeline-aggregate', daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        if self._errors:
+            raise self._errors[0]
+        
+        logger.info(f"流水线完成: {len(self.frame_analyses)} 帧, 瓶颈阶段: {self.get_metrics()['bottleneck']}")
+        # 分段解码的帧不按时间顺序到达
+        return sort_by_timestamp(self.frame_analyses)
\ No newline at end of file
@@ -14,20 +14,22 @@ class AudioProcessor:
         logger.info(f"音频处理器使用设备: {self.device}")
         
         # 延迟初始化模型，避免启动时的问题
-        self._whisper_model = None
+        self._transcription_backend = None
         self._recognizer = None
     
-    def _load_whisper_model(self):
-        """延迟加载Whisper模型"""
-        if self._whisper_model is None:
+    def _load_transcription_backend(self):
+        """延迟加载语音识别后端（由 Config.TRANSCRIPTION_BACKEND 选择）"""
+        if self._transcription_backend is None:
             try:
-                import whisper
-                self._whisper_model = whisper.load_model("base").to(self.device)
-                logger.info("Whisper模型加载完成")
+                from app.services.transcription_backends import get_transcription_backend
+                backend = get_transcription_backend(device=self.device)
+                backend.load()
+                self._transcription_backend = backend
+                logger.info(f"语音识别后端加载完成: {backend.name}")
             except Exception as e:
-                logger.warning(f"Whisper模型加载失败: {str(e)}")
+                logger.warning(f"语音识别后端加载失败: {str(e)}")
                 return None
-        return self._whisper_model
+        return self._transcription_backend
     
     def _load_speech_recognizer(self):
         """延迟加载语音识别器"""
@@ -82,8 +84,11 @@ class AudioProcessor:
         try:
             logger.info(f"开始Whisper语音识别: {audio_path}")
             
-            whisper_model = self._load_whisper_model()
-            if whisper_model is None:
+            if Config.TRANSCRIPTION_VAD_ENABLED:
+                return self._transcribe_with_engine(audio_path)
+            
+            backend = self._load_transcription_backend()
+            if backend is None:
                 return {
                     'text': '',
                     'segments': [],
@@ -92,12 +97,8 @@ class AudioProcessor:
                     'error': 'Whisper模型未加载'
                 }
             
-            # 使用Whisper进行转录
-            result = whisper_model.transcribe(
-                audio_path,
-                language="zh",  # 支持中文
-                task="transcribe"
-            )
+            # 使用识别后端进行转录
+            result = backend.transcribe(audio_path, language=Config.WHISPER_LANGUAGE)
             
             transcription = {
                 'text': result['text'],
@@ -119,6 +120,16 @@ class AudioProcessor:
                 'error': str(e)
             }
     
+    def _transcribe_with_engine(self, audio_path: str) -> Dict:
+        """VAD门控 + 分块并行转录"""
+        from app.services.transcription_engine import TranscriptionEngine
+        
+        engine = TranscriptionEngine(device=self.device)
+        transcription = engine.transcribe(audio_path)
+        
+        logger.info(f"Whisper识别完成，文本长度: {len(transcription['text'])}")
+        return transcription
+    
     def analyze_audio_quality(self, audio_path: str) -> Dict:
         """分析音频质量"""
         try:
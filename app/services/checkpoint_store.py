@@ -0,0 +1,171 @@
+import os
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.frame_results import sort_by_timestamp
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCheckpoint:
+    """任务级追加写检查点：帧分析和音频分析结果逐条追加到 {CHECKPOINT_DIR}/{task_id}.jsonl
+    
+    首行为任务头（请求参数、视频路径、采样指纹），之后每行一条记录：
+    {"type": "frame", "position": 帧序号, "analysis": {...}} 或 {"type": "audio", "analysis": {...}}。
+    帧以视频中的帧序号为键（由时间戳和fps换算），与帧来源无关。
+    内存中只保留从文件恢复的帧结果（restored）；本次追加的帧结果已在调用方的结果容器中，只记录帧序号。
+    进程崩溃时最后一行可能不完整，加载时忽略无法解析的行；指纹不一致（视频文件或采样参数变化）时
+    丢弃旧记录重新开始。
+    """
+    
+    def __init__(self, task_id: str, directory: str = None, fsync_every: int = None):
+        self.task_id = task_id
+        self.directory = directory or Config.CHECKPOINT_DIR
+        self.path = os.path.join(self.directory, f"{task_id}.jsonl")
+        self.fsync_every = fsync_every or Config.CHECKPOINT_FSYNC_EVERY
+        self.fps = 0.0
+        self.restored: Dict[int, Dict] = {}
+        self.appended: Set[int] = set()
+        self.audio: Optional[Dict] = None
+        self._file = None
+        self._unsynced = 0
+    
+    @staticmethod
+    def fingerprint(video_path: str, **params) -> Dict:
+        """视频文件与采样参数的指纹，任一变化则已有记录失效"""
+        stat = os.stat(video_path)
+        return {
+            'video_path': os.path.abspath(video_path),
+            'file_size': stat.st_size,
+            'mtime': int(stat.st_mtime),
+            **params
+        }
+    
+    def _records(self) -> Iterator[Dict]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"检查点 {self.task_id} 第 {line_number} 行不完整，已忽略")
+    
+    def read_header(self) -> Optional[Dict]:
+        """任务头；没有检查点时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        for record in self._records():
+            return record if record.get('type') == 'header' else None
+        return None
+    
+    def open(self, header: Dict) -> Tuple[Dict[int, Dict], Optional[Dict]]:
+        """打开检查点用于追加，返回已完成的 (帧序号 -> 帧结果, 音频结果)
+        
+        header 需包含 fps 和 fingerprint；已有检查点指纹一致时加载其记录，否则重写任务头。
+        """
+        self.fps = header['fps']
+        os.makedirs(self.directory, exist_ok=True)
+        
+        previous = self.read_header()
+        if previous is not None and previous.get('fingerprint') == header['fingerprint']:
+            for record in self._records():
+                if record.get('type') == 'frame':
+                    self.restored[record['position']] = record['analysis']
+                elif record.get('type') == 'audio':
+                    self.audio = record['analysis']
+            logger.info(f"从检查点恢复任务 {self.task_id}: 已完成 {len(self.restored)} 帧, "
+                        f"音频{'已' if self.audio is not None else '未'}完成")
+            # 末行可能不完整，补换行使之后的记录从新行开始
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if os.path.getsize(self.path) and not self._ends_with_newline():
+                self._file.write('\n')
+        else:
+            if previous is not None:
+                logger.info(f"检查点 {self.task_id} 的视频或采样参数已变化，重新开始")
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._append({'type': 'header', **header}, sync=True)
+        return self.restored, self.audio
+    
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+    
+    def _append(self, record: Dict, sync: bool = False):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if sync or self._unsynced >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+    
+    def position(self, timestamp: float) -> int:
+        return int(round(timestamp * self.fps))
+    
+    def is_completed(self, position: int) -> bool:
+        """该帧序号是否已分析（恢复的或本次追加的）"""
+        return position in self.restored or position in self.appended
+    
+    def append_frame(self, frame_analysis: Dict):
+        position = self.position(frame_analysis['timestamp'])
+        self.appended.add(position)
+        self._append({'type': 'frame', 'position': position, 'analysis': frame_analysis})
+    
+    def append_audio(self, audio_analysis: Dict):
+        self.audio = audio_analysis
+        self._append({'type': 'audio', 'analysis': audio_analysis}, sync=True)
+    
+    def pending(self, frames: Iterable[Tuple[int, float, np.ndarray]]) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """过滤帧来源，跳过检查点中已分析的帧"""
+        for item in frames:
+            if not self.is_completed(self.position(item[1])):
+                yield item
+    
+    def merge(self, frame_analyses: List[Dict]) -> List[Dict]:
+        """已恢复的帧追加到本次新分析的帧中并按时间排序（就地进行，列式结果不重建）"""
+        for position, frame in self.restored.items():
+            if position not in self.appended:
+                frame_analyses.append(frame)
+        return sort_by_timestamp(frame_analyses)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+    
+    def remove(self):
+        """任务完成后删除检查点"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def list_checkpoints(directory: str = None) -> List[Dict]:
+    """列出可恢复的任务（检查点目录中的任务头及已完成帧数）"""
+    directory = directory or Config.CHECKPOINT_DIR
+    if not os.path.isdir(directory):
+        return []
+    
+    tasks = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.jsonl'):
+            continue
+        checkpoint = AnalysisCheckpoint(filename[:-len('.jsonl')], directory)
+        try:
+            header = checkpoint.read_header()
+            if header is None:
+                continue
+            records = list(checkpoint._records())
+            tasks.append({
+                'task_id': checkpoint.task_id,
+                'video_path': header['fingerprint']['video_path'],
+                'completed_frames': sum(1 for r in records if r.get('type') == 'frame'),
+                'audio_completed': any(r.get('type') == 'audio' for r in records),
+                'updated_at': os.path.getmtime(checkpoint.path)
+            })
+        except Exception as e:
+            logger.warning(f"读取检查点失败 {filename}: {str(e)}")
+    return tasks
\ No newline at end of file
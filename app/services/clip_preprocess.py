@@ -0,0 +1,102 @@
+import logging
+from typing import Dict, Sequence
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# openai/clip-vit-base-patch32 的默认预处理参数
+CLIP_IMAGE_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_IMAGE_STD = (0.26862954, 0.26130258, 0.27577711)
+
+def _size_value(size, key: str):
+    """兼容 dict 与 SizeDict 两种尺寸配置"""
+    if size is None:
+        return None
+    if isinstance(size, dict):
+        return size.get(key)
+    return getattr(size, key, None)
+
+class ClipBatchPreprocessor:
+    """CLIP图像批量预处理：对内存中的BGR帧一次性完成缩放、中心裁剪和归一化
+    
+    与 CLIPProcessor 等价的流程：短边缩放到 shortest_edge、中心裁剪、除以255、按均值方差归一化，
+    输出 (N, 3, H, W) 的 float32 数组。缩放使用 cv2.resize 代替PIL，缩小时用 INTER_AREA
+    近似PIL带抗锯齿的双三次插值。
+    """
+    
+    def __init__(self, shortest_edge: int = 224, crop_size: int = 224,
+                 image_mean: Sequence[float] = CLIP_IMAGE_MEAN,
+                 image_std: Sequence[float] = CLIP_IMAGE_STD):
+        self.shortest_edge = shortest_edge
+        self.crop_size = crop_size
+        # 归一化合并为一次乘加：(x / 255 - mean) / std = x * scale + offset
+        mean = np.asarray(image_mean, dtype=np.float32)
+        std = np.asarray(image_std, dtype=np.float32)
+        self._scale = (1.0 / (255.0 * std)).reshape(1, 1, 1, 3)
+        self._offset = (-mean / std).reshape(1, 1, 1, 3)
+    
+    @classmethod
+    def from_processor(cls, processor) -> 'ClipBatchPreprocessor':
+        """从 CLIPProcessor / CLIPImageProcessor 读取预处理参数"""
+        image_processor = getattr(processor, 'image_processor', processor)
+        shortest_edge = _size_value(image_processor.size, 'shortest_edge') or 224
+        crop_size = _size_value(image_processor.crop_size, 'height') or shortest_edge
+        return cls(
+            shortest_edge=shortest_edge,
+            crop_size=crop_size,
+            image_mean=image_processor.image_mean,
+            image_std=image_processor.image_std
+        )
+    
+    def _resize_and_crop(self, frame: np.ndarray) -> np.ndarray:
+        """短边缩放后中心裁剪"""
+        h, w = frame.shape[:2]
+        if h <= w:
+            new_h, new_w = self.shortest_edge, int(self.shortest_edge * w / h)
+        else:
+            new_h, new_w = int(self.shortest_edge * h / w), self.shortest_edge
+        
+        interpolation = cv2.INTER_AREA if new_h < h else cv2.INTER_CUBIC
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=interpolation)
+        
+        top = max(0, (new_h - self.crop_size) // 2)
+        left = max(0, (new_w - self.crop_size) // 2)
+        return resized[top:top + self.crop_size, left:left + self.crop_size]
+    
+    def __call__(self, frames: Sequence[np.ndarray]) -> np.ndarray:
+        """BGR帧列表 -> (N, 3, crop, crop) float32 像素值"""
+        batch = np.empty((len(frames), self.crop_size, self.crop_size, 3), dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            batch[i] = self._resize_and_crop(frame)
+        
+        # BGR -> RGB、归一化、NHWC -> NCHW 整批一次完成
+        pixels = batch[..., ::-1].astype(np.float32)
+        pixels *= self._scale
+        pixels += self._offset
+        return np.ascontiguousarray(pixels.transpose(0, 3, 1, 2))
+
+def validate_against_processor(frames: Sequence[np.ndarray], processor,
+                               preprocessor: ClipBatchPreprocessor = None) -> Dict[str, float]:
+    """与 CLIPProcessor 的输出逐像素比较，返回误差统计（归一化后的数值空间）"""
+    from PIL import Image
+    
+    preprocessor = preprocessor or ClipBatchPreprocessor.from_processor(processor)
+    fast = preprocessor(frames)
+    
+    images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+    reference = processor(images=images, return_tensors="np")['pixel_values'].astype(np.float32)
+    
+    diff = np.abs(fast - reference)
+    # 每张图像展平后的余弦相似度
+    a = fast.reshape(len(frames), -1)
+    b = reference.reshape(len(frames), -1)
+    cosine = np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    
+    return {
+        'max_abs_error': float(diff.max()),
+        'mean_abs_error': float(diff.mean()),
+        'p99_abs_error': float(np.percentile(diff, 99)),
+        'min_cosine': float(cosine.min())
+    }
\ No newline at end of file
@@ -0,0 +1,116 @@
+import math
+import random
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+
+from config import Config
+from app.services.online_stats import RunningStats
+
+logger = logging.getLogger(__name__)
+
+def stratified_order(positions: List[int], strata: int, seed: int = None) -> Iterator[int]:
+    """分层随机顺序：按时间均分为 strata 层，每一轮从每层随机取一个未取过的位置（层的顺序也随机）
+    
+    任意前缀都近似均匀覆盖整段视频，全部取完即为全部位置。
+    """
+    rng = random.Random(seed)
+    strata = max(1, min(strata, len(positions)))
+    size = len(positions) / strata
+    buckets = [positions[int(k * size):int((k + 1) * size)] for k in range(strata)]
+    for bucket in buckets:
+        rng.shuffle(bucket)
+    
+    while any(buckets):
+        order = [k for k in range(strata) if buckets[k]]
+        rng.shuffle(order)
+        for k in order:
+            yield buckets[k].pop()
+
+class QualityVerdictEstimator:
+    """判断视频 overall_quality_score 是否高于阈值，统计上足够确定时提前停止
+    
+    总体为完整分析时的采样位置（每 FRAME_EXTRACTION_INTERVAL 秒一帧），按分层随机顺序逐帧分析，
+    维护帧综合评分的均值和置信区间。至少分析 min_samples 帧后，区间完全高于或低于阈值即停止；
+    达到 max_samples 或取完总体仍未确定时给出 inconclusive（取完总体时估计即为精确值）；
+    没有可分析的帧时同样为 inconclusive。analyzers 为执行的分析项（默认全部，如采样规划选出的分析项）。
+    """
+    
+    def __init__(self, image_analyzer, threshold: float, confidence: float = None,
+                 min_samples: int = None, max_samples: int = None, strata: int = None,
+                 seed: int = None, min_std: float = None, analyzers: Sequence[str] = None):
+        self.image_analyzer = image_analyzer
+        self.analyzers = analyzers
+        self.threshold = threshold
+        self.confidence = confidence or Config.VERDICT_CONFIDENCE
+        self.min_samples = min_samples or Config.VERDICT_MIN_SAMPLES
+        self.max_samples = max_samples or Config.VERDICT_MAX_SAMPLES
+        self.strata = strata or Config.VERDICT_STRATA
+        self.min_std = Config.VERDICT_MIN_STD if min_std is None else min_std
+        self.seed = seed
+    
+    def _verdict(self, low: float, high: float) -> Optional[str]:
+        if low > self.threshold:
+            return "above"
+        if high < self.threshold:
+            return "below"
+        return None
+    
+    def run(self, video_path: str, positions: List[int],
+            on_frame: Callable[[Dict, int], None] = None) -> Tuple[Dict, List[Dict]]:
+        """返回 (判定结果, 已分析帧结果按时间排序)"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        
+        stats = RunningStats()
+        frames: List[Dict] = []
+        verdict = None
+        low, high = float('-inf'), float('inf')
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            index = {position: i for i, position in enumerate(positions)}
+            for position in stratified_order(list(positions), self.strata, self.seed):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ret, frame = cap.read()
+                if not ret:
+                    continue
+                
+                frame_analysis = self.image_analyzer.analyze_frame(frame, self.analyzers)
+                frame_analysis['frame_number'] = index[position]
+                frame_analysis['timestamp'] = position / fps
+                frames.append(frame_analysis)
+                stats.add(frame_analysis['overall_score'])
+                if on_frame is not None:
+                    on_frame(frame_analysis, len(frames))
+                
+                low, high = stats.confidence_interval(self.confidence, len(positions), self.min_std)
+                if stats.count >= self.min_samples:
+                    verdict = self._verdict(low, high)
+                    if verdict is not None or stats.count >= self.max_samples:
+                        break
+        finally:
+            cap.release()
+        
+        exhausted = stats.count > 0 and stats.count >= len(positions)
+        if exhausted:
+            # 总体已全部分析，均值即精确值
+            low = high = stats.mean
+            verdict = "above" if stats.mean > self.threshold else "below"
+        
+        result = {
+            'verdict': verdict or "inconclusive",
+            'estimate': round(stats.mean, 3),
+            'ci_low': round(max(low, 0.0), 3),
+            'ci_high': round(min(high, 100.0), 3),
+            'confidence': self.confidence,
+            'threshold': self.threshold,
+            'frames_used': stats.count,
+            'population_frames': len(positions),
+            'std': round(math.sqrt(stats.sample_variance), 3)
+        }
+        logger.info(f"质量判定: {result['verdict']}, 估计 {result['estimate']} "
+                    f"[{result['ci_low']}, {result['ci_high']}], 用帧 {stats.count}/{len(positions)}")
+        frames.sort(key=lambda f: f['timestamp'])
+        return result, frames
\ No newline at end of file
@@ -0,0 +1,246 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 检测结果每行的列：class_id, confidence, x1, y1, x2, y2（未使用的行 class_id 为 -1）
+DETECTION_COLUMNS = 6
+
+class FeatureStore:
+    """帧特征库：CLIP图像嵌入（float16）和YOLO检测结果写入追加式内存映射 .npy 分片
+    
+    目录结构：
+    - meta.json：嵌入维度、分片行数、每帧最多检测数
+    - embeddings_{分片号}.npy：(shard_rows, dim) float16
+    - detections_{分片号}.npy：(shard_rows, max_detections, 6) float32
+    - phash_{分片号}.npy：(shard_rows,) uint64 帧感知哈希（0 表示未计算）
+    - index.jsonl：每行一条 {task_id, frame_number, timestamp, row}，全局行号 row 对应分片内位置
+    
+    先写分片行并 flush，再追加索引行；索引行即提交标记，崩溃时未提交的行在重启后被复用。
+    同一 (task_id, frame_number) 多次写入时以最后一次为准。只支持单进程写入。
+    """
+    
+    def __init__(self, directory: str = None, shard_rows: int = None, max_detections: int = None):
+        self.directory = directory or Config.FEATURE_STORE_DIR
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.index_path = os.path.join(self.directory, 'index.jsonl')
+        self.meta: Optional[Dict] = None
+        self.tasks: Dict[str, Dict[int, Tuple[int, float]]] = {}
+        self.next_row = 0
+        self._writers: Dict[int, Dict[str, np.memmap]] = {}
+        self._lock = threading.Lock()
+        
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        self._defaults = {
+            'shard_rows': shard_rows or Config.FEATURE_SHARD_ROWS,
+            'max_detections': max_detections or Config.FEATURE_MAX_DETECTIONS
+        }
+        self._load_index()
+    
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("特征库索引末行不完整，已忽略")
+                    continue
+                self.tasks.setdefault(entry['task_id'], {})[entry['frame_number']] = (entry['row'], entry['timestamp'])
+                self.next_row = max(self.next_row, entry['row'] + 1)
+        logger.info(f"特征库已加载: {len(self.tasks)} 个任务, {self.next_row} 行")
+    
+    def _shard_path(self, kind: str, shard: int) -> str:
+        return os.path.join(self.directory, f"{kind}_{shard:05d}.npy")
+    
+    def _create_meta(self, dim: int):
+        self.meta = {'dim': int(dim), **self._defaults}
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+    
+    def _layouts(self) -> Dict[str, Tuple[type, Tuple[int, ...]]]:
+        """各类分片的 (dtype, 每行形状)"""
+        return {
+            'embeddings': (np.float16, (self.meta['dim'],)),
+            'detections': (np.float32, (self.meta['max_detections'], DETECTION_COLUMNS)),
+            'phash': (np.uint64, ())
+        }
+    
+    def _writer(self, shard: int) -> Dict[str, np.memmap]:
+        """可写的分片内存映射（不存在时预分配整片）"""
+        if shard not in self._writers:
+            arrays = {}
+            for kind, (dtype, row_shape) in self._layouts().items():
+                path = self._shard_path(kind, shard)
+                if os.path.exists(path):
+                    arrays[kind] = np.load(path, mmap_mode='r+')
+                else:
+                    arrays[kind] = np.lib.format.open_memmap(
+                        path, mode='w+', dtype=dtype, shape=(self.meta['shard_rows'], *row_shape)
+                    )
+            # 只保留最近的分片可写，旧分片已写满
+            for old in [key for key in self._writers if key < shard]:
+                self._writers.pop(old)
+            self._writers[shard] = arrays
+        return self._writers[shard]
+    
+    def append(self, task_id: str, frame_number: int, timestamp: float, features: Dict):
+        """写入一帧的特征（features 含 clip_embedding，可选 detections、phash）"""
+        embedding = features.get('clip_embedding')
+        if embedding is None:
+            # 未执行内容分析的帧没有嵌入，不入库
+            return
+        
+        with self._lock:
+            if self.meta is None:
+                self._create_meta(len(embedding))
+            if len(embedding) != self.meta['dim']:
+                raise ValueError(f"嵌入维度不一致: {len(embedding)} != {self.meta['dim']}")
+            
+            row = self.next_row
+            shard, offset = divmod(row, self.meta['shard_rows'])
+            arrays = self._writer(shard)
+            
+            detection_rows = np.full((self.meta['max_detections'], DETECTION_COLUMNS), -1, dtype=np.float32)
+            for k, detection in enumerate(features.get('detections', [])[:self.meta['max_detections']]):
+                detection_rows[k] = [detection['class_id'], detection['confidence'], *detection['box']]
+            
+            arrays['embeddings'][offset] = embedding
+            arrays['detections'][offset] = detection_rows
+            arrays['phash'][offset] = features.get('phash', 0)
+            for array in arrays.values():
+                array.flush()
+            
+            entry = {'task_id': task_id, 'frame_number': int(frame_number), 'timestamp': float(timestamp), 'row': row}
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.tasks.setdefault(task_id, {})[int(frame_number)] = (row, float(timestamp))
+            self.next_row = row + 1
+    
+    def _reader(self, kind: str, shard: int) -> Optional[np.ndarray]:
+        path = self._shard_path(kind, shard)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+    
+    def entries(self, task_ids: Sequence[str] = None) -> List[Tuple[str, int, float, int]]:
+        """(task_id, frame_number, timestamp, row) 列表，按任务、时间排序"""
+        with self._lock:
+            task_ids = list(self.tasks) if task_ids is None else [t for t in task_ids if t in self.tasks]
+            return [
+                (task_id, frame_number, timestamp, row)
+                for task_id in task_ids
+                for frame_number, (row, timestamp) in sorted(self.tasks[task_id].items(), key=lambda item: item[1][1])
+            ]
+    
+    def _shard_groups(self, rows: np.ndarray) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """按分片分组：(分片号, 在 rows 中的位置, 分片内偏移)"""
+        shards, offsets = np.divmod(rows, self.meta['shard_rows'])
+        for shard in np.unique(shards):
+            positions = np.flatnonzero(shards == shard)
+            yield int(shard), positions, offsets[positions]
+    
+    def embeddings(self, rows: Sequence[int]) -> np.ndarray:
+        """按全局行号读取嵌入（float16，每个分片只读取所需的行）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.meta is None or not len(rows):
+            return np.zeros((0, self.meta['dim'] if self.meta else 0), dtype=np.float16)
+        result = np.empty((len(rows), self.meta['dim']), dtype=np.float16)
+        for shard, positions, offsets in self._shard_groups(rows):
+            result[positions] = self._reader('embeddings', shard)[offsets]
+        return result
+    
+    def detections(self, rows: Sequence[int]) -> List[List[Dict]]:
+        rows = np.asarray(rows, dtype=np.int64)
+        result: List[List[Dict]] = [[] for _ in rows]
+        if self.meta is None:
+            return result
+        for shard, positions, offsets in self._shard_groups(rows):
+            shard_detections = self._reader('detections', shard)
+            if shard_detections is None:
+                continue
+            block = shard_detections[offsets]
+            for position, frame_rows in zip(positions, block):
+                result[position] = [
+                    {'class_id': int(d[0]), 'confidence': float(d[1]), 'box': [float(v) for v in d[2:]]}
+                    for d in frame_rows if d[0] >= 0
+                ]
+        return result
+    
+    def phashes(self, rows: Sequence[int]) -> np.ndarray:
+        """按全局行号读取帧感知哈希（没有哈希分片的旧数据为 0）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        result = np.zeros(len(rows), dtype=np.uint64)
+        if self.meta is None:
+            return result
+        for shard, positions, offsets in self._shard_groups(rows):
+            shard_hashes = self._reader('phash', shard)
+            if shard_hashes is not None:
+                result[positions] = shard_hashes[offsets]
+        return result
+    
+    def task_features(self, task_id: str) -> Dict:
+        """单个任务的全部帧特征"""
+        entries = self.entries([task_id])
+        rows = [entry[3] for entry in entries]
+        return {
+            'frame_numbers': [entry[1] for entry in entries],
+            'timestamps': [entry[2] for entry in entries],
+            'embeddings': self.embeddings(rows),
+            'detections': self.detections(rows),
+            'phashes': self.phashes(rows)
+        }
+    
+    def similarity(self, text_embeds: np.ndarray, task_ids: Sequence[str] = None,
+                   chunk_rows: int = 65536) -> Tuple[List[Tuple[str, int, float, int]], np.ndarray]:
+        """已存帧嵌入与给定（L2归一化的）文本/图像嵌入的余弦相似度，不做任何模型推理
+        
+        返回 (entries, 相似度矩阵 (帧数, len(text_embeds)))。查询全部任务时按分片顺序做
+        内存映射矩阵乘（chunk_rows 控制每次转为 float32 的行数）。
+        """
+        entries = self.entries(task_ids)
+        queries = np.asarray(text_embeds, dtype=np.float32)
+        if self.meta is None or not entries:
+            return entries, np.zeros((len(entries), len(queries)), dtype=np.float32)
+        
+        rows = np.array([entry[3] for entry in entries], dtype=np.int64)
+        scores = np.empty((len(rows), len(queries)), dtype=np.float32)
+        if task_ids is not None:
+            for start in range(0, len(rows), chunk_rows):
+                block = self.embeddings(rows[start:start + chunk_rows])
+                scores[start:start + chunk_rows] = block.astype(np.float32) @ queries.T
+            return entries, scores
+        
+        # 全库：逐分片整块相乘，再按行号取出有效（已提交、未被覆盖）的行
+        for shard, positions, offsets in self._shard_groups(rows):
+            matrix = self._reader('embeddings', shard)
+            used = int(offsets.max()) + 1
+            shard_scores = np.empty((used, len(queries)), dtype=np.float32)
+            for start in range(0, used, chunk_rows):
+                end = min(used, start + chunk_rows)
+                shard_scores[start:end] = np.asarray(matrix[start:end], dtype=np.float32) @ queries.T
+            scores[positions] = shard_scores[offsets]
+        return entries, scores
+
+# 进程内共享的特征库
+_feature_store = None
+_feature_store_lock = threading.Lock()
+
+def get_feature_store() -> FeatureStore:
+    """获取共享的特征库（首次调用时加载索引）"""
+    global _feature_store
+    with _feature_store_lock:
+        if _feature_store is None:
+            _feature_store = FeatureStore()
+        return _feature_store
\ No newline at end of file
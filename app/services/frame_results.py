@@ -0,0 +1,681 @@
+import json
+import math
+import uuid
+import logging
+from collections import Counter
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.result_storage import _ABSENT, flatten_records
+from app.services.scoring import FAILED_ISSUE_PREFIX, SCORED_ANALYZERS
+
+logger = logging.getLogger(__name__)
+
+# 定长标量字段及其列类型（与 ImageAnalyzer.build_frame_result 的帧结果一致）
+SCALAR_FIELDS = {
+    'clarity_score': np.float64,
+    'lighting_score': np.float64,
+    'face_detected': np.bool_,
+    'face_count': np.int32,
+    'watermark_detected': np.bool_,
+    'content_richness': np.float64,
+    'overall_score': np.float64,
+    'frame_number': np.int64,
+    'timestamp': np.float64
+}
+
+# 各分析项的 metrics 由哪些标量列还原
+METRIC_FIELDS = {
+    'clarity': 'clarity_score',
+    'lighting': 'lighting_score',
+    'face': ('face_detected', 'face_count'),
+    'watermark': ('watermark_detected', 'watermark_text'),
+    'content': 'content_richness'
+}
+
+# 同时出现在 metrics 中的标量列对应的分析项（该分析项已执行时，单独修改该列会与 metrics 不一致）
+METRIC_LINKED = {
+    'clarity_score': 'clarity',
+    'lighting_score': 'lighting',
+    'face_detected': 'face',
+    'face_count': 'face',
+    'watermark_detected': 'watermark',
+    'watermark_text': 'watermark',
+    'content_richness': 'content'
+}
+
+# 行标志位：0-4 位为各分析项是否执行（SCORED_ANALYZERS 顺序），其后为 metrics / timings 是否存在
+HAS_METRICS = 1 << len(SCORED_ANALYZERS)
+HAS_TIMINGS = HAS_METRICS << 1
+ALL_EXECUTED = HAS_METRICS - 1
+
+# 不保存的字段：特征数据由调用方写入特征库后移除
+DROPPED_FIELDS = ('features',)
+
+def _json_column(values: np.ndarray) -> np.ndarray:
+    """整列编码为JSON文本（与 json.dumps 对相应Python值的输出相同），返回 object 数组"""
+    if values.dtype == np.bool_:
+        return np.where(values, 'true', 'false').astype(object)
+    if values.dtype.kind == 'f':
+        encoded = np.array(list(map(float.__repr__, values.tolist())), dtype=object)
+        special = ~np.isfinite(values)
+        if special.any():
+            # NaN / Infinity 与 json.dumps 的写法一致
+            encoded[special] = [json.dumps(value) for value in values[special].tolist()]
+        return encoded
+    return np.array(list(map(str, values.tolist())), dtype=object)
+
+class StringPool:
+    """字符串驻留：相同的字符串只保存一份，行中以整数编码引用"""
+    
+    def __init__(self):
+        self.strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+    
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+    
+    def __len__(self) -> int:
+        return len(self.strings)
+
+class GrowableArray:
+    """容量按需倍增的一维数组，逐行追加的摊销开销为常数；data 含预留容量，前 size 个元素有效"""
+    
+    def __init__(self, dtype, fill=0, capacity: int = 64):
+        self.fill = fill
+        self.size = 0
+        self.data = np.full(capacity, fill, dtype=dtype)
+    
+    def _reserve(self, needed: int):
+        if needed > len(self.data):
+            data = np.full(max(needed, len(self.data) * 2), self.fill, dtype=self.data.dtype)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+    
+    def append(self, value):
+        self._reserve(self.size + 1)
+        self.data[self.size] = value
+        self.size += 1
+    
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        self._reserve(self.size + len(values))
+        self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+    
+    def replace(self, values: np.ndarray):
+        self.size = 0
+        self.extend(values)
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self.data[:self.size]
+    
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+class FrameRow(Mapping):
+    """FrameResultTable 中一行的只读字典视图，按键从列中取值（不复制整行）
+    
+    可直接用于 frame.get(...)、dict(frame) 以及 FrameAnalysis(**frame)；赋值会写回表中该行的对应列。
+    """
+    
+    __slots__ = ('_table', '_index')
+    
+    def __init__(self, table: 'FrameResultTable', index: int):
+        self._table = table
+        self._index = index
+    
+    def __getitem__(self, key: str):
+        return self._table._value(self._index, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table._keys(self._index))
+    
+    def __len__(self) -> int:
+        return len(self._table._keys(self._index))
+    
+    def __setitem__(self, key: str, value):
+        self._table.set_value(self._index, key, value)
+    
+    def to_dict(self) -> Dict:
+        return self._table.row(self._index)
+    
+    def __repr__(self) -> str:
+        return f"FrameRow({self.to_dict()!r})"
+
+class FrameResultTable:
+    """逐帧分析结果的列式（struct-of-arrays）容器，替代帧结果字典列表
+    
+    标量字段保存为定长 NumPy 列，问题列表和水印文字驻留为整数编码，metrics 由标量列和分析项执行标志位还原，
+    timings 每项一列（缺失为 NaN）。每帧约百余字节，而字典列表每帧数 KB。
+    按列表方式使用：append()/len()/迭代/下标返回 FrameRow 视图；to_records() 转为字典列表，
+    flat_columns() 直接给出列式存储（Parquet/npz）所需的展开列。
+    无法由列精确还原的帧（旧格式或附加字段）整行原样保存，读取时返回原字典，列式转换退回逐行路径。
+    """
+    
+    def __init__(self, frames: Iterable[Dict] = ()):
+        self._scalars = {name: GrowableArray(dtype) for name, dtype in SCALAR_FIELDS.items()}
+        self._flags = GrowableArray(np.uint8)
+        self._watermark_texts = GrowableArray(np.int32, fill=-1)
+        self._issue_codes = GrowableArray(np.int32)
+        self._issue_offsets = GrowableArray(np.int64)
+        self._issue_offsets.append(0)
+        self._timings: Dict[str, GrowableArray] = {}
+        self.texts = StringPool()
+        self.issues = StringPool()
+        self._irregular: Dict[int, Dict] = {}
+        self.extend(frames)
+    
+    def __len__(self) -> int:
+        return self._flags.size
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [FrameRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("帧结果下标越界")
+        return FrameRow(self, index)
+    
+    def __iter__(self) -> Iterator[FrameRow]:
+        return (FrameRow(self, i) for i in range(len(self)))
+    
+    def __repr__(self) -> str:
+        return f"FrameResultTable({len(self)} 帧, {self.nbytes / 1024:.1f}KB)"
+    
+    # ---- 写入 ----
+    
+    def append(self, frame: Dict):
+        """追加一帧（字典或 FrameRow）"""
+        if isinstance(frame, FrameRow):
+            frame = frame.to_dict()
+        index = len(self)
+        for array in self._scalars.values():
+            array.append(array.fill)
+        for array in self._timings.values():
+            array.append(math.nan)
+        self._flags.append(0)
+        self._watermark_texts.append(-1)
+        self._issue_offsets.append(self._issue_offsets.values[-1])
+        self._store(index, frame)
+    
+    def extend(self, frames: Iterable[Dict]):
+        for frame in frames:
+            self.append(frame)
+    
+    def set_row(self, index: int, frame: Dict):
+        """替换已有的一行"""
+        self._irregular.pop(index, None)
+        for array in self._timings.values():
+            array.data[index] = math.nan
+        self._set_issue_codes(index, [])
+        self._store(index, frame)
+    
+    def set_value(self, index: int, key: str, value):
+        """修改一行的一个字段：标量列、水印文字和问题列表就地写入，其余字段（或写入后无法精确还原时）替换整行"""
+        if index in self._irregular:
+            self._irregular[index][key] = value
+            return
+        linked = METRIC_LINKED.get(key)
+        flags = int(self._flags.data[index])
+        if linked is not None and flags & HAS_METRICS and flags >> SCORED_ANALYZERS.index(linked) & 1:
+            self.set_row(index, {**self._row(index), key: value})
+            return
+        try:
+            if key in self._scalars:
+                array = self._scalars[key]
+                previous = array.data[index]
+                array.data[index] = value
+                if array.data[index].item() == value:
+                    return
+                array.data[index] = previous
+            elif key == 'watermark_text':
+                self._watermark_texts.data[index] = -1 if value is None else self.texts.code(value)
+                return
+            elif key == 'issues':
+                self._set_issue_codes(index, [self.issues.code(issue) for issue in value])
+                return
+        except (TypeError, ValueError, OverflowError):
+            pass
+        self.set_row(index, {**self._row(index), key: value})
+    
+    def _store(self, index: int, frame: Dict):
+        frame = {key: value for key, value in frame.items() if key not in DROPPED_FIELDS}
+        try:
+            self._encode(index, frame)
+            regular = self._row(index) == frame
+        except (TypeError, ValueError, KeyError, AttributeError, OverflowError):
+            regular = False
+        if not regular:
+            self._irregular[index] = frame
+    
+    def _set_issue_codes(self, index: int, codes: List[int]):
+        offsets = self._issue_offsets.values
+        start, end = int(offsets[index]), int(offsets[index + 1])
+        if end - start == len(codes):
+            # 长度不变：就地覆盖，后续行的偏移不变
+            self._issue_codes.data[start:end] = codes
+            return
+        if index + 1 == len(self) and end == self._issue_codes.size:
+            # 末行（追加时）直接写在末尾
+            self._issue_codes.size = start
+            self._issue_codes.extend(codes)
+        else:
+            existing = self._issue_codes.values
+            self._issue_codes.replace(np.concatenate([existing[:start], np.asarray(codes, dtype=np.int32),
+                                                      existing[end:]]))
+            offsets[index + 1:] += len(codes) - (end - start)
+            return
+        offsets[index + 1] = start + len(codes)
+    
+    def _encode(self, index: int, frame: Dict):
+        for name, array in self._scalars.items():
+            array.data[index] = frame[name]
+        text = frame['watermark_text']
+        self._watermark_texts.data[index] = -1 if text is None else self.texts.code(text)
+        self._set_issue_codes(index, [self.issues.code(issue) for issue in frame['issues']])
+        
+        flags = 0
+        metrics = frame.get('metrics')
+        if metrics is not None:
+            flags |= HAS_METRICS
+            for bit, name in enumerate(SCORED_ANALYZERS):
+                if name in metrics:
+                    flags |= 1 << bit
+        timings = frame.get('timings')
+        if timings is not None:
+            flags |= HAS_TIMINGS
+            for name, seconds in timings.items():
+                array = self._timings.get(name)
+                if array is None:
+                    array = self._timings[name] = GrowableArray(np.float64, fill=math.nan)
+                    array.extend(np.full(len(self), math.nan))
+                array.data[index] = seconds
+        self._flags.data[index] = flags
+    
+    # ---- 读取 ----
+    
+    def _keys(self, index: int) -> List[str]:
+        if index in self._irregular:
+            return list(self._irregular[index])
+        flags = int(self._flags.data[index])
+        keys = ['clarity_score', 'lighting_score', 'face_detected', 'face_count', 'watermark_detected',
+                'watermark_text', 'content_richness', 'overall_score', 'issues']
+        if flags & HAS_METRICS:
+            keys.append('metrics')
+        if flags & HAS_TIMINGS:
+            keys.append('timings')
+        if flags & HAS_METRICS and flags & ALL_EXECUTED != ALL_EXECUTED:
+            keys.append('skipped_analyzers')
+        keys += ['frame_number', 'timestamp']
+        return keys
+    
+    def _value(self, index: int, key: str):
+        if index in self._irregular:
+            return self._irregular[index][key]
+        array = self._scalars.get(key)
+        if array is not None:
+            return array.data[index].item()
+        return self._row(index)[key]
+    
+    @staticmethod
+    def _assemble(flags: int, scalars: Dict[str, Any], text: Optional[str], issues: List[str],
+                  timings: Dict[str, float]) -> Dict:
+        """由一行的列值组装帧结果字典（键顺序与 build_frame_result 相同）"""
+        record = {
+            'clarity_score': scalars['clarity_score'],
+            'lighting_score': scalars['lighting_score'],
+            'face_detected': scalars['face_detected'],
+            'face_count': scalars['face_count'],
+            'watermark_detected': scalars['watermark_detected'],
+            'watermark_text': text,
+            'content_richness': scalars['content_richness'],
+            'overall_score': scalars['overall_score'],
+            'issues': issues
+        }
+        if flags & HAS_METRICS:
+            metrics = {}
+            for bit, name in enumerate(SCORED_ANALYZERS):
+                if not flags >> bit & 1:
+                    continue
+                if name == 'face':
+                    metrics[name] = {'detected': record['face_detected'], 'count': record['face_count']}
+                elif name == 'watermark':
+                    metrics[name] = {'detected': record['watermark_detected'], 'text': text}
+                else:
+                    metrics[name] = record[METRIC_FIELDS[name]]
+            record['metrics'] = metrics
+        if flags & HAS_TIMINGS:
+            record['timings'] = timings
+        if flags & HAS_METRICS and flags & ALL_EXECUTED != ALL_EXECUTED:
+            record['skipped_analyzers'] = [name for bit, name in enumerate(SCORED_ANALYZERS) if not flags >> bit & 1]
+        record['frame_number'] = scalars['frame_number']
+        record['timestamp'] = scalars['timestamp']
+        return record
+    
+    def _row(self, index: int) -> Dict:
+        scalars = {name: array.data[index].item() for name, array in self._scalars.items()}
+        code = int(self._watermark_texts.data[index])
+        start, end = self._issue_offsets.data[index:index + 2]
+        issues = [self.issues.strings[code] for code in self._issue_codes.data[start:end].tolist()]
+        timings = {}
+        for name, array in self._timings.items():
+            seconds = array.data[index].item()
+            if not math.isnan(seconds):
+                timings[name] = seconds
+        return self._assemble(int(self._flags.data[index]), scalars, None if code < 0 else self.texts.strings[code],
+                              issues, timings)
+    
+    def row(self, index: int) -> Dict:
+        """第 index 帧的字典（与原帧结果相同）"""
+        if index in self._irregular:
+            return dict(self._irregular[index])
+        return self._row(index)
+    
+    def to_records(self) -> List[Dict]:
+        """转为帧结果字典列表（JSON序列化用），各列整体转为Python列表后逐行组装"""
+        scalars = {name: array.values.tolist() for name, array in self._scalars.items()}
+        texts = self.watermark_texts()
+        issues = self.issue_lists()
+        timings = [(name, array.values.tolist()) for name, array in self._timings.items()]
+        flags = self._flags.values.tolist()
+        records = []
+        for i in range(len(self)):
+            if i in self._irregular:
+                records.append(dict(self._irregular[i]))
+                continue
+            row_timings = {name: values[i] for name, values in timings if values[i] == values[i]}
+            records.append(self._assemble(flags[i], {name: values[i] for name, values in scalars.items()},
+                                          texts[i], issues[i], row_timings))
+        return records
+    
+    @staticmethod
+    def _json_template(flags: int, timing_names: List[str]) -> Tuple[str, List[str]]:
+        """一种行结构（执行标志位 + 存在的耗时项）的 % 格式模板及各占位符依次对应的已编码列（键顺序与 _assemble 相同）"""
+        fields = []
+        
+        def entry(key: str, column: str) -> str:
+            fields.append(column)
+            return json.dumps(key, ensure_ascii=False).replace('%', '%%') + ': %s'
+        
+        entries = [entry(name, name) for name in ('clarity_score', 'lighting_score', 'face_detected', 'face_count',
+                                                   'watermark_detected', 'watermark_text', 'content_richness',
+                                                   'overall_score', 'issues')]
+        if flags & HAS_METRICS:
+            metrics = []
+            for bit, name in enumerate(SCORED_ANALYZERS):
+                if not flags >> bit & 1:
+                    continue
+                if name == 'face':
+                    metrics.append('"face": {' + entry('detected', 'face_detected') + ', ' + entry('count', 'face_count') + '}')
+                elif name == 'watermark':
+                    metrics.append('"watermark": {' + entry('detected', 'watermark_detected') + ', '
+                                   + entry('text', 'watermark_text') + '}')
+                else:
+                    metrics.append(entry(name, METRIC_FIELDS[name]))
+            entries.append('"metrics": {' + ', '.join(metrics) + '}')
+        if flags & HAS_TIMINGS:
+            entries.append('"timings": {' + ', '.join(entry(name, f"timings.{name}") for name in timing_names) + '}')
+        if flags & HAS_METRICS and flags & ALL_EXECUTED != ALL_EXECUTED:
+            skipped = [name for bit, name in enumerate(SCORED_ANALYZERS) if not flags >> bit & 1]
+            entries.append('"skipped_analyzers": ' + json.dumps(skipped).replace('%', '%%'))
+        entries += [entry('frame_number', 'frame_number'), entry('timestamp', 'timestamp')]
+        return '{' + ', '.join(entries) + '}', fields
+    
+    def json_rows(self) -> List[str]:
+        """各帧的 json.dumps(记录, ensure_ascii=False) 文本，与 to_records 结果相同，但不组装字典
+        
+        各列整体编码为JSON文本（驻留的字符串每个只编码一次）；行结构（执行标志位和存在的耗时项）相同的行
+        共用一个 % 格式模板，按结构分组整组填入。
+        """
+        count = len(self)
+        if not count:
+            return []
+        encoded = {name: _json_column(array.values) for name, array in self._scalars.items()}
+        texts = [json.dumps(text, ensure_ascii=False) for text in self.texts.strings]
+        encoded['watermark_text'] = np.array(['null' if code < 0 else texts[code]
+                                              for code in self._watermark_texts.values.tolist()], dtype=object)
+        issues = [json.dumps(issue, ensure_ascii=False) for issue in self.issues.strings]
+        offsets = self._issue_offsets.values.tolist()
+        codes = self._issue_codes.values.tolist()
+        encoded['issues'] = np.array(['[' + ', '.join(issues[code] for code in codes[a:b]) + ']'
+                                      for a, b in zip(offsets[:-1], offsets[1:])], dtype=object)
+        
+        # 行结构：低8位为标志位，其上每位表示一项耗时是否存在
+        structure = self._flags.values.astype(np.int64)
+        timing_names = list(self._timings)
+        for bit, name in enumerate(timing_names):
+            values = self._timings[name].values
+            encoded[f"timings.{name}"] = _json_column(values)
+            structure |= (~np.isnan(values)).astype(np.int64) << (8 + bit)
+        
+        rows = np.empty(count, dtype=object)
+        for key in np.unique(structure).tolist():
+            indices = np.flatnonzero(structure == key)
+            present = [name for bit, name in enumerate(timing_names) if key >> (8 + bit) & 1]
+            template, fields = self._json_template(key & 0xFF, present)
+            columns = [encoded[name][indices] for name in fields]
+            rows[indices] = [template % values for values in zip(*columns)]
+        for index, frame in self._irregular.items():
+            rows[index] = json.dumps(frame, ensure_ascii=False, default=json_default)
+        return rows.tolist()
+    
+    def column(self, name: str) -> np.ndarray:
+        """标量字段列（只读视图）"""
+        values = self._scalars[name].values
+        values.flags.writeable = False
+        return values
+    
+    def watermark_texts(self, start: int = 0, end: int = None) -> List[Optional[str]]:
+        """[start, end) 行的水印文字"""
+        strings = self.texts.strings
+        return [None if code < 0 else strings[code] for code in self._watermark_texts.values[start:end].tolist()]
+    
+    def issue_lists(self, start: int = 0, end: int = None) -> List[List[str]]:
+        """[start, end) 行的问题列表"""
+        strings = self.issues.strings
+        offsets = self._issue_offsets.values[start:None if end is None else end + 1].tolist()
+        codes = self._issue_codes.values[offsets[0]:offsets[-1]].tolist()
+        base = offsets[0]
+        return [[strings[code] for code in codes[a - base:b - base]] for a, b in zip(offsets[:-1], offsets[1:])]
+    
+    def issue_counts(self) -> Counter:
+        """各问题出现的帧数（按编码计数，不展开问题列表）"""
+        counts = np.bincount(self._issue_codes.values, minlength=len(self.issues))
+        return Counter({issue: int(count) for issue, count in zip(self.issues.strings, counts) if count})
+    
+    def timing_columns(self) -> Dict[str, np.ndarray]:
+        """各项耗时列（缺失为 NaN）"""
+        return {name: array.values for name, array in self._timings.items()}
+    
+    @property
+    def nbytes(self) -> int:
+        arrays = [*self._scalars.values(), *self._timings.values(), self._flags, self._watermark_texts,
+                  self._issue_codes, self._issue_offsets]
+        return sum(array.nbytes for array in arrays)
+    
+    # ---- 批量转换 ----
+    
+    @property
+    def regular(self) -> bool:
+        """每行都能由列精确还原（整列转换可用）"""
+        return not self._irregular
+    
+    def _vectorizable(self) -> bool:
+        """各行都能由列还原，且没有空的 metrics / timings（展开后为单独的列）"""
+        if not self.regular:
+            return False
+        flags = self._flags.values
+        has_metrics = (flags & HAS_METRICS) != 0
+        if (has_metrics & ((flags & ALL_EXECUTED) == 0)).any():
+            return False
+        has_timings = (flags & HAS_TIMINGS) != 0
+        if has_timings.any():
+            present = np.zeros(len(self), dtype=bool)
+            for array in self._timings.values():
+                present |= ~np.isnan(array.values)
+            if (has_timings & ~present).any():
+                return False
+        return True
+    
+    def metric_arrays(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """FrameMetricTable 所需的 (指标矩阵, 执行标志, 人脸数, 分析失败) 列，整列计算；有不规则行时返回 None"""
+        if not self.regular:
+            return None
+        flags = self._flags.values
+        has_metrics = (flags & HAS_METRICS) != 0
+        # 没有 metrics 的帧（分析失败）按平铺字段全部视为已执行
+        executed = np.stack([((flags >> bit) & 1 != 0) | ~has_metrics for bit in range(len(SCORED_ANALYZERS))], axis=1)
+        columns = []
+        for name in SCORED_ANALYZERS:
+            field = METRIC_FIELDS[name]
+            columns.append(self._scalars[field[0] if isinstance(field, tuple) else field].values.astype(np.float64))
+        values = np.where(executed, np.stack(columns, axis=1), 0.0)
+        face_count = np.where(executed[:, SCORED_ANALYZERS.index('face')], self._scalars['face_count'].values, 0)
+        
+        failed_issue = np.array([issue.startswith(FAILED_ISSUE_PREFIX) for issue in self.issues.strings], dtype=bool)
+        failed = np.zeros(len(self), dtype=bool)
+        if len(failed_issue) and failed_issue.any():
+            counts = np.diff(self._issue_offsets.values)
+            rows = np.repeat(np.arange(len(self)), counts)
+            failed[rows[failed_issue[self._issue_codes.values]]] = True
+        return values, executed, face_count.astype(np.int64), failed & ~has_metrics
+    
+    def flat_columns(self) -> Dict[str, Any]:
+        """与 flatten_records(self.to_records()) 相同的展开列，各列整体转换
+        
+        每行都有值的列为 NumPy 数组（列式编码直接写入），部分行缺失的列为带缺失标记的列表。
+        """
+        if not self._vectorizable():
+            return flatten_records(self.to_records())
+        flags = self._flags.values
+        has_metrics = (flags & HAS_METRICS) != 0
+        has_timings = (flags & HAS_TIMINGS) != 0
+        watermark_texts = self.watermark_texts()
+        columns: Dict[str, Any] = {}
+        
+        def add(name: str, values, mask: np.ndarray = None):
+            if mask is None or mask.all():
+                columns[name] = values.copy() if isinstance(values, np.ndarray) else values
+            elif mask.any():
+                values = values.tolist() if isinstance(values, np.ndarray) else values
+                columns[name] = [value if present else _ABSENT for value, present in zip(values, mask.tolist())]
+        
+        for name in ('clarity_score', 'lighting_score', 'face_detected', 'face_count', 'watermark_detected'):
+            add(name, self._scalars[name].values)
+        add('watermark_text', watermark_texts)
+        add('content_richness', self._scalars['content_richness'].values)
+        add('overall_score', self._scalars['overall_score'].values)
+        add('issues', self.issue_lists())
+        
+        for bit, name in enumerate(SCORED_ANALYZERS):
+            executed = has_metrics & ((flags >> bit) & 1 != 0)
+            if name == 'face':
+                add('metrics.face.detected', self._scalars['face_detected'].values, executed)
+                add('metrics.face.count', self._scalars['face_count'].values, executed)
+            elif name == 'watermark':
+                add('metrics.watermark.detected', self._scalars['watermark_detected'].values, executed)
+                add('metrics.watermark.text', watermark_texts, executed)
+            else:
+                add(f"metrics.{name}", self._scalars[METRIC_FIELDS[name]].values, executed)
+        for name, array in self._timings.items():
+            add(f"timings.{name}", array.values, has_timings & ~np.isnan(array.values))
+        
+        # 跳过的分析项按执行标志组合各构造一次
+        skipped = has_metrics & ((flags & ALL_EXECUTED) != ALL_EXECUTED)
+        if skipped.any():
+            combinations = {
+                code: [name for bit, name in enumerate(SCORED_ANALYZERS) if not code >> bit & 1]
+                for code in np.unique(flags[skipped] & ALL_EXECUTED).tolist()
+            }
+            add('skipped_analyzers', [list(combinations[code]) if code in combinations else None
+                                      for code in (flags & ALL_EXECUTED).tolist()], skipped)
+        add('frame_number', self._scalars['frame_number'].values)
+        add('timestamp', self._scalars['timestamp'].values)
+        return columns
+    
+    def sort(self, key: Callable[[FrameRow], Any] = None, reverse: bool = False):
+        """就地排序（与 list.sort 相同，默认按时间戳）"""
+        if key is None:
+            order = np.argsort(self._scalars['timestamp'].values, kind='stable')
+            order = order[::-1] if reverse else order
+        else:
+            keys = [key(row) for row in self]
+            order = np.array(sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse), dtype=np.int64)
+        self._take(order)
+    
+    def _take(self, order: np.ndarray):
+        for array in [*self._scalars.values(), *self._timings.values(), self._flags, self._watermark_texts]:
+            array.replace(array.values[order])
+        offsets = self._issue_offsets.values
+        lengths = np.diff(offsets)[order]
+        new_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        positions = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1], lengths) + np.repeat(offsets[:-1][order], lengths)
+        self._issue_codes.replace(self._issue_codes.values[positions])
+        self._issue_offsets.replace(new_offsets)
+        rank = {int(old): new for new, old in enumerate(order.tolist()) if int(old) in self._irregular}
+        self._irregular = {rank[old]: frame for old, frame in self._irregular.items()}
+
+def frame_result_container():
+    """逐帧结果的容器：启用 COMPACT_FRAME_RESULTS 时为 FrameResultTable，否则为列表"""
+    return FrameResultTable() if Config.COMPACT_FRAME_RESULTS else []
+
+def sort_by_timestamp(frames: List[Dict]) -> List[Dict]:
+    """帧结果就地按时间排序；FrameResultTable 直接按时间戳列排序，不为每行构造 FrameRow"""
+    if isinstance(frames, FrameResultTable):
+        frames.sort()
+    else:
+        frames.sort(key=lambda f: f['timestamp'])
+    return frames
+
+def json_default(value):
+    """json.dump 的 default：FrameResultTable 及其行转为普通字典"""
+    if isinstance(value, FrameResultTable):
+        return value.to_records()
+    if isinstance(value, FrameRow):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dump_json(result: Dict, f, indent: int = 2):
+    """与 json.dump(result, f, ensure_ascii=False, indent=indent, default=json_default) 等价的写入
+    
+    顶层值为 FrameResultTable 时由 json_rows 整列编码后每帧一行写出，不转为字典列表，也不经过
+    带缩进时的纯Python编码器。
+    """
+    tables = {key: value for key, value in result.items() if isinstance(value, FrameResultTable)}
+    if not tables:
+        json.dump(result, f, ensure_ascii=False, indent=indent, default=json_default)
+        return
+    
+    if indent is None:
+        # 不缩进时与 json.dump 相同，帧之间以 ', ' 分隔写在同一行
+        item_indent, closing = '', ''
+        separator = ', '
+    else:
+        item_indent = '\n' + ' ' * (2 * indent)
+        closing = '\n' + ' ' * indent
+        separator = ',' + item_indent
+    
+    token = uuid.uuid4().hex
+    placeholders = {key: f"frame-table-{token}-{n}" for n, key in enumerate(tables)}
+    text = json.dumps({key: placeholders.get(key, value) for key, value in result.items()},
+                      ensure_ascii=False, indent=indent, default=json_default)
+    for key, table in tables.items():
+        head, text = text.split(json.dumps(placeholders[key]), 1)
+        f.write(head)
+        rows = table.json_rows()
+        if rows:
+            f.write('[' + item_indent + separator.join(rows) + closing + ']')
+        else:
+            f.write('[]')
+    f.write(text)
\ No newline at end of file
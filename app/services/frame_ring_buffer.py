@@ -0,0 +1,266 @@
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.frame_results import sort_by_timestamp
+
+logger = logging.getLogger(__name__)
+
+class SharedFrameRing:
+    """基于 multiprocessing.shared_memory 的定长帧环形缓冲区
+    
+    解码帧写入共享内存中的槽位，进程间只传递槽位索引和元数据（帧号、时间戳、形状），
+    消费进程通过 view() 直接得到指向共享内存的NumPy数组，无需序列化像素。
+    每个槽位带引用计数：publish 时设置为消费者数，所有消费者 release 后槽位回收。
+    空闲槽位耗尽时 acquire 阻塞，从而对解码端形成背压。
+    """
+    
+    def __init__(self, slots: int, slot_bytes: int, context=None):
+        context = context or multiprocessing.get_context()
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        # 只有创建者进程负责释放共享内存（fork 出的子进程会继承该对象）
+        self._owner_pid = os.getpid()
+        
+        self._frames_shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self._refcount_shm = shared_memory.SharedMemory(create=True, size=slots * np.dtype(np.int32).itemsize)
+        self._refcounts = np.ndarray((slots,), dtype=np.int32, buffer=self._refcount_shm.buf)
+        self._refcounts[:] = 0
+        
+        self._lock = context.Lock()
+        self._free_slots = context.Queue()
+        for slot in range(slots):
+            self._free_slots.put(slot)
+    
+    @classmethod
+    def for_frames(cls, frame_shape: Tuple[int, ...], slots: int = None, context=None) -> 'SharedFrameRing':
+        """按帧形状（uint8）创建环形缓冲区"""
+        slot_bytes = int(np.prod(frame_shape))
+        return cls(slots or Config.FRAME_RING_SLOTS, slot_bytes, context)
+    
+    def __getstate__(self):
+        # 传给子进程时只携带共享内存名称与同步原语
+        return {
+            'slots': self.slots,
+            'slot_bytes': self.slot_bytes,
+            'owner_pid': self._owner_pid,
+            'frames_name': self._frames_shm.name,
+            'refcount_name': self._refcount_shm.name,
+            'lock': self._lock,
+            'free_slots': self._free_slots
+        }
+    
+    def __setstate__(self, state):
+        self.slots = state['slots']
+        self.slot_bytes = state['slot_bytes']
+        self._owner_pid = state['owner_pid']
+        self._frames_shm = shared_memory.SharedMemory(name=state['frames_name'])
+        self._refcount_shm = shared_memory.SharedMemory(name=state['refcount_name'])
+        self._refcounts = np.ndarray((self.slots,), dtype=np.int32, buffer=self._refcount_shm.buf)
+        self._lock = state['lock']
+        self._free_slots = state['free_slots']
+    
+    def view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """槽位的零拷贝NumPy视图"""
+        size = int(np.prod(shape))
+        if size > self.slot_bytes:
+            raise ValueError(f"帧大小 {size} 超过槽位容量 {self.slot_bytes}")
+        offset = slot * self.slot_bytes
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._frames_shm.buf, offset=offset)
+    
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """获取一个空闲槽位（无空闲时阻塞）"""
+        return self._free_slots.get(timeout=timeout)
+    
+    def write(self, slot: int, frame: np.ndarray) -> Tuple[int, ...]:
+        """将帧复制到槽位（解码器能直接写入 view() 时无需调用）"""
+        target = self.view(slot, frame.shape)
+        np.copyto(target, frame)
+        return frame.shape
+    
+    def publish(self, slot: int, consumers: int):
+        """设置槽位的消费者数，之后可将索引发给消费者"""
+        with self._lock:
+            self._refcounts[slot] = consumers
+    
+    def release(self, slot: int):
+        """消费者用完槽位；最后一个消费者释放时槽位回到空闲队列"""
+        with self._lock:
+            self._refcounts[slot] -= 1
+            reclaimed = self._refcounts[slot] <= 0
+            if reclaimed:
+                self._refcounts[slot] = 0
+        if reclaimed:
+            self._free_slots.put(slot)
+    
+    def close(self):
+        """关闭共享内存；创建者同时释放共享内存"""
+        self._refcounts = None
+        self._frames_shm.close()
+        self._refcount_shm.close()
+        if os.getpid() == self._owner_pid:
+            self._frames_shm.unlink()
+            self._refcount_shm.unlink()
+
+# 工作进程内的分析器（每个进程只加载本组分析项需要的模型）
+_worker_analyzer = None
+
+def _ring_consumer(ring: SharedFrameRing, task_queue, result_queue, analyzers: Sequence[str]):
+    """分析工作进程：从任务队列取槽位索引，在共享内存帧上运行指定的分析项"""
+    global _worker_analyzer
+    from app.services.image_analyzer import ImageAnalyzer
+    
+    try:
+        if _worker_analyzer is None:
+            _worker_analyzer = ImageAnalyzer(analyzers)
+        
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            slot, frame_idx, timestamp, shape = task
+            frame = ring.view(slot, shape)
+            try:
+                values, timings = _worker_analyzer._run_analyzers(frame, analyzers)
+            finally:
+                # 视图用完即释放，槽位可被解码端复用
+                del frame
+                ring.release(slot)
+            result_queue.put((frame_idx, timestamp, values, timings))
+    except Exception as e:
+        logger.error(f"分析工作进程失败: {str(e)}")
+        result_queue.put(('error', str(e)))
+    finally:
+        result_queue.put(None)
+        ring.close()
+
+class MultiProcessFrameAnalyzer:
+    """多进程帧分析：解码进程写共享内存环，各分析组进程零拷贝读取
+    
+    analyzer_groups 中每一组分析项由一个独立进程执行（例如 OCR 单独一个进程），
+    每帧的槽位在所有分析组都释放后才回收。
+    """
+    
+    def __init__(self, analyzer_groups: List[List[str]] = None, slots: int = None):
+        self.analyzer_groups = analyzer_groups or Config.ANALYZER_PROCESS_GROUPS
+        self.slots = slots or Config.FRAME_RING_SLOTS
+        self.context = multiprocessing.get_context('spawn')
+    
+    def run(self, video_processor, video_path: str, interval: int = None,
+            on_frame=None, skip_positions=None, frame_results: List[Dict] = None,
+            frames: Iterable[Tuple[int, float, np.ndarray]] = None) -> List[Dict]:
+        """分析视频，返回按时间顺序的帧分析结果；模型只在各分析组进程中加载，主进程只计算综合评分
+        
+        skip_positions 中的帧序号不解码也不分析；frame_results 为收集帧结果的容器（如 FrameResultTable），默认为列表。
+        给出 frames 时解码端改为复制其产出的帧（非 OpenCV 帧来源），见 VideoProcessor.extract_frames_to_ring
+        """
+        from app.services.image_analyzer import ImageAnalyzer
+        
+        info = video_processor.get_video_info(video_path)
+        ring = SharedFrameRing.for_frames((info['height'], info['width'], 3), self.slots, self.context)
+        
+        task_queues = [self.context.Queue() for _ in self.analyzer_groups]
+        result_queue = self.context.Queue()
+        workers = [
+            self.context.Process(
+                target=_ring_consumer,
+                args=(ring, task_queue, result_queue, group),
+                name=f"frame-analyzer-{'-'.join(group)}",
+                daemon=True
+            )
+            for task_queue, group in zip(task_queues, self.analyzer_groups)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        # 解码在后台线程进行，主线程同时合并分析结果
+        produced = {}
+        stop_event = threading.Event()
+        
+        def produce():
+            try:
+                produced['count'] = video_processor.extract_frames_to_ring(
+                    video_path, ring, task_queues, interval=interval, stop_event=stop_event,
+                    skip_positions=skip_positions, frames=frames
+                )
+            except Exception as e:
+                produced['error'] = e
+                for task_queue in task_queues:
+                    task_queue.put(None)
+        
+        producer = threading.Thread(target=produce, name='frame-ring-producer', daemon=True)
+        producer.start()
+        
+        try:
+            # 合并各分析组的结果
+            partial: Dict[int, Tuple[float, Dict, Dict, int]] = {}
+            frame_analyses = frame_results if frame_results is not None else []
+            finished_workers = 0
+            while finished_workers < len(workers):
+                try:
+                    item = result_queue.get(timeout=1.0)
+                except queue.Empty:
+                    crashed = [w.name for w in workers if w.exitcode not in (None, 0)]
+                    if crashed:
+                        raise RuntimeError(f"分析工作进程异常退出: {', '.join(crashed)}")
+                    continue
+                if item is None:
+                    finished_workers += 1
+                    continue
+                if item[0] == 'error':
+                    raise RuntimeError(f"分析工作进程失败: {item[1]}")
+                
+                frame_idx, timestamp, values, timings = item
+                _, merged_values, merged_timings, groups_done = partial.get(frame_idx, (timestamp, {}, {}, 0))
+                merged_values.update(values)
+                merged_timings.update(timings)
+                groups_done += 1
+                if groups_done < len(self.analyzer_groups):
+                    partial[frame_idx] = (timestamp, merged_values, merged_timings, groups_done)
+                    continue
+                
+                partial.pop(frame_idx, None)
+                frame_analysis = ImageAnalyzer.build_frame_result(merged_values, merged_timings)
+                frame_analysis['frame_number'] = frame_idx
+                frame_analysis['timestamp'] = timestamp
+                frame_analyses.append(frame_analysis)
+                if on_frame is not None:
+                    on_frame(frame_analysis, len(frame_analyses))
+            
+            producer.join()
+            if 'error' in produced:
+                raise produced['error']
+            
+            logger.info(f"多进程分析完成: {len(frame_analyses)}/{produced['count']} 帧")
+            return sort_by_timestamp(frame_analyses)
+        finally:
+            stop_event.set()
+            producer.join(timeout=5)
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            ring.close()
+
+def wait_for_slot(ring: SharedFrameRing, timeout: float = None,
+                  stop_event: threading.Event = None) -> Optional[int]:
+    """带超时的槽位获取，长时间等待说明分析进程是瓶颈；stop_event 置位时返回 None"""
+    start = time.perf_counter()
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            return None
+        try:
+            return ring.acquire(timeout=1.0)
+        except queue.Empty:
+            waited = time.perf_counter() - start
+            if timeout is not None and waited >= timeout:
+                raise TimeoutError(f"等待空闲帧槽位超时（{waited:.1f}秒）")
+            logger.debug(f"等待空闲帧槽位 {waited:.1f}秒")
\ No newline at end of file
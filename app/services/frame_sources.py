@@ -0,0 +1,331 @@
+import shutil
+import logging
+import subprocess
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def passthrough_args(binary: str) -> Tuple[str, ...]:
+    """按原时间戳逐帧输出（不复制/丢弃帧）的参数：ffmpeg 5.1+ 为 -fps_mode passthrough，旧版本为已弃用的 -vsync 0"""
+    try:
+        help_text = subprocess.run([binary, '-hide_banner', '-h', 'long'], capture_output=True, text=True,
+                                   timeout=30).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"读取ffmpeg选项失败: {str(e)}")
+        help_text = ''
+    if '-fps_mode' in help_text:
+        return ('-fps_mode', 'passthrough')
+    return ('-vsync', '0')
+
+def _probe_video(video_path: str) -> Tuple[float, int, int, int]:
+    """读取 (fps, 总帧数, 宽, 高)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    try:
+        return (
+            cap.get(cv2.CAP_PROP_FPS),
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        )
+    finally:
+        cap.release()
+
+def interval_positions(fps: float, total_frames: int, interval: int = None) -> List[int]:
+    """每interval秒（默认 Config.FRAME_EXTRACTION_INTERVAL）一帧的采样位置（帧序号）"""
+    frame_interval = max(1, int(fps * (interval or Config.FRAME_EXTRACTION_INTERVAL)))
+    return list(range(0, total_frames, frame_interval))
+
+class FrameSource(ABC):
+    """帧来源接口：iter_frames 逐帧产出 (序号, 时间戳, BGR帧)"""
+    
+    name = "base"
+    
+    @abstractmethod
+    def iter_frames(self, video_path: str, interval: int = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """逐帧产出 (序号, 时间戳, BGR帧)"""
+    
+    def sample_count(self, video_path: str, interval: int = None) -> int:
+        """将产出的帧数（用于进度显示）"""
+        fps, total_frames, _, _ = _probe_video(video_path)
+        return len(interval_positions(fps, total_frames, interval))
+
+class OpenCVFrameSource(FrameSource):
+    """cv2.VideoCapture 逐位置 seek 解码（全分辨率）"""
+    
+    name = "opencv"
+    
+    def iter_frames(self, video_path: str, interval: int = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = total_frames / fps
+            
+            # 计算需要提取的帧
+            frame_positions = interval_positions(fps, total_frames, interval)
+            
+            logger.info(f"视频信息: {total_frames}帧, {fps}fps, {duration:.2f}秒")
+            logger.info(f"将提取 {len(frame_positions)} 帧")
+            
+            for i, frame_pos in enumerate(frame_positions):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
+                ret, frame = cap.read()
+                
+                if ret:
+                    yield i, frame_pos / fps, frame
+        finally:
+            cap.release()
+
+class FFmpegFrameSource(FrameSource):
+    """ffmpeg 子进程解码：在解码器内完成抽帧和缩放，rawvideo 经管道读入NumPy
+    
+    - interval 模式：select 滤镜按帧序号抽取，与 OpenCV 路径的采样位置一致
+    - keyframe 模式：-skip_frame nokey 只解码关键帧，再按 interval 秒间隔筛选
+    - scale_width：输出宽度上限，由 scale 滤镜在解码后直接缩小（缩小后的帧清晰度评分偏高）
+    """
+    
+    name = "ffmpeg"
+    
+    def __init__(self, mode: str = "interval", scale_width: int = 0, threads: int = None):
+        if mode not in ("interval", "keyframe"):
+            raise ValueError(f"不支持的抽帧模式: {mode}")
+        self.mode = mode
+        self.scale_width = scale_width
+        self.threads = Config.FFMPEG_THREADS if threads is None else threads
+        self.binary = shutil.which(Config.FFMPEG_BINARY)
+        if self.binary is None:
+            raise RuntimeError(f"未找到ffmpeg: {Config.FFMPEG_BINARY}")
+    
+    def _output_size(self, width: int, height: int) -> Tuple[int, int]:
+        """缩放后的输出尺寸（保持宽高比，取偶数）"""
+        if not self.scale_width or width <= self.scale_width:
+            return width, height
+        out_width = self.scale_width - self.scale_width % 2
+        out_height = max(2, int(round(height * out_width / width / 2)) * 2)
+        return out_width, out_height
+    
+    def _keyframe_positions(self, video_path: str, fps: float, interval: int = None) -> Tuple[List[int], List[int]]:
+        """返回 (全部关键帧位置, 按interval秒间隔保留的关键帧位置)"""
+        interval = interval or Config.FRAME_EXTRACTION_INTERVAL
+        from app.services.segmented_decoder import probe_keyframes
+        
+        keyframes = probe_keyframes(video_path, fps)
+        if not keyframes:
+            raise RuntimeError("无法读取关键帧位置（需要ffprobe）")
+        
+        kept, last = [], None
+        for position in keyframes:
+            if last is None or (position - last) / fps >= interval:
+                kept.append(position)
+                last = position
+        return keyframes, kept
+    
+    def sample_count(self, video_path: str, interval: int = None) -> int:
+        if self.mode == "keyframe":
+            fps, _, _, _ = _probe_video(video_path)
+            return len(self._keyframe_positions(video_path, fps, interval)[1])
+        return super().sample_count(video_path, interval)
+    
+    def _build_command(self, video_path: str, filters: List[str]) -> List[str]:
+        command = [self.binary, '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if self.threads:
+            command += ['-threads', str(self.threads)]
+        if self.mode == "keyframe":
+            command += ['-skip_frame', 'nokey']
+        command += ['-i', video_path, '-an', '-sn', *passthrough_args(self.binary)]
+        if filters:
+            command += ['-vf', ','.join(filters)]
+        command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        return command
+    
+    @staticmethod
+    def _read_frame(stream, frame: np.ndarray) -> bool:
+        """用 readinto 把一帧直接读进数组，流结束时返回 False"""
+        view = memoryview(frame).cast('B')
+        filled = 0
+        while filled < len(view):
+            n = stream.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        return True
+    
+    def iter_frames(self, video_path: str, interval: int = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        fps, total_frames, width, height = _probe_video(video_path)
+        out_width, out_height = self._output_size(width, height)
+        
+        filters = []
+        if self.mode == "interval":
+            positions = interval_positions(fps, total_frames, interval)
+            frame_interval = max(1, int(fps * (interval or Config.FRAME_EXTRACTION_INTERVAL)))
+            filters.append(f"select=not(mod(n\\,{frame_interval}))")
+            wanted = None
+        else:
+            positions, kept = self._keyframe_positions(video_path, fps, interval)
+            wanted = set(kept)
+        if (out_width, out_height) != (width, height):
+            filters.append(f"scale={out_width}:{out_height}:flags=area")
+        
+        logger.info(f"ffmpeg解码: 模式 {self.mode}, 输出 {out_width}x{out_height}, 候选 {len(positions)} 帧")
+        
+        command = self._build_command(video_path, filters)
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   bufsize=out_width * out_height * 3)
+        completed = False
+        try:
+            scratch = np.empty((out_height, out_width, 3), dtype=np.uint8)
+            i = 0
+            for position in positions:
+                keep = wanted is None or position in wanted
+                # 不需要的关键帧读入临时缓冲区丢弃，需要的帧读入新数组（下游可能持有）
+                frame = np.empty_like(scratch) if keep else scratch
+                if not self._read_frame(process.stdout, frame):
+                    break
+                if keep:
+                    yield i, position / fps, frame
+                    i += 1
+            completed = True
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            stderr = process.stderr.read().decode(errors='ignore').strip()
+            process.stderr.close()
+            # 提前结束时由本进程终止ffmpeg（返回码为负），不视为错误
+            if completed and process.returncode > 0:
+                raise RuntimeError(f"ffmpeg解码失败: {stderr}")
+
+class SceneFrameSource(FrameSource):
+    """镜头自适应采样：顺序解码时检测镜头切换，每个镜头输出一帧代表帧
+    
+    - 每秒 SCENE_DETECT_FPS 帧参与检测（其余帧只 grab），特征在缩小的帧上计算
+    - 代表帧取镜头内清晰度最高的检测帧
+    - 相邻采样至少间隔 min_gap 秒（过短的镜头并入前一镜头），超过 max_gap 秒的长镜头强制切分
+    - 总帧数不超过 budget：按时长提高 min_gap，并在达到预算后停止
+    
+    迭代结束后 shots 为镜头边界列表。
+    """
+    
+    name = "scene"
+    
+    def __init__(self, min_gap: float = None, max_gap: float = None, budget: int = None,
+                 threshold: float = None):
+        from app.services.scene_detector import SceneChangeDetector
+        
+        self.min_gap = Config.SCENE_MIN_GAP if min_gap is None else min_gap
+        self.max_gap = Config.SCENE_MAX_GAP if max_gap is None else max_gap
+        self.budget = budget or Config.SCENE_FRAME_BUDGET
+        self.detector = SceneChangeDetector(threshold)
+        self.shots: List[Dict] = []
+    
+    def _gaps(self, duration: float) -> Tuple[float, float]:
+        min_gap = max(self.min_gap, duration / self.budget)
+        return min_gap, max(self.max_gap, min_gap)
+    
+    def sample_count(self, video_path: str, interval: int = None) -> int:
+        """上限估计：每个采样至少占 min_gap 秒"""
+        fps, total_frames, _, _ = _probe_video(video_path)
+        duration = total_frames / fps if fps else 0
+        min_gap, _ = self._gaps(duration)
+        return min(self.budget, int(duration / min_gap) + 1) if min_gap else 1
+    
+    def iter_frames(self, video_path: str, interval: int = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        
+        self.shots = []
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            min_gap, max_gap = self._gaps(total_frames / fps)
+            step = max(1, int(round(fps / Config.SCENE_DETECT_FPS)))
+            logger.info(f"镜头自适应采样: 检测步长 {step} 帧, 间隔 {min_gap:.1f}-{max_gap:.1f}秒, 预算 {self.budget} 帧")
+            
+            shot_start, boundary, cut_score = 0, 'start', 0.0
+            best = None  # (清晰度, 位置, 帧)
+            prev = None
+            position = 0
+            
+            def finish_shot(end: int):
+                """结束当前镜头，返回代表帧"""
+                _, best_pos, best_frame = best
+                self.shots.append({
+                    'shot': len(self.shots),
+                    'start_time': round(shot_start / fps, 3),
+                    'end_time': round(end / fps, 3),
+                    'boundary': boundary,
+                    'cut_score': round(cut_score, 4),
+                    'frame_number': len(self.shots),
+                    'timestamp': best_pos / fps
+                })
+                return len(self.shots) - 1, best_pos / fps, best_frame
+            
+            while position < total_frames and len(self.shots) < self.budget:
+                if not cap.grab():
+                    break
+                if position % step == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        signature = self.detector.signature(frame)
+                        elapsed = (position - shot_start) / fps
+                        cut, score = self.detector.is_cut(prev, signature) if prev is not None else (False, 0.0)
+                        
+                        if best is not None and ((cut and elapsed >= min_gap) or elapsed >= max_gap):
+                            yield finish_shot(position)
+                            shot_start = position
+                            boundary, cut_score = ('cut', score) if cut else ('max_gap', score)
+                            best = None
+                        
+                        if best is None or signature.sharpness > best[0]:
+                            best = (signature.sharpness, position, frame)
+                        prev = signature
+                position += 1
+            
+            if best is not None and len(self.shots) < self.budget:
+                yield finish_shot(position)
+            logger.info(f"镜头自适应采样完成: {len(self.shots)} 个镜头/采样帧")
+        finally:
+            cap.release()
+
+FRAME_SOURCES = {
+    OpenCVFrameSource.name: OpenCVFrameSource,
+    FFmpegFrameSource.name: FFmpegFrameSource,
+    SceneFrameSource.name: SceneFrameSource
+}
+
+def get_frame_source(name: str = None, **kwargs) -> FrameSource:
+    """根据名称创建帧来源"""
+    name = name or "opencv"
+    if name not in FRAME_SOURCES:
+        raise ValueError(f"不支持的帧来源: {name}，可选: {', '.join(FRAME_SOURCES)}")
+    return FRAME_SOURCES[name](**kwargs)
+
+def get_tier_frame_source(analysis_type: Optional[str] = None, sampling: Optional[str] = None) -> FrameSource:
+    """按分析档位（full / quick / custom）选择帧来源，ffmpeg 不可用时回退到 OpenCV
+    
+    sampling（默认 Config.FRAME_SAMPLING）为 scene 时所有档位使用镜头自适应采样。
+    """
+    if (sampling or Config.FRAME_SAMPLING) == SceneFrameSource.name:
+        return SceneFrameSource()
+    settings: Dict = dict(Config.FRAME_SOURCE_TIERS.get(analysis_type or "full", {}))
+    name = settings.pop('backend', 'opencv')
+    try:
+        return get_frame_source(name, **settings)
+    except RuntimeError as e:
+        logger.warning(f"帧来源 {name} 不可用，回退到OpenCV: {str(e)}")
+        return OpenCVFrameSource()
\ No newline at end of file
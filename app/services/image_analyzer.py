@@ -1,54 +1,135 @@
 import cv2
 import numpy as np
-from PIL import Image
 import easyocr
-from transformers import CLIPProcessor, CLIPModel
-from ultralytics import YOLO
-import torch
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from app.services.inference_backends import get_inference_backend, load_bgr_image, ImageInput
+from app.services.scoring import ScoringEngine, frame_metrics
+from app.services.video_similarity import perceptual_hash
 import os
 
 logger = logging.getLogger(__name__)
 
+# 预定义的丰富内容描述
+RICH_DESCRIPTIONS = [
+    "detailed scene with many objects",
+    "complex composition with multiple elements",
+    "rich visual content with various textures",
+    "busy scene with lots of activity",
+    "diverse visual elements and colors"
+]
+
+POOR_DESCRIPTIONS = [
+    "simple background",
+    "minimal content",
+    "empty scene",
+    "plain surface",
+    "basic composition"
+]
+
+def content_richness_from_logits(logits: np.ndarray) -> float:
+    """由CLIP logits（RICH_DESCRIPTIONS + POOR_DESCRIPTIONS 顺序）计算内容丰富度评分"""
+    # 计算与丰富内容的平均相似度
+    avg_rich_score = float(np.mean(logits[:len(RICH_DESCRIPTIONS)]))
+    avg_poor_score = float(np.mean(logits[len(RICH_DESCRIPTIONS):]))
+    
+    # 转换为0-100评分
+    score = (avg_rich_score - avg_poor_score + 2) * 25  # 假设分数范围在-2到2之间
+    return max(0, min(100, score))
+
+# analyze_frame 中相互独立的各项分析
+FRAME_ANALYZERS = ['clarity', 'lighting', 'face', 'watermark', 'content']
+
+# 调用模型（torch/onnxruntime 内部多线程）的分析项
+MODEL_ANALYZERS = ['face', 'watermark', 'content']
+
+# 各分析项依赖的模型：inference 为 YOLO + CLIP 推理后端，ocr 为 easyocr
+ANALYZER_MODELS = {'face': 'inference', 'content': 'inference', 'watermark': 'ocr'}
+
+# 未执行的分析项在帧结果中的默认值
+SKIPPED_ANALYZER_VALUES = {
+    'clarity': 0.0,
+    'lighting': 0.0,
+    'face': (False, 0),
+    'watermark': (False, None),
+    'content': 0.0
+}
+
+# 分析项附带的中间特征（人脸检测的全部检测框、内容分析的CLIP图像嵌入、帧感知哈希），
+# 启用特征库时放在分析项结果中，由 build_frame_result 移入帧结果的 features
+FEATURE_KEYS = ['detections', 'clip_embedding', 'phash']
+
+def faces_from_detections(detections: List[Dict]) -> Tuple[bool, int]:
+    """由检测结果统计人物数（YOLOv8 中 person 类别为 0）"""
+    face_count = sum(1 for detection in detections if detection['class_id'] == 0)
+    return face_count > 0, face_count
+
+# 所有 ImageAnalyzer 共享的分析线程池
+_analysis_executor = None
+_analysis_executor_lock = threading.Lock()
+
+def get_thread_plan() -> Tuple[int, int]:
+    """计算分析线程池大小与模型的intra-op线程数，避免线程超订
+    
+    并行模式下最多有 len(MODEL_ANALYZERS) 个模型同时推理，
+    每个模型的intra-op线程数取 CPU核数 / 并发模型数。
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = Config.FRAME_ANALYSIS_THREADS or min(len(FRAME_ANALYZERS), cpu_count)
+    concurrent_models = max(1, min(len(MODEL_ANALYZERS), workers))
+    intra_op_threads = max(1, cpu_count // concurrent_models)
+    return workers, intra_op_threads
+
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """获取共享的分析线程池"""
+    global _analysis_executor
+    with _analysis_executor_lock:
+        if _analysis_executor is None:
+            workers, _ = get_thread_plan()
+            _analysis_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-analyzer")
+        return _analysis_executor
+
 class ImageAnalyzer:
     """图像分析服务"""
     
-    def __init__(self):
+    def __init__(self, analyzers: Sequence[str] = None):
+        """analyzers 为可执行的分析项（默认全部 FRAME_ANALYZERS），只加载这些分析项需要的模型"""
         logger.info(f"使用设备: {Config.DEVICE}")
+        self.analyzers = list(analyzers or FRAME_ANALYZERS)
+        self.inference_backend = None
+        self.ocr_reader = None
         # 初始化模型
         self._load_models()
     
     def _load_models(self):
-        """加载所有分析模型"""
+        """加载分析项需要的模型"""
+        models = {ANALYZER_MODELS[name] for name in self.analyzers if name in ANALYZER_MODELS}
         try:
-            # YOLOv8 模型
-            self.yolo_model = YOLO('yolov8n.pt')
-            self.yolo_model.to(Config.DEVICE)
-            logger.info("YOLOv8 模型加载完成")
+            # 并行模式下限制模型intra-op线程数
+            intra_op_threads = get_thread_plan()[1] if Config.PARALLEL_FRAME_ANALYSIS else 0
             
-            # CLIP 模型
-            self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32").to(Config.DEVICE)
-            self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-            # 确保clip_processor是处理器实例而不是tuple
-            if hasattr(self.clip_processor, '__getitem__') and isinstance(self.clip_processor, tuple):
-                self.clip_processor = self.clip_processor[0]
-            logger.info("CLIP 模型加载完成")
+            # YOLOv8 + CLIP 模型（由 Config.INFERENCE_BACKEND 选择推理后端）
+            if 'inference' in models:
+                self.inference_backend = get_inference_backend(intra_op_threads=intra_op_threads)
+                logger.info(f"推理后端: {self.inference_backend.name}")
             
             # OCR 模型
-            self.ocr_reader = easyocr.Reader(['ch_sim', 'en'], gpu=(Config.DEVICE=="cuda"))
-            logger.info("OCR 模型加载完成")
+            if 'ocr' in models:
+                self.ocr_reader = easyocr.Reader(Config.OCR_LANGUAGES, gpu=(Config.DEVICE=="cuda"))
+                logger.info("OCR 模型加载完成")
             
         except Exception as e:
             logger.error(f"模型加载失败: {str(e)}")
             raise
     
-    def analyze_clarity(self, image_path: str) -> float:
+    def analyze_clarity(self, image: ImageInput) -> float:
         """分析图像清晰度（基于拉普拉斯算子）"""
         try:
-            image = cv2.imread(image_path)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(load_bgr_image(image), cv2.COLOR_BGR2GRAY)
             
             # 计算拉普拉斯算子
             laplacian = cv2.Laplacian(gray, cv2.CV_64F)
@@ -69,11 +150,10 @@ class ImageAnalyzer:
             logger.error(f"清晰度分析失败: {str(e)}")
             return 0.0
     
-    def analyze_lighting(self, image_path: str) -> float:
+    def analyze_lighting(self, image: ImageInput) -> float:
         """分析光照质量"""
         try:
-            image = cv2.imread(image_path)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(load_bgr_image(image), cv2.COLOR_BGR2GRAY)
             
             # 计算直方图
             hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
@@ -111,33 +191,25 @@ class ImageAnalyzer:
             logger.error(f"光照分析失败: {str(e)}")
             return 0.0
     
-    def detect_faces(self, image_path: str) -> Tuple[bool, int]:
-        """检测人脸"""
+    def detect_objects(self, image: ImageInput) -> List[Dict]:
+        """YOLO目标检测（全部类别）"""
         try:
-            results = self.yolo_model(image_path)
-            
-            face_count = 0
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        cls = int(box.cls[0])
-                        # YOLOv8 中 person 类别为 0
-                        if cls == 0:
-                            face_count += 1
-            
-            return face_count > 0, face_count
+            return self.inference_backend.detect(image)
             
         except Exception as e:
             logger.error(f"人脸检测失败: {str(e)}")
-            return False, 0
+            return []
+    
+    def detect_faces(self, image: ImageInput) -> Tuple[bool, int]:
+        """检测人脸"""
+        return faces_from_detections(self.detect_objects(image))
     
-    def detect_watermark(self, image_path: str) -> Tuple[bool, Optional[str]]:
+    def detect_watermark(self, image: ImageInput) -> Tuple[bool, Optional[str]]:
         """检测水印/文字"""
         try:
             # 检查图像文件是否存在
-            if not os.path.exists(image_path):
-                logger.error(f"图像文件不存在: {image_path}")
+            if isinstance(image, str) and not os.path.exists(image):
+                logger.error(f"图像文件不存在: {image}")
                 return False, None
             
             # 检查OCR模型是否正确加载
@@ -145,23 +217,20 @@ class ImageAnalyzer:
                 logger.error("OCR模型未正确加载")
                 return False, None
             
-            # 验证图像文件是否可读
+            # 验证图像是否可读
             try:
-                test_image = cv2.imread(image_path)
-                if test_image is None:
-                    logger.error(f"无法读取图像文件: {image_path}")
-                    return False, None
+                test_image = load_bgr_image(image)
                 logger.debug(f"图像尺寸: {test_image.shape}")
             except Exception as img_error:
                 logger.error(f"图像读取失败: {str(img_error)}")
                 return False, None
             
             # 使用OCR检测文字
-            logger.debug(f"开始OCR检测: {image_path}")
+            logger.debug(f"开始OCR检测: {image if isinstance(image, str) else '内存帧'}")
             
-            # 使用正确的easyocr API调用方式
+            # easyocr 按RGB处理数组输入（与其读取文件路径时相同），BGR帧先转换
             try:
-                results = self.ocr_reader.readtext(image_path)
+                results = self.ocr_reader.readtext(cv2.cvtColor(test_image, cv2.COLOR_BGR2RGB))
                 logger.debug(f"OCR原始结果类型: {type(results)}")
                 logger.debug(f"OCR原始结果: {results}")
             except Exception as ocr_error:
@@ -201,117 +270,92 @@ class ImageAnalyzer:
             # 返回默认值而不是抛出异常
             return False, None
     
-    def analyze_content_richness(self, image_path: str) -> float:
+    def analyze_content_richness(self, image: ImageInput) -> float:
         """分析内容丰富度（使用CLIP）"""
+        return self.analyze_content_features_batch([image])[0][0]
+    
+    def analyze_content_richness_batch(self, images: List) -> List[float]:
+        """批量分析内容丰富度：整批预处理并一次前向（images 为路径或BGR数组）"""
+        return self.analyze_content_features_batch(images)[0]
+    
+    def analyze_content_features_batch(self, images: List) -> Tuple[List[float], List[Optional[np.ndarray]]]:
+        """批量计算内容丰富度和CLIP图像嵌入（L2归一化），返回 (评分列表, 嵌入列表)"""
         try:
-            # 预定义的丰富内容描述
-            rich_descriptions = [
-                "detailed scene with many objects",
-                "complex composition with multiple elements",
-                "rich visual content with various textures",
-                "busy scene with lots of activity",
-                "diverse visual elements and colors"
-            ]
-            
-            poor_descriptions = [
-                "simple background",
-                "minimal content",
-                "empty scene",
-                "plain surface",
-                "basic composition"
-            ]
-            
-            # 加载图像
-            image = Image.open(image_path)
-            
-            # 处理图像和文本
-            inputs = self.clip_processor(
-                text=rich_descriptions + poor_descriptions,
-                images=image,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            # 移动到设备
-            for k, v in inputs.items():
-                if hasattr(v, 'to'):
-                    inputs[k] = v.to(Config.DEVICE)
-            
-            # 计算相似度
-            with torch.no_grad():
-                outputs = self.clip_model(**inputs)
-                logits_per_image = outputs.logits_per_image
-                
-                # 计算与丰富内容的平均相似度
-                rich_scores = logits_per_image[0, :len(rich_descriptions)]
-                poor_scores = logits_per_image[0, len(rich_descriptions):]
-                
-                avg_rich_score = torch.mean(rich_scores).item()
-                avg_poor_score = torch.mean(poor_scores).item()
-                
-                # 转换为0-100评分
-                score = (avg_rich_score - avg_poor_score + 2) * 25  # 假设分数范围在-2到2之间
-                score = max(0, min(100, score))
-                
-                return score
-                
+            # 计算图像与各描述的相似度（与 clip_logits_batch 相同，保留图像嵌入）
+            backend = self.inference_backend
+            image_embeds = backend.encode_images(images)
+            text_embeds = backend.encode_texts(RICH_DESCRIPTIONS + POOR_DESCRIPTIONS)
+            logits = backend.logit_scale * (image_embeds @ text_embeds.T)
+            return [content_richness_from_logits(row) for row in logits], list(image_embeds)
         except Exception as e:
             logger.error(f"内容丰富度分析失败: {str(e)}")
-            return 50.0  # 返回中等分数
+            return [50.0] * len(images), [None] * len(images)  # 返回中等分数
+    
+    def _run_analyzers(self, image: np.ndarray, names: Sequence[str] = None) -> Tuple[Dict, Dict[str, float]]:
+        """执行各项分析（names 为空时执行构造时指定的全部分析项），返回 (结果, 各项耗时)
+        
+        并行模式下各项分析提交到共享线程池（OpenCV/NumPy 和模型推理大部分时间释放GIL），
+        结果按分析项名称收集，与串行执行完全一致。
+        """
+        features = {}
+        
+        def detect_faces(frame):
+            features['detections'] = self.detect_objects(frame)
+            return faces_from_detections(features['detections'])
+        
+        def analyze_content(frame):
+            scores, embeddings = self.analyze_content_features_batch([frame])
+            features['clip_embedding'] = embeddings[0]
+            return scores[0]
+        
+        analyzers = {
+            'clarity': self.analyze_clarity,
+            'lighting': self.analyze_lighting,
+            'face': detect_faces,
+            'watermark': self.detect_watermark,
+            'content': analyze_content
+        }
+        
+        def timed(name):
+            start = time.perf_counter()
+            value = analyzers[name](image)
+            return value, time.perf_counter() - start
+        
+        names = list(names or self.analyzers)
+        unloaded = [name for name in names if name not in self.analyzers]
+        if unloaded:
+            raise ValueError(f"分析项所需模型未加载: {', '.join(unloaded)}")
+        if Config.PARALLEL_FRAME_ANALYSIS and len(names) > 1:
+            executor = get_analysis_executor()
+            futures = {name: executor.submit(timed, name) for name in names}
+            outcomes = {name: future.result() for name, future in futures.items()}
+        else:
+            outcomes = {name: timed(name) for name in names}
+        
+        values = {name: outcome[0] for name, outcome in outcomes.items()}
+        timings = {name: round(outcome[1], 4) for name, outcome in outcomes.items()}
+        if Config.FEATURE_STORE_ENABLED:
+            values.update({key: value for key, value in features.items() if value is not None})
+            values['phash'] = perceptual_hash(image)
+        return values, timings
     
-    def analyze_frame(self, image_path: str) -> Dict:
-        """综合分析单帧图像"""
+    def analyze_frame(self, image: ImageInput, analyzers: Sequence[str] = None) -> Dict:
+        """综合分析单帧图像（image 为帧文件路径或BGR数组，analyzers 为空时执行全部分析项）"""
         try:
-            logger.info(f"开始分析帧: {image_path}")
+            logger.info(f"开始分析帧: {image if isinstance(image, str) else '内存帧'}")
             
-            # 并行分析各项指标
-            clarity_score = self.analyze_clarity(image_path)
-            lighting_score = self.analyze_lighting(image_path)
-            face_detected, face_count = self.detect_faces(image_path)
-            watermark_detected, watermark_text = self.detect_watermark(image_path)
-            content_richness = self.analyze_content_richness(image_path)
-            
-            # 计算综合评分
-            weights = {
-                'clarity': 0.3,
-                'lighting': 0.25,
-                'content': 0.25,
-                'face': 0.1,
-                'watermark': 0.1
-            }
-            
-            overall_score = (
-                clarity_score * weights['clarity'] +
-                lighting_score * weights['lighting'] +
-                content_richness * weights['content'] +
-                (100 if not watermark_detected else 50) * weights['watermark'] +
-                (100 if face_detected else 70) * weights['face']
-            )
-            
-            # 收集问题
-            issues = []
-            if clarity_score < 50:
-                issues.append("图像模糊")
-            if lighting_score < 50:
-                issues.append("光照问题")
-            if watermark_detected:
-                issues.append("检测到水印")
-            if content_richness < 30:
-                issues.append("内容单调")
+            # 帧只解码一次，各项分析共享
+            start = time.perf_counter()
+            frame = load_bgr_image(image)
+            decode_seconds = time.perf_counter() - start
             
-            result = {
-                'clarity_score': clarity_score,
-                'lighting_score': lighting_score,
-                'face_detected': face_detected,
-                'face_count': face_count,
-                'watermark_detected': watermark_detected,
-                'watermark_text': watermark_text,
-                'content_richness': content_richness,
-                'overall_score': overall_score,
-                'issues': issues
-            }
+            # 并行分析各项指标
+            values, timings = self._run_analyzers(frame, analyzers)
+            timings['decode'] = round(decode_seconds, 4)
+            timings['total'] = round(time.perf_counter() - start, 4)
             
-            logger.info(f"帧分析完成: 综合评分 {overall_score:.1f}")
+            result = self.build_frame_result(values, timings)
+            logger.info(f"帧分析完成: 综合评分 {result['overall_score']:.1f}")
             return result
             
         except Exception as e:
@@ -326,4 +370,45 @@ class ImageAnalyzer:
                 'content_richness': 0,
                 'overall_score': 0,
                 'issues': [f"分析失败: {str(e)}"]
-            } 
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def build_frame_result(values: Dict, timings: Dict[str, float] = None) -> Dict:
+        """由各分析项结果（FRAME_ANALYZERS 为键）计算综合评分和问题列表（不使用模型，无需实例）
+        
+        原始指标单独保存在 metrics 中，综合评分和问题由 ScoringEngine 按 Config.ANALYSIS_WEIGHTS
+        和阈值计算，之后可用新的权重/阈值重新评分而无需重新分析。
+        未执行的分析项（如按时间预算跳过）取默认值，不参与综合评分，权重按已执行项重新归一化。
+        """
+        values = dict(values)
+        features = {key: values.pop(key) for key in FEATURE_KEYS if key in values}
+        skipped = [name for name in FRAME_ANALYZERS if name not in values]
+        metrics = frame_metrics(values)
+        overall_score, issues = ScoringEngine().score_frame(metrics)
+        
+        values = {**SKIPPED_ANALYZER_VALUES, **values}
+        clarity_score = values['clarity']
+        lighting_score = values['lighting']
+        face_detected, face_count = values['face']
+        watermark_detected, watermark_text = values['watermark']
+        content_richness = values['content']
+        
+        result = {
+            'clarity_score': clarity_score,
+            'lighting_score': lighting_score,
+            'face_detected': face_detected,
+            'face_count': face_count,
+            'watermark_detected': watermark_detected,
+            'watermark_text': watermark_text,
+            'content_richness': content_richness,
+            'overall_score': overall_score,
+            'issues': issues,
+            'metrics': metrics,
+            'timings': timings or {}
+        }
+        if skipped:
+            result['skipped_analyzers'] = skipped
+        if features:
+            # 非JSON数据，写入特征库后由调用方移除
+            result['features'] = features
+        return result
\ No newline at end of file
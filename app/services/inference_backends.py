@@ -0,0 +1,361 @@
+import os
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import Config
+from app.services.clip_preprocess import ClipBatchPreprocessor
+
+logger = logging.getLogger(__name__)
+
+ImageInput = Union[str, np.ndarray]
+
+def load_bgr_image(image: ImageInput) -> np.ndarray:
+    """读取BGR图像（支持文件路径或已解码的数组）"""
+    if isinstance(image, np.ndarray):
+        return image
+    frame = cv2.imread(image)
+    if frame is None:
+        raise ValueError(f"无法读取图像文件: {image}")
+    return frame
+
+def _to_pil_rgb(image: ImageInput) -> Image.Image:
+    """转换为PIL RGB图像（CLIPProcessor 的输入格式）"""
+    return Image.fromarray(cv2.cvtColor(load_bgr_image(image), cv2.COLOR_BGR2RGB))
+
+def _build_preprocessor(clip_processor) -> Optional[ClipBatchPreprocessor]:
+    """按配置启用批量向量化预处理"""
+    if not Config.CLIP_FAST_PREPROCESS:
+        return None
+    return ClipBatchPreprocessor.from_processor(clip_processor)
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+class InferenceBackend(ABC):
+    """YOLO目标检测 + CLIP图文匹配的推理后端接口
+    
+    detect 返回 [{'class_id', 'confidence', 'box': [x1, y1, x2, y2]}]；
+    encode_images / encode_texts 返回L2归一化后的float32嵌入。
+    """
+    
+    name = "base"
+    
+    def __init__(self, intra_op_threads: int = 0):
+        # 模型推理的intra-op线程数，0 表示使用框架默认值
+        self.intra_op_threads = intra_op_threads
+        self.logit_scale = 100.0
+        self.clip_processor = None
+        self.preprocessor: Optional[ClipBatchPreprocessor] = None
+        self._text_cache: Dict[tuple, np.ndarray] = {}
+    
+    @abstractmethod
+    def load(self):
+        """加载模型"""
+    
+    @abstractmethod
+    def detect(self, image: ImageInput) -> List[Dict]:
+        """目标检测"""
+    
+    @abstractmethod
+    def encode_images(self, images: Sequence[ImageInput]) -> np.ndarray:
+        """计算图像嵌入"""
+    
+    def _pixel_values(self, images: Sequence[ImageInput]) -> np.ndarray:
+        """CLIP图像预处理，输出 (N, 3, 224, 224) float32"""
+        if self.preprocessor is not None:
+            return self.preprocessor([load_bgr_image(image) for image in images])
+        inputs = self.clip_processor(images=[_to_pil_rgb(image) for image in images], return_tensors="np")
+        return inputs['pixel_values'].astype(np.float32)
+    
+    @abstractmethod
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """计算文本嵌入（L2归一化）"""
+    
+    def encode_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """计算文本嵌入（同一组文本只编码一次）"""
+        key = tuple(texts)
+        if key not in self._text_cache:
+            self._text_cache[key] = self._encode_texts(list(texts))
+        return self._text_cache[key]
+    
+    def clip_logits_batch(self, images: Sequence[ImageInput], texts: Sequence[str]) -> np.ndarray:
+        """一批图像与各文本的CLIP相似度logits，形状 (图像数, 文本数)"""
+        image_embeds = self.encode_images(images)
+        text_embeds = self.encode_texts(texts)
+        return self.logit_scale * (image_embeds @ text_embeds.T)
+    
+    def clip_logits(self, image: ImageInput, texts: Sequence[str]) -> np.ndarray:
+        """单张图像与各文本的CLIP相似度logits（与 CLIPModel.logits_per_image 一致）"""
+        return self.clip_logits_batch([image], texts)[0]
+
+class PyTorchBackend(InferenceBackend):
+    """ultralytics YOLO + transformers CLIP（PyTorch eager）"""
+    
+    name = "pytorch"
+    
+    def load(self):
+        import torch
+        from transformers import CLIPProcessor, CLIPModel
+        from ultralytics import YOLO
+        
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        
+        self.yolo_model = YOLO(Config.YOLO_MODEL)
+        self.yolo_model.to(Config.DEVICE)
+        logger.info("YOLOv8 模型加载完成")
+        
+        self.clip_model = CLIPModel.from_pretrained(Config.CLIP_MODEL).to(Config.DEVICE)
+        self.clip_model.eval()
+        self.clip_processor = CLIPProcessor.from_pretrained(Config.CLIP_MODEL)
+        # 确保clip_processor是处理器实例而不是tuple
+        if isinstance(self.clip_processor, tuple):
+            self.clip_processor = self.clip_processor[0]
+        self.logit_scale = self.clip_model.logit_scale.exp().item()
+        self.preprocessor = _build_preprocessor(self.clip_processor)
+        self._torch = torch
+        logger.info("CLIP 模型加载完成")
+    
+    def detect(self, image: ImageInput) -> List[Dict]:
+        results = self.yolo_model(image, verbose=False)
+        
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None:
+                continue
+            classes = boxes.cls.cpu().numpy()
+            confidences = boxes.conf.cpu().numpy()
+            xyxy = boxes.xyxy.cpu().numpy()
+            for cls, conf, box in zip(classes, confidences, xyxy):
+                detections.append({
+                    'class_id': int(cls),
+                    'confidence': float(conf),
+                    'box': [float(v) for v in box]
+                })
+        return detections
+    
+    def encode_images(self, images: Sequence[ImageInput]) -> np.ndarray:
+        pixel_values = self._torch.from_numpy(self._pixel_values(images)).to(Config.DEVICE)
+        with self._torch.no_grad():
+            embeds = self.clip_model.get_image_features(pixel_values=pixel_values)
+        return _l2_normalize(embeds.cpu().numpy().astype(np.float32))
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        inputs = self.clip_processor(text=texts, return_tensors="pt", padding=True)
+        with self._torch.no_grad():
+            embeds = self.clip_model.get_text_features(
+                input_ids=inputs['input_ids'].to(Config.DEVICE),
+                attention_mask=inputs['attention_mask'].to(Config.DEVICE)
+            )
+        return _l2_normalize(embeds.cpu().numpy().astype(np.float32))
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """ONNX Runtime 后端（CPU），首次使用时导出ONNX并缓存在权重旁，可选动态int8量化"""
+    
+    name = "onnxruntime"
+    
+    def __init__(self, quantize: bool = None, intra_op_threads: int = 0):
+        super().__init__(intra_op_threads)
+        self.quantize = Config.ONNX_QUANTIZE_INT8 if quantize is None else quantize
+        self.image_size = Config.YOLO_IMAGE_SIZE
+    
+    def _artifact_path(self, path: str) -> str:
+        """量化模式下使用 .int8.onnx 文件"""
+        if not self.quantize:
+            return path
+        quantized_path = path[:-len('.onnx')] + '.int8.onnx'
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            logger.info(f"正在进行int8动态量化: {quantized_path}")
+            quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+    
+    def _export_yolo(self) -> str:
+        """导出YOLO为ONNX（ultralytics 默认写在 .pt 旁）"""
+        onnx_path = os.path.splitext(Config.YOLO_MODEL)[0] + '.onnx'
+        if not os.path.exists(onnx_path):
+            from ultralytics import YOLO
+            logger.info(f"正在导出YOLO ONNX模型: {onnx_path}")
+            onnx_path = YOLO(Config.YOLO_MODEL).export(format='onnx', imgsz=self.image_size, dynamic=False)
+        return onnx_path
+    
+    def _clip_export_dir(self) -> str:
+        """CLIP权重所在目录（HuggingFace缓存快照目录或本地模型目录）"""
+        if os.path.isdir(Config.CLIP_MODEL):
+            return Config.CLIP_MODEL
+        from transformers.utils import cached_file
+        return os.path.dirname(cached_file(Config.CLIP_MODEL, 'config.json'))
+    
+    def _export_clip(self) -> Dict[str, str]:
+        """导出CLIP图像/文本编码器为ONNX，并保存logit_scale"""
+        export_dir = self._clip_export_dir()
+        paths = {
+            'vision': os.path.join(export_dir, 'clip_vision.onnx'),
+            'text': os.path.join(export_dir, 'clip_text.onnx'),
+            'meta': os.path.join(export_dir, 'clip_onnx_meta.json')
+        }
+        if all(os.path.exists(path) for path in paths.values()):
+            return paths
+        
+        import torch
+        from transformers import CLIPModel
+        
+        logger.info(f"正在导出CLIP ONNX模型: {export_dir}")
+        model = CLIPModel.from_pretrained(Config.CLIP_MODEL).eval()
+        
+        class VisionEncoder(torch.nn.Module):
+            def __init__(self, clip):
+                super().__init__()
+                self.clip = clip
+            
+            def forward(self, pixel_values):
+                return self.clip.get_image_features(pixel_values=pixel_values)
+        
+        class TextEncoder(torch.nn.Module):
+            def __init__(self, clip):
+                super().__init__()
+                self.clip = clip
+            
+            def forward(self, input_ids, attention_mask):
+                return self.clip.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+        
+        with torch.no_grad():
+            torch.onnx.export(
+                VisionEncoder(model),
+                (torch.zeros(1, 3, 224, 224),),
+                paths['vision'],
+                input_names=['pixel_values'],
+                output_names=['image_embeds'],
+                dynamic_axes={'pixel_values': {0: 'batch'}, 'image_embeds': {0: 'batch'}},
+                opset_version=14
+            )
+            torch.onnx.export(
+                TextEncoder(model),
+                (torch.ones(1, 8, dtype=torch.long), torch.ones(1, 8, dtype=torch.long)),
+                paths['text'],
+                input_names=['input_ids', 'attention_mask'],
+                output_names=['text_embeds'],
+                dynamic_axes={
+                    'input_ids': {0: 'batch', 1: 'sequence'},
+                    'attention_mask': {0: 'batch', 1: 'sequence'},
+                    'text_embeds': {0: 'batch'}
+                },
+                opset_version=14
+            )
+        
+        with open(paths['meta'], 'w', encoding='utf-8') as f:
+            json.dump({'logit_scale': model.logit_scale.exp().item()}, f)
+        
+        return paths
+    
+    def load(self):
+        import onnxruntime as ort
+        from transformers import CLIPProcessor
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        providers = ['CPUExecutionProvider']
+        
+        yolo_path = self._artifact_path(self._export_yolo())
+        self.yolo_session = ort.InferenceSession(yolo_path, options, providers=providers)
+        logger.info(f"YOLOv8 ONNX 模型加载完成: {yolo_path}")
+        
+        clip_paths = self._export_clip()
+        self.clip_vision_session = ort.InferenceSession(self._artifact_path(clip_paths['vision']), options, providers=providers)
+        self.clip_text_session = ort.InferenceSession(self._artifact_path(clip_paths['text']), options, providers=providers)
+        with open(clip_paths['meta'], encoding='utf-8') as f:
+            self.logit_scale = json.load(f)['logit_scale']
+        
+        self.clip_processor = CLIPProcessor.from_pretrained(Config.CLIP_MODEL)
+        if isinstance(self.clip_processor, tuple):
+            self.clip_processor = self.clip_processor[0]
+        self.preprocessor = _build_preprocessor(self.clip_processor)
+        logger.info(f"CLIP ONNX 模型加载完成{'（int8）' if self.quantize else ''}")
+    
+    def _letterbox(self, frame: np.ndarray):
+        """等比缩放并填充到方形输入（与ultralytics预处理一致）"""
+        h, w = frame.shape[:2]
+        scale = min(self.image_size / h, self.image_size / w)
+        new_h, new_w = int(round(h * scale)), int(round(w * scale))
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        
+        pad_top = (self.image_size - new_h) // 2
+        pad_left = (self.image_size - new_w) // 2
+        canvas = np.full((self.image_size, self.image_size, 3), 114, dtype=np.uint8)
+        canvas[pad_top:pad_top + new_h, pad_left:pad_left + new_w] = resized
+        return canvas, scale, pad_left, pad_top
+    
+    def detect(self, image: ImageInput) -> List[Dict]:
+        frame = load_bgr_image(image)
+        canvas, scale, pad_left, pad_top = self._letterbox(frame)
+        blob = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        
+        # 输出形状 (1, 4 + 类别数, 候选框数)
+        output = self.yolo_session.run(None, {self.yolo_session.get_inputs()[0].name: blob})[0]
+        predictions = output[0].T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+        
+        keep = confidences > Config.YOLO_CONF_THRESHOLD
+        if not np.any(keep):
+            return []
+        boxes_cxcywh = predictions[keep, :4]
+        class_ids = class_ids[keep]
+        confidences = confidences[keep]
+        
+        boxes_xywh = boxes_cxcywh.copy()
+        boxes_xywh[:, 0] -= boxes_cxcywh[:, 2] / 2
+        boxes_xywh[:, 1] -= boxes_cxcywh[:, 3] / 2
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes_xywh.tolist(), confidences.tolist(), class_ids.tolist(),
+            Config.YOLO_CONF_THRESHOLD, Config.YOLO_IOU_THRESHOLD
+        )
+        
+        detections = []
+        for i in np.array(indices).reshape(-1):
+            x, y, w, h = boxes_xywh[i]
+            # 映射回原图坐标
+            x1 = (x - pad_left) / scale
+            y1 = (y - pad_top) / scale
+            detections.append({
+                'class_id': int(class_ids[i]),
+                'confidence': float(confidences[i]),
+                'box': [float(x1), float(y1), float(x1 + w / scale), float(y1 + h / scale)]
+            })
+        return detections
+    
+    def encode_images(self, images: Sequence[ImageInput]) -> np.ndarray:
+        embeds = self.clip_vision_session.run(None, {'pixel_values': self._pixel_values(images)})[0]
+        return _l2_normalize(embeds.astype(np.float32))
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        inputs = self.clip_processor(text=texts, return_tensors="np", padding=True)
+        embeds = self.clip_text_session.run(None, {
+            'input_ids': inputs['input_ids'].astype(np.int64),
+            'attention_mask': inputs['attention_mask'].astype(np.int64)
+        })[0]
+        return _l2_normalize(embeds.astype(np.float32))
+
+INFERENCE_BACKENDS = {
+    PyTorchBackend.name: PyTorchBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend
+}
+
+def get_inference_backend(name: str = None, **kwargs) -> InferenceBackend:
+    """根据名称（默认取 Config.INFERENCE_BACKEND）创建并加载推理后端"""
+    name = name or Config.INFERENCE_BACKEND
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"不支持的推理后端: {name}，可选: {', '.join(INFERENCE_BACKENDS)}")
+    backend = INFERENCE_BACKENDS[name](**kwargs)
+    backend.load()
+    return backend
\ No newline at end of file
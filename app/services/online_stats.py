@@ -0,0 +1,242 @@
+import math
+import logging
+from collections import Counter
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 汇总统计的指标：(统计名, 帧结果字段)
+SUMMARY_METRICS = [
+    ('clarity', 'clarity_score'),
+    ('lighting', 'lighting_score'),
+    ('content_richness', 'content_richness'),
+    ('overall_score', 'overall_score')
+]
+
+def _percentile_key(percentile: float) -> str:
+    return f"p{percentile:g}"
+
+def _exact_quantile(values: Sequence[float], p: float) -> float:
+    """线性插值分位数（与 np.percentile 默认方法一致）"""
+    ordered = sorted(values)
+    position = p * (len(ordered) - 1)
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class P2Quantile:
+    """P² 算法（Jain & Chlamtac）流式估计单个分位数，只保存5个标记，常数内存
+    
+    前5个值精确计算，之后按抛物线插值调整标记高度。
+    """
+    
+    def __init__(self, p: float):
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+    
+    def add(self, x: float):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            if len(heights) == 5:
+                heights.sort()
+            return
+        
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        
+        for i in (1, 2, 3):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+    
+    def _parabolic(self, i: int, step: int) -> float:
+        h, n = self.heights, self.positions
+        return h[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+    
+    def value(self) -> float:
+        if not self.heights:
+            return 0.0
+        if len(self.heights) < 5:
+            return float(_exact_quantile(self.heights, self.p))
+        return float(self.heights[2])
+
+class RunningStats:
+    """Welford 在线均值/方差
+    
+    sample_variance 为样本方差（除以 n-1，用于估计总体、置信区间），
+    population_std 为总体标准差（除以 n，与 np.std 默认一致，用于描述已分析的帧）。
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+    
+    def add(self, x: float):
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+    
+    @property
+    def sample_variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def population_std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+    
+    def confidence_interval(self, confidence: float, population: int = None,
+                            min_std: float = 0.0) -> Tuple[float, float]:
+        """均值的置信区间（t 分布近似）；给出总体大小时做有限总体修正（不放回抽样）
+        
+        min_std 为标准差下限：少量样本恰好相同时样本方差为0，区间不应因此退化为一个点。
+        """
+        if self.count < 2:
+            return float('-inf'), float('inf')
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        df = self.count - 1
+        # Cornish-Fisher 展开近似 t 分位数，避免依赖 scipy
+        t = z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+        standard_error = max(math.sqrt(self.sample_variance), min_std) / math.sqrt(self.count)
+        if population and population > 1:
+            standard_error *= math.sqrt(max(0.0, (population - self.count) / (population - 1)))
+        return self.mean - t * standard_error, self.mean + t * standard_error
+
+class SummaryStats(RunningStats):
+    """在 RunningStats 之上增加最小/最大值和 P² 分位数
+    
+    P² 在样本很少时误差较大，前 exact_samples 个值另外保留，此时分位数精确计算；超过后只用 P²。
+    """
+    
+    def __init__(self, percentiles: Sequence[float] = None, exact_samples: int = None):
+        super().__init__()
+        self.min = math.inf
+        self.max = -math.inf
+        self.quantiles = {p: P2Quantile(p / 100) for p in (percentiles or Config.SUMMARY_PERCENTILES)}
+        self.exact_samples = Config.SUMMARY_EXACT_SAMPLES if exact_samples is None else exact_samples
+        self._samples: Optional[List[float]] = []
+    
+    def add(self, x: float):
+        x = float(x)
+        super().add(x)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for quantile in self.quantiles.values():
+            quantile.add(x)
+        if self._samples is not None:
+            self._samples.append(x)
+            if len(self._samples) > self.exact_samples:
+                self._samples = None
+    
+    def percentile(self, p: float) -> float:
+        if self._samples:
+            return float(_exact_quantile(self._samples, p / 100))
+        return self.quantiles[p].value()
+    
+    def to_dict(self) -> Dict[str, float]:
+        if not self.count:
+            return {'mean': 0.0, 'std': 0.0, 'min': 0.0, 'max': 0.0,
+                    **{_percentile_key(p): 0.0 for p in self.quantiles}}
+        return {
+            'mean': self.mean,
+            'std': self.population_std,
+            'min': self.min,
+            'max': self.max,
+            **{_percentile_key(p): self.percentile(p) for p in self.quantiles}
+        }
+
+def column_statistics(values: np.ndarray, percentiles: Sequence[float] = None) -> Dict[str, float]:
+    """与 SummaryStats.to_dict 相同结构的精确统计（已有整列数据时使用，如重新评分）"""
+    percentiles = percentiles or Config.SUMMARY_PERCENTILES
+    if not len(values):
+        return {'mean': 0.0, 'std': 0.0, 'min': 0.0, 'max': 0.0, **{_percentile_key(p): 0.0 for p in percentiles}}
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        **{_percentile_key(p): float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+    }
+
+class SummaryAggregator:
+    """逐帧更新的结果汇总：帧完成时 add()，随时可得到与 summarize_frames 相同结构的 summary
+    
+    各指标的均值、方差、最小/最大值和分位数、人脸/水印检测率及问题计数都在线更新，内存与帧数无关，
+    生成最终结果时不再遍历帧列表。
+    """
+    
+    def __init__(self, percentiles: Sequence[float] = None):
+        self.count = 0
+        self.stats = {name: SummaryStats(percentiles) for name, _ in SUMMARY_METRICS}
+        self.face_frames = 0
+        self.watermark_frames = 0
+        self.issue_counts: Counter = Counter()
+    
+    def add(self, frame_analysis: Dict):
+        self.count += 1
+        for name, field in SUMMARY_METRICS:
+            self.stats[name].add(frame_analysis.get(field, 0.0))
+        self.face_frames += bool(frame_analysis.get('face_detected'))
+        self.watermark_frames += bool(frame_analysis.get('watermark_detected'))
+        self.issue_counts.update(frame_analysis.get('issues', []))
+    
+    def extend(self, frame_analyses: Sequence[Dict]):
+        for frame_analysis in frame_analyses:
+            self.add(frame_analysis)
+    
+    @property
+    def overall_score(self) -> float:
+        return self.stats['overall_score'].mean
+    
+    def summary(self, audio_analysis: Optional[Dict] = None) -> Dict:
+        count = max(self.count, 1)
+        summary = {
+            "avg_clarity": self.stats['clarity'].mean,
+            "avg_lighting": self.stats['lighting'].mean,
+            "face_detection_rate": self.face_frames / count,
+            "watermark_detection_rate": self.watermark_frames / count,
+            "avg_content_richness": self.stats['content_richness'].mean,
+            "statistics": {name: stats.to_dict() for name, stats in self.stats.items()},
+            "issue_counts": dict(self.issue_counts)
+        }
+        if audio_analysis is not None:
+            summary.update(audio_summary(audio_analysis))
+        return summary
+
+def audio_summary(audio_analysis: Dict) -> Dict:
+    return {
+        "audio_quality_score": audio_analysis.get('audio_quality', {}).get('quality_score', 0) if audio_analysis.get('success') else 0,
+        "has_audio_transcription": audio_analysis.get('success', False) and bool(audio_analysis.get('transcription', {}).get('text', ''))
+    }
\ No newline at end of file
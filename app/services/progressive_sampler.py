@@ -0,0 +1,99 @@
+import logging
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config import Config
+from app.services.analysis_pipeline import AnalysisPipeline
+
+logger = logging.getLogger(__name__)
+
+class ProgressiveSampler:
+    """由粗到细的渐进式采样分析
+    
+    第0轮按 initial_interval 稀疏采样整段视频，尽快得到初步结果；之后每一轮在相邻采样点之间
+    检查指标突变（清晰度/光照差值超过 change_threshold）或出现 refine_issues 中的问题，
+    对这些区间取中点补采样，直到区间小于 min_interval、没有待细化区间或达到 max_levels。
+    每轮结束调用 on_pass，should_stop 返回 True 时在当前轮结束后停止。
+    
+    帧结果的 frame_number 与其他模式一样为采样序号（按采样先后编号，各轮之间保持不变），
+    video_frame 为视频中的帧序号。
+    """
+    
+    def __init__(self, image_analyzer, analyzers: Sequence[str] = None,
+                 initial_interval: float = None, min_interval: float = None,
+                 change_threshold: float = None, max_levels: int = None,
+                 refine_issues: Sequence[str] = None):
+        self.image_analyzer = image_analyzer
+        self.analyzers = analyzers
+        self.initial_interval = initial_interval or Config.PROGRESSIVE_INITIAL_INTERVAL
+        self.min_interval = min_interval or Config.PROGRESSIVE_MIN_INTERVAL
+        self.change_threshold = Config.PROGRESSIVE_CHANGE_THRESHOLD if change_threshold is None else change_threshold
+        self.max_levels = Config.PROGRESSIVE_MAX_LEVELS if max_levels is None else max_levels
+        self.refine_issues = set(refine_issues or Config.PROGRESSIVE_REFINE_ISSUES)
+    
+    def _needs_refinement(self, a: Dict, b: Dict) -> bool:
+        if abs(a['clarity_score'] - b['clarity_score']) >= self.change_threshold:
+            return True
+        if abs(a['lighting_score'] - b['lighting_score']) >= self.change_threshold:
+            return True
+        return bool(self.refine_issues & (set(a['issues']) | set(b['issues'])))
+    
+    def refine_positions(self, frames: List[Dict], fps: float) -> List[int]:
+        """待补采样的视频帧序号：需要细化且足够宽的相邻区间的中点"""
+        min_gap = max(2, int(round(2 * self.min_interval * fps)))
+        positions = []
+        for a, b in zip(frames, frames[1:]):
+            if b['video_frame'] - a['video_frame'] >= min_gap and self._needs_refinement(a, b):
+                positions.append((a['video_frame'] + b['video_frame']) // 2)
+        return positions
+    
+    @staticmethod
+    def _decode(cap: cv2.VideoCapture, positions: List[int], fps: float,
+                start: int) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """解码 positions 处的帧，采样序号从 start 开始连续编号"""
+        for k, position in enumerate(positions):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            ret, frame = cap.read()
+            if ret:
+                yield start + k, position / fps, frame
+    
+    def run(self, video_path: str, on_pass: Callable[[List[Dict], int], None] = None,
+            should_stop: Callable[[], bool] = None) -> List[Dict]:
+        """逐轮分析，返回按时间顺序的全部帧结果"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        
+        frames: List[Dict] = []
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            step = max(1, int(fps * self.initial_interval))
+            positions = list(range(0, total_frames, step))
+            if positions and total_frames - 1 > positions[-1]:
+                # 末尾也采样，保证最后一段可以被细化
+                positions.append(total_frames - 1)
+            
+            level = 0
+            sampled = 0
+            while positions:
+                pipeline = AnalysisPipeline(self.image_analyzer, analyzers=self.analyzers)
+                new_frames = pipeline.run(self._decode(cap, positions, fps, sampled))
+                for frame in new_frames:
+                    frame['video_frame'] = positions[frame['frame_number'] - sampled]
+                    frame['refinement_level'] = level
+                sampled += len(positions)
+                frames = sorted(frames + new_frames, key=lambda f: f['video_frame'])
+                logger.info(f"渐进分析第 {level} 轮: 新增 {len(new_frames)} 帧, 共 {len(frames)} 帧")
+                
+                if on_pass is not None:
+                    on_pass(frames, level)
+                if level >= self.max_levels or (should_stop is not None and should_stop()):
+                    break
+                positions = self.refine_positions(frames, fps)
+                level += 1
+        finally:
+            cap.release()
+        return frames
\ No newline at end of file
@@ -0,0 +1,392 @@
+import os
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 列式存储的两张表及各自的时间列
+TABLE_TIME_COLUMNS = {'frames': 'timestamp', 'segments': 'start'}
+
+# 嵌套字典的键以 "." 连接为列名；列名后缀用于辅助列
+ABSENT_SUFFIX = '#absent'  # 该行没有这个键（与值为 None 区分）
+NULL_SUFFIX = '#null'  # 该行的值为 None（npz 格式）
+OFFSETS_SUFFIX = '#offsets'  # 列表列的行偏移（npz 格式）
+JSON_SUFFIX = '#json'  # 无法按列存储的值以JSON文本保存
+
+_ABSENT = object()
+
+def _flatten(record: Dict, prefix: str = '') -> Iterator[Tuple[str, Any]]:
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, f"{name}.")
+        else:
+            yield name, value
+
+def flatten_records(records: Sequence[Dict]) -> Dict[str, List]:
+    """记录列表展开为列：嵌套字典的键以 "." 连接，行中没有的键记为缺失（与 None 区分）
+    
+    FrameResultTable 直接按列展开，每行都有值的列为 NumPy 数组。
+    """
+    if hasattr(records, 'flat_columns'):
+        return records.flat_columns()
+    columns: Dict[str, List] = {}
+    for i, record in enumerate(records):
+        for name, value in _flatten(record):
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [_ABSENT] * i
+            column.append(value)
+        for column in columns.values():
+            if len(column) <= i:
+                column.append(_ABSENT)
+    return columns
+
+def unflatten_records(columns: Dict[str, List], count: int) -> List[Dict]:
+    """flatten_records 的逆操作"""
+    records = [{} for _ in range(count)]
+    for name, values in columns.items():
+        path = name.split('.')
+        for record, value in zip(records, values):
+            if value is _ABSENT:
+                continue
+            target = record
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+    return records
+
+def _selected(name: str, columns: Sequence[str]) -> bool:
+    """列名是否被选中（可用嵌套字段前缀选取其下的全部列）"""
+    return any(name == column or name.startswith(f"{column}.") for column in columns)
+
+def _scalar_kind(values: List) -> Optional[type]:
+    """列中非空值的统一类型（bool/int/float/str），混合或其他类型返回 None"""
+    kinds = {type(value) for value in values if value is not None and value is not _ABSENT}
+    if not kinds:
+        return float
+    if kinds <= {int, float} and kinds != {int}:
+        return float
+    if len(kinds) == 1 and next(iter(kinds)) in (bool, int, float, str):
+        return next(iter(kinds))
+    return None
+
+class _NpzCodec:
+    """NumPy .npz（zip deflate 压缩）列编码，不依赖 pyarrow；每列单独存储，读取时只解压所需的列"""
+    
+    extension = 'npz'
+    
+    @staticmethod
+    def _encode_column(name: str, values: List, arrays: Dict[str, np.ndarray]):
+        if isinstance(values, np.ndarray):
+            arrays[name] = values
+            return
+        absent = np.array([value is _ABSENT for value in values], dtype=bool)
+        if absent.any():
+            arrays[name + ABSENT_SUFFIX] = absent
+        present = [None if value is _ABSENT else value for value in values]
+        null = np.array([value is None for value in present], dtype=bool)
+        if (null & ~absent).any():
+            arrays[name + NULL_SUFFIX] = null & ~absent
+        
+        if any(isinstance(value, list) for value in present) and \
+                all(value is None or isinstance(value, list) for value in present):
+            items = [value or [] for value in present]
+            flat = [item for value in items for item in value]
+            kind = _scalar_kind(flat)
+            if kind is not None:
+                arrays[name + OFFSETS_SUFFIX] = np.cumsum([0] + [len(value) for value in items]).astype(np.int64)
+                arrays[name] = np.array(flat, dtype=kind if kind is not str else np.str_)
+                return
+        
+        kind = _scalar_kind(present)
+        if kind is None:
+            arrays[name + JSON_SUFFIX] = np.array([json.dumps(value, ensure_ascii=False) for value in present],
+                                                  dtype=np.str_)
+            return
+        filler = {bool: False, int: 0, float: np.nan, str: ''}[kind]
+        arrays[name] = np.array([filler if value is None else value for value in present],
+                                dtype=kind if kind is not str else np.str_)
+    
+    def write(self, path: str, columns: Dict[str, List]):
+        arrays = {}
+        for name, values in columns.items():
+            self._encode_column(name, values, arrays)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+    
+    def read(self, path: str, columns: Optional[Sequence[str]], time_column: str,
+             start: Optional[float], end: Optional[float], offset: int = 0,
+             limit: Optional[int] = None) -> Tuple[Dict[str, List], int, int]:
+        with np.load(path, allow_pickle=False) as data:
+            stored = {}
+            for key in data.files:
+                stored.setdefault(key.split('#')[0], []).append(key)
+            
+            # 时间列为整列读取的索引：先按时间范围定位行，再分页，其余列只取这些行
+            rows = None
+            if (start is not None or end is not None) and time_column in stored:
+                times = data[time_column]
+                mask = np.ones(len(times), dtype=bool)
+                if start is not None:
+                    mask &= times >= start
+                if end is not None:
+                    mask &= times <= end
+                rows = np.flatnonzero(mask)
+            total = len(rows) if rows is not None else self._row_count(data, stored)
+            if offset or limit is not None:
+                rows = (rows if rows is not None else np.arange(total))[offset:None if limit is None else offset + limit]
+            
+            result = {}
+            for name in (columns if columns is not None else stored):
+                if name in stored:
+                    result[name] = self._decode_column(data, name, rows)
+            return result, len(rows) if rows is not None else total, total
+    
+    @staticmethod
+    def _row_count(data, stored: Dict[str, List[str]]) -> int:
+        for name, keys in stored.items():
+            if name + OFFSETS_SUFFIX in keys:
+                return len(data[name + OFFSETS_SUFFIX]) - 1
+            if name + JSON_SUFFIX in keys:
+                return len(data[name + JSON_SUFFIX])
+            if name in keys:
+                return len(data[name])
+        return 0
+    
+    @staticmethod
+    def _decode_column(data, name: str, rows: Optional[np.ndarray]) -> List:
+        keys = set(data.files)
+        if name + JSON_SUFFIX in keys:
+            texts = data[name + JSON_SUFFIX]
+            values = [json.loads(text) for text in (texts[rows] if rows is not None else texts)]
+        elif name + OFFSETS_SUFFIX in keys:
+            offsets = data[name + OFFSETS_SUFFIX]
+            flat = data[name].tolist()
+            positions = rows if rows is not None else range(len(offsets) - 1)
+            values = [flat[offsets[i]:offsets[i + 1]] for i in positions]
+        else:
+            column = data[name]
+            values = (column[rows] if rows is not None else column).tolist()
+        
+        for suffix, marker in ((NULL_SUFFIX, None), (ABSENT_SUFFIX, _ABSENT)):
+            if name + suffix in keys:
+                mask = data[name + suffix]
+                mask = mask[rows] if rows is not None else mask
+                for i in np.flatnonzero(mask):
+                    values[i] = marker
+        return values
+
+class _ParquetCodec:
+    """Parquet（zstd 压缩）列编码，需要 pyarrow；按列读取并下推时间范围过滤"""
+    
+    extension = 'parquet'
+    
+    def __init__(self):
+        import pyarrow
+        import pyarrow.parquet
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+    
+    def write(self, path: str, columns: Dict[str, List]):
+        arrays = {}
+        for name, values in columns.items():
+            if isinstance(values, np.ndarray):
+                arrays[name] = values
+                continue
+            absent = [value is _ABSENT for value in values]
+            present = [None if value is _ABSENT else value for value in values]
+            if _scalar_kind(present) is None and not all(value is None or isinstance(value, list) for value in present):
+                arrays[name + JSON_SUFFIX] = [json.dumps(value, ensure_ascii=False) for value in present]
+            else:
+                arrays[name] = present
+            if any(absent):
+                arrays[name + ABSENT_SUFFIX] = absent
+        self.pq.write_table(self.pa.table(arrays), path, compression='zstd')
+    
+    def read(self, path: str, columns: Optional[Sequence[str]], time_column: str,
+             start: Optional[float], end: Optional[float], offset: int = 0,
+             limit: Optional[int] = None) -> Tuple[Dict[str, List], int, int]:
+        names = self.pq.read_schema(path).names
+        if columns is not None:
+            wanted = set(columns)
+            names = [name for name in names if name.split('#')[0] in wanted]
+        filters = []
+        if start is not None:
+            filters.append((time_column, '>=', start))
+        if end is not None:
+            filters.append((time_column, '<=', end))
+        table = self.pq.read_table(path, columns=names, filters=filters or None)
+        total = table.num_rows
+        if offset or limit is not None:
+            table = table.slice(offset, limit)
+        
+        raw = table.to_pydict()
+        result = {}
+        for name, values in raw.items():
+            base = name.split('#')[0]
+            if name.endswith(JSON_SUFFIX):
+                result[base] = [json.loads(value) for value in values]
+            elif not name.endswith(ABSENT_SUFFIX):
+                result[base] = values
+        for name, values in raw.items():
+            if name.endswith(ABSENT_SUFFIX) and name[:-len(ABSENT_SUFFIX)] in result:
+                column = result[name[:-len(ABSENT_SUFFIX)]]
+                for i, absent in enumerate(values):
+                    if absent:
+                        column[i] = _ABSENT
+        return result, table.num_rows, total
+
+def _codec(fmt: str):
+    if fmt == 'parquet':
+        return _ParquetCodec()
+    if fmt == 'npz':
+        return _NpzCodec()
+    raise ValueError(f"不支持的列式存储格式: {fmt}")
+
+_pyarrow_available = None
+
+def default_format() -> str:
+    """配置的格式；parquet 需要 pyarrow，未安装时退回 npz"""
+    global _pyarrow_available
+    fmt = Config.COLUMNAR_RESULT_FORMAT
+    if fmt == 'parquet':
+        if _pyarrow_available is None:
+            try:
+                import pyarrow.parquet  # noqa: F401
+                _pyarrow_available = True
+            except ImportError:
+                logger.warning("未安装 pyarrow，列式结果改用 npz 格式")
+                _pyarrow_available = False
+        if not _pyarrow_available:
+            return 'npz'
+    return fmt
+
+class ColumnarResultStore:
+    """逐帧结果和转录分段的列式存储
+    
+    save() 将 frame_analyses 和 audio_analysis.transcription.segments 写入与结果文件同目录的
+    {task_id}_frames.{格式} / {task_id}_segments.{格式}，返回去掉这两部分、附带 columnar 引用的精简结果；
+    read() / records() 按列、时间范围和分页读取（未使用列式存储的完整结果也可读取），hydrate() 还原完整结果。
+    """
+    
+    def __init__(self, directory: str = None, fmt: str = None):
+        self.directory = directory or Config.OUTPUT_DIR
+        self.fmt = fmt or default_format()
+    
+    @staticmethod
+    def _segments(result: Dict) -> Optional[List[Dict]]:
+        transcription = (result.get('audio_analysis') or {}).get('transcription')
+        return transcription.get('segments') if isinstance(transcription, dict) else None
+    
+    def save(self, result: Dict, task_id: str) -> Dict:
+        """写入列式文件，返回精简结果（不修改传入的结果）"""
+        codec = _codec(self.fmt)
+        tables = {'frames': result.get('frame_analyses') or []}
+        segments = self._segments(result)
+        if segments is not None:
+            tables['segments'] = segments
+        
+        references = {'format': self.fmt}
+        for table, records in tables.items():
+            filename = f"{task_id}_{table}.{codec.extension}"
+            codec.write(os.path.join(self.directory, filename), flatten_records(records))
+            references[table] = filename
+            references[f"{table[:-1]}_count"] = len(records)
+        
+        slim = {key: value for key, value in result.items() if key != 'frame_analyses'}
+        if segments is not None:
+            transcription = {k: v for k, v in result['audio_analysis']['transcription'].items() if k != 'segments'}
+            slim['audio_analysis'] = {**result['audio_analysis'], 'transcription': transcription}
+        slim['columnar'] = references
+        return slim
+    
+    def read(self, result: Dict, table: str, columns: Sequence[str] = None, start: float = None,
+             end: float = None, offset: int = 0, limit: int = None) -> Tuple[Dict[str, List], int, int]:
+        """读取精简结果引用的列式表：(列名 -> 值列表, 本页行数, 时间范围内总行数)；缺失值为 None
+        
+        columns 为展开后的列名（如 clarity_score、metrics.clarity），也可用前缀选取整个嵌套字段（如 metrics）。
+        """
+        values, count, total = self._read(result, table, columns, start, end, offset, limit)
+        return {name: [None if v is _ABSENT else v for v in column] for name, column in values.items()}, count, total
+    
+    def _read(self, result: Dict, table: str, columns: Optional[Sequence[str]], start: Optional[float],
+              end: Optional[float], offset: int = 0, limit: Optional[int] = None) -> Tuple[Dict[str, List], int, int]:
+        if 'columnar' not in result:
+            return self._read_embedded(result, table, columns, start, end, offset, limit)
+        references = result['columnar']
+        if table not in references:
+            return {}, 0, 0
+        path = os.path.join(self.directory, references[table])
+        codec = _codec(references['format'])
+        
+        names = None
+        if columns is not None:
+            names = [name for name in self.columns(result, table) if _selected(name, columns)]
+        return codec.read(path, names, TABLE_TIME_COLUMNS[table], start, end, offset, limit)
+    
+    def _read_embedded(self, result: Dict, table: str, columns: Optional[Sequence[str]], start: Optional[float],
+                       end: Optional[float], offset: int, limit: Optional[int]) -> Tuple[Dict[str, List], int, int]:
+        """未使用列式存储的结果：对内嵌的记录做同样的时间范围、分页和列选择"""
+        records = (result.get('frame_analyses') if table == 'frames' else self._segments(result)) or []
+        time_column = TABLE_TIME_COLUMNS[table]
+        if start is not None or end is not None:
+            records = [
+                record for record in records
+                if (start is None or record.get(time_column, 0) >= start) and (end is None or record.get(time_column, 0) <= end)
+            ]
+        page = records[offset:None if limit is None else offset + limit]
+        values = flatten_records(page)
+        if columns is not None:
+            values = {name: column for name, column in values.items() if _selected(name, columns)}
+        return values, len(page), len(records)
+    
+    def columns(self, result: Dict, table: str) -> List[str]:
+        """表中的全部列名"""
+        if 'columnar' not in result:
+            return list(self._read_embedded(result, table, None, None, None, 0, None)[0])
+        references = result['columnar']
+        if table not in references:
+            return []
+        path = os.path.join(self.directory, references[table])
+        if references['format'] == 'parquet':
+            names = _codec('parquet').pq.read_schema(path).names
+        else:
+            with np.load(path, allow_pickle=False) as data:
+                names = data.files
+        return list(dict.fromkeys(name.split('#')[0] for name in names))
+    
+    def records(self, result: Dict, table: str, columns: Sequence[str] = None, start: float = None,
+                end: float = None, offset: int = 0, limit: int = None) -> Tuple[List[Dict], int]:
+        """按行读取（与原 frame_analyses / segments 的结构相同），返回 (本页记录, 时间范围内总行数)"""
+        values, count, total = self._read(result, table, columns, start, end, offset, limit)
+        return unflatten_records(values, count), total
+    
+    def hydrate(self, result: Dict) -> Dict:
+        """由精简结果还原完整结果"""
+        if 'columnar' not in result:
+            return result
+        full = {key: value for key, value in result.items() if key != 'columnar'}
+        full['frame_analyses'] = self.records(result, 'frames')[0]
+        if 'segments' in result['columnar']:
+            transcription = dict(full['audio_analysis']['transcription'])
+            transcription['segments'] = self.records(result, 'segments')[0]
+            full['audio_analysis'] = {**full['audio_analysis'], 'transcription': transcription}
+        return full
+    
+    def remove(self, result: Dict):
+        for table in TABLE_TIME_COLUMNS:
+            filename = result.get('columnar', {}).get(table)
+            if filename and os.path.exists(os.path.join(self.directory, filename)):
+                os.remove(os.path.join(self.directory, filename))
+
+def load_result_file(file_path: str) -> Dict:
+    """读取结果文件，列式存储的结果还原为完整结果"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    return ColumnarResultStore(os.path.dirname(file_path) or '.').hydrate(result)
\ No newline at end of file
@@ -0,0 +1,288 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.scoring import FrameMetricTable, SCORED_ANALYZERS
+from app.services.result_storage import load_result_file
+
+logger = logging.getLogger(__name__)
+
+# 视频表的列（summary 中的指标展开为列，均可用于过滤和排序）
+VIDEO_COLUMNS = [
+    ('task_id', 'TEXT PRIMARY KEY'),
+    ('video_name', 'TEXT'),
+    ('video_path', 'TEXT'),
+    ('duration', 'REAL'),
+    ('total_frames', 'INTEGER'),
+    ('analyzed_frames', 'INTEGER'),
+    ('analysis_time', 'REAL'),
+    ('overall_quality_score', 'REAL'),
+    ('avg_clarity', 'REAL'),
+    ('avg_lighting', 'REAL'),
+    ('face_detection_rate', 'REAL'),
+    ('watermark_detection_rate', 'REAL'),
+    ('avg_content_richness', 'REAL'),
+    ('audio_quality_score', 'REAL'),
+    ('has_audio_transcription', 'INTEGER'),
+    ('issue_frame_rate', 'REAL'),
+    ('completed_at', 'REAL'),
+    ('source_mtime', 'REAL')
+]
+
+# 帧表的列（未执行的分析项为 NULL）
+FRAME_COLUMNS = [
+    ('task_id', 'TEXT'),
+    ('frame_number', 'INTEGER'),
+    ('timestamp', 'REAL'),
+    ('overall_score', 'REAL'),
+    ('clarity', 'REAL'),
+    ('lighting', 'REAL'),
+    ('face_detected', 'INTEGER'),
+    ('face_count', 'INTEGER'),
+    ('watermark_detected', 'INTEGER'),
+    ('content', 'REAL'),
+    ('issues', 'TEXT')
+]
+
+# 建索引的列：常用的排序/过滤字段
+VIDEO_INDEXED = ['completed_at', 'overall_quality_score', 'avg_clarity', 'avg_lighting',
+                 'watermark_detection_rate', 'face_detection_rate']
+FRAME_INDEXED = ['overall_score', 'clarity', 'lighting', 'content']
+
+TABLES = {'videos': VIDEO_COLUMNS, 'frames': FRAME_COLUMNS}
+
+_FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|=|>|<|~)\s*(.*?)\s*$')
+
+def parse_filter(expression: str, table: str = 'videos') -> Tuple[str, str, Any]:
+    """解析过滤表达式 "列 运算符 值"，如 watermark_detection_rate>0.5、completed_at>=2024-06-01、
+    video_name~demo（子串匹配）。列名不存在或格式错误时抛出 ValueError。
+    """
+    match = _FILTER_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"无法解析的过滤条件: {expression}")
+    column, operator, raw = match.groups()
+    columns = dict(TABLES[table])
+    if column not in columns:
+        raise ValueError(f"未知的字段: {column}")
+    
+    if operator == '~':
+        return column, 'LIKE', f"%{raw}%"
+    if column == 'completed_at' and not _is_number(raw):
+        # 完成时间可用ISO日期/时间
+        return column, operator, datetime.fromisoformat(raw).timestamp()
+    if columns[column].startswith(('REAL', 'INTEGER')):
+        if raw.lower() in ('true', 'false'):
+            return column, operator, int(raw.lower() == 'true')
+        return column, operator, float(raw)
+    return column, operator, raw
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+def _optional(values: np.ndarray, executed: np.ndarray) -> List:
+    return [value if ran else None for value, ran in zip(values.tolist(), executed.tolist())]
+
+class ResultsIndex:
+    """分析结果索引：每个结果的 summary 和逐帧指标写入 SQLite 的 videos / frames 表
+    
+    任务完成（或重新评分保存）时写入；sync() 按文件修改时间补录 outputs/ 中未入库或已变化的结果，
+    并删除结果文件已不存在的记录。查询只读索引，不解析结果文件。
+    """
+    
+    def __init__(self, path: str = None):
+        self.path = path or Config.RESULTS_INDEX_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._create_schema()
+    
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for table, columns in TABLES.items():
+                definition = ', '.join(f"{name} {sql_type}" for name, sql_type in columns)
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definition})")
+            for column in VIDEO_INDEXED:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_videos_{column} ON videos ({column})")
+            for column in FRAME_INDEXED:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_frames_{column} ON frames ({column})")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_frames_task ON frames (task_id, timestamp)")
+    
+    @staticmethod
+    def _video_row(result: Dict, completed_at: float, source_mtime: float) -> Dict:
+        summary = result.get('summary', {})
+        frames = result.get('frame_analyses', [])
+        return {
+            'task_id': result['video_id'],
+            'video_name': result.get('video_name'),
+            'video_path': result.get('video_path'),
+            'duration': result.get('duration'),
+            'total_frames': result.get('total_frames'),
+            'analyzed_frames': result.get('analyzed_frames', len(frames)),
+            'analysis_time': result.get('analysis_time'),
+            'overall_quality_score': result.get('overall_quality_score'),
+            'avg_clarity': summary.get('avg_clarity'),
+            'avg_lighting': summary.get('avg_lighting'),
+            'face_detection_rate': summary.get('face_detection_rate'),
+            'watermark_detection_rate': summary.get('watermark_detection_rate'),
+            'avg_content_richness': summary.get('avg_content_richness'),
+            'audio_quality_score': summary.get('audio_quality_score'),
+            'has_audio_transcription': int(bool(summary.get('has_audio_transcription'))),
+            'issue_frame_rate': sum(1 for frame in frames if frame.get('issues')) / len(frames) if frames else 0.0,
+            'completed_at': completed_at,
+            'source_mtime': source_mtime
+        }
+    
+    @staticmethod
+    def _frame_rows(task_id: str, frames: List[Dict], table: FrameMetricTable) -> List[Tuple]:
+        """逐帧指标按列整体转换后组装为行"""
+        columns = {}
+        for name in SCORED_ANALYZERS:
+            position = SCORED_ANALYZERS.index(name)
+            values = table.values[:, position]
+            if name in ('face', 'watermark'):
+                values = values.astype(np.int64)
+            columns[name] = _optional(values, table.executed[:, position])
+        face_count = _optional(table.face_count, table.executed[:, SCORED_ANALYZERS.index('face')])
+        
+        return [
+            (task_id, frame.get('frame_number'), frame.get('timestamp'), frame.get('overall_score'),
+             columns['clarity'][i], columns['lighting'][i], columns['face'][i], face_count[i],
+             columns['watermark'][i], columns['content'][i], ','.join(frame.get('issues', [])))
+            for i, frame in enumerate(frames)
+        ]
+    
+    def ingest(self, result: Dict, completed_at: float = None, source_mtime: float = None):
+        """写入（或替换）一个分析结果；渐进分析的初步结果不入库"""
+        if result.get('provisional'):
+            return
+        frames = result.get('frame_analyses', [])
+        table = FrameMetricTable([frames])
+        video = self._video_row(result, completed_at or time.time(), source_mtime)
+        frame_rows = self._frame_rows(result['video_id'], frames, table)
+        
+        placeholders = ', '.join('?' for _ in VIDEO_COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO videos VALUES ({placeholders})",
+                               [video[name] for name, _ in VIDEO_COLUMNS])
+            self._conn.execute("DELETE FROM frames WHERE task_id = ?", (result['video_id'],))
+            self._conn.executemany(
+                f"INSERT INTO frames VALUES ({', '.join('?' for _ in FRAME_COLUMNS)})", frame_rows
+            )
+    
+    def ingest_file(self, file_path: str, completed_at: float = None):
+        """从结果文件入库（记录文件修改时间，供 sync 判断是否变化）"""
+        mtime = os.path.getmtime(file_path)
+        result = load_result_file(file_path)
+        self.ingest(result, completed_at or mtime, mtime)
+    
+    def remove(self, task_ids: Sequence[str]):
+        with self._lock, self._conn:
+            for task_id in task_ids:
+                self._conn.execute("DELETE FROM videos WHERE task_id = ?", (task_id,))
+                self._conn.execute("DELETE FROM frames WHERE task_id = ?", (task_id,))
+    
+    def sync(self, output_dir: str = None) -> Dict[str, int]:
+        """与结果目录同步：补录新增或修改过的结果文件，删除文件已不存在的记录"""
+        output_dir = output_dir or Config.OUTPUT_DIR
+        start = time.perf_counter()
+        with self._lock:
+            indexed = {row['task_id']: row['source_mtime']
+                       for row in self._conn.execute("SELECT task_id, source_mtime FROM videos")}
+        
+        present = set()
+        ingested = 0
+        suffix = '_result.json'
+        for entry in os.scandir(output_dir) if os.path.isdir(output_dir) else []:
+            if not entry.name.endswith(suffix):
+                continue
+            task_id = entry.name[:-len(suffix)]
+            present.add(task_id)
+            mtime = entry.stat().st_mtime
+            previous = indexed.get(task_id)
+            if previous is not None and previous >= mtime:
+                continue
+            try:
+                self.ingest_file(entry.path)
+                ingested += 1
+            except Exception as e:
+                logger.warning(f"结果入库失败 {entry.name}: {str(e)}")
+        
+        removed = [task_id for task_id in indexed if task_id not in present]
+        self.remove(removed)
+        logger.info(f"结果索引同步完成: 新增/更新 {ingested} 个, 删除 {len(removed)} 个, "
+                    f"耗时 {time.perf_counter() - start:.2f}秒")
+        return {'ingested': ingested, 'removed': len(removed)}
+    
+    def query(self, table: str = 'videos', filters: Sequence[str] = (), sort: Optional[str] = None,
+              limit: int = 50, offset: int = 0, task_id: str = None) -> Dict:
+        """过滤、排序、分页查询
+        
+        filters 为 parse_filter 格式的表达式（条件之间为 AND）；sort 为列名，前缀 "-" 表示降序；
+        查询帧表时可用 task_id 限定任务。返回 {total, count, results}。
+        """
+        if table not in TABLES:
+            raise ValueError(f"未知的表: {table}")
+        conditions, params = [], []
+        if task_id is not None:
+            conditions.append("task_id = ?")
+            params.append(task_id)
+        for expression in filters:
+            column, operator, value = parse_filter(expression, table)
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        order = ""
+        if sort:
+            column = sort.lstrip('-+')
+            if column not in dict(TABLES[table]):
+                raise ValueError(f"未知的排序字段: {column}")
+            # NULL 排在最后（NULLS LAST 可直接按列索引顺序扫描，无需临时排序）
+            direction = 'DESC' if sort.startswith('-') else 'ASC'
+            order = f" ORDER BY {column} {direction} NULLS LAST"
+        limit = max(1, min(int(limit), Config.RESULTS_QUERY_MAX_LIMIT))
+        
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM {table}{where}{order} LIMIT ? OFFSET ?", [*params, limit, max(0, int(offset))]
+            ).fetchall()
+        
+        results = []
+        for row in rows:
+            item = dict(row)
+            item.pop('source_mtime', None)
+            if table == 'frames':
+                item['issues'] = item['issues'].split(',') if item['issues'] else []
+            results.append(item)
+        return {'total': total, 'count': len(results), 'results': results}
+
+# 进程内共享的结果索引
+_results_index = None
+_results_index_lock = threading.Lock()
+
+def get_results_index() -> ResultsIndex:
+    """获取共享的结果索引（首次调用时与结果目录同步）"""
+    global _results_index
+    with _results_index_lock:
+        if _results_index is None:
+            _results_index = ResultsIndex()
+            _results_index.sync()
+        return _results_index
\ No newline at end of file
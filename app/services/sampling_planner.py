@@ -0,0 +1,134 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+
+from config import Config
+from app.services.image_analyzer import FRAME_ANALYZERS
+
+logger = logging.getLogger(__name__)
+
+class AnalyzerCostModel:
+    """本机各分析项的单帧耗时估计（秒）
+    
+    由已完成任务的帧耗时按指数滑动平均更新；没有历史数据的分析项在规划前现场标定。
+    """
+    
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self.costs: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def update(self, name: str, seconds: float):
+        with self._lock:
+            previous = self.costs.get(name)
+            self.costs[name] = seconds if previous is None else (
+                self.smoothing * seconds + (1 - self.smoothing) * previous
+            )
+    
+    def update_from_frames(self, frame_analyses: List[Dict]):
+        """用帧结果中的 timings 更新耗时估计"""
+        totals: Dict[str, List[float]] = {}
+        for frame in frame_analyses:
+            for name, seconds in frame.get('timings', {}).items():
+                if name in FRAME_ANALYZERS or name == 'decode':
+                    totals.setdefault(name, []).append(seconds)
+        for name, samples in totals.items():
+            self.update(name, sum(samples) / len(samples))
+    
+    def missing(self, names: Sequence[str]) -> List[str]:
+        return [name for name in list(names) + ['decode'] if name not in self.costs]
+    
+    def apply_defaults(self, names: Sequence[str]):
+        """没有历史数据的分析项（及解码）取 Config.PLANNER_DEFAULT_COSTS 中的估计值"""
+        with self._lock:
+            for name in list(names) + ['decode']:
+                if name not in self.costs and name in Config.PLANNER_DEFAULT_COSTS:
+                    self.costs[name] = Config.PLANNER_DEFAULT_COSTS[name]
+        logger.info(f"使用默认分析耗时估计: {self.snapshot()}")
+    
+    def calibrate(self, image_analyzer, video_path: str, samples: int = 2):
+        """在视频的少量帧上实测解码和各分析项耗时"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        
+        try:
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            positions = [total_frames * (k + 1) // (samples + 1) for k in range(samples)]
+            for position in positions:
+                start = time.perf_counter()
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ret, frame = cap.read()
+                if not ret:
+                    continue
+                self.update('decode', time.perf_counter() - start)
+                
+                # 串行执行，得到各分析项独立的耗时
+                for name in FRAME_ANALYZERS:
+                    _, timings = image_analyzer._run_analyzers(frame, [name])
+                    self.update(name, timings[name])
+        finally:
+            cap.release()
+        logger.info(f"分析耗时标定完成: {self.snapshot()}")
+    
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(seconds, 4) for name, seconds in self.costs.items()}
+
+# 进程内共享的耗时模型，随任务完成不断更新
+cost_model = AnalyzerCostModel()
+
+class SamplingPlanner:
+    """按帧数预算或完成时限规划采样间隔和执行的分析项
+    
+    每帧成本 = 解码 + 所选分析项耗时之和（保守估计，忽略并行重叠）。
+    时限中预留 PLANNER_RESERVED_FRACTION 给音频分析和报告生成。
+    优先保持默认采样间隔和全部分析项；放不下时依次去掉 PLANNER_DROP_ORDER 中的分析项，
+    直到能在时限内分析至少 PLANNER_MIN_FRAMES 帧，再按剩余时间放宽采样间隔。
+    """
+    
+    def __init__(self, costs: AnalyzerCostModel = None):
+        self.costs = costs or cost_model
+    
+    def frame_cost(self, analyzers: Sequence[str]) -> float:
+        costs = self.costs.costs
+        return costs.get('decode', 0.0) + sum(costs.get(name, 0.0) for name in analyzers)
+    
+    def plan(self, duration: float, frame_budget: Optional[int] = None,
+             deadline_seconds: Optional[float] = None) -> Dict:
+        default_interval = Config.FRAME_EXTRACTION_INTERVAL
+        desired_frames = max(1, int(duration / default_interval))
+        if frame_budget:
+            desired_frames = min(desired_frames, frame_budget)
+        
+        analyzers = list(FRAME_ANALYZERS)
+        frames = desired_frames
+        if deadline_seconds:
+            available = deadline_seconds * (1 - Config.PLANNER_RESERVED_FRACTION)
+            drop_order = [name for name in Config.PLANNER_DROP_ORDER if name in analyzers]
+            while True:
+                affordable = int(available / max(self.frame_cost(analyzers), 1e-6))
+                if affordable >= min(desired_frames, Config.PLANNER_MIN_FRAMES) or not drop_order:
+                    break
+                analyzers.remove(drop_order.pop(0))
+            frames = max(1, min(desired_frames, affordable))
+        
+        interval = max(default_interval, duration / frames) if duration else default_interval
+        per_frame = self.frame_cost(analyzers)
+        plan = {
+            'interval': round(interval, 3),
+            'analyzers': analyzers,
+            'skipped_analyzers': [name for name in FRAME_ANALYZERS if name not in analyzers],
+            'planned_frames': frames,
+            'per_frame_seconds': round(per_frame, 4),
+            'planned_seconds': round(per_frame * frames, 2),
+            'frame_budget': frame_budget,
+            'deadline_seconds': deadline_seconds,
+            'costs': self.costs.snapshot()
+        }
+        logger.info(f"采样规划: 间隔 {plan['interval']}秒, {frames} 帧, 分析项 {analyzers}, "
+                    f"预计 {plan['planned_seconds']}秒")
+        return plan
\ No newline at end of file
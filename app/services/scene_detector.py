@@ -0,0 +1,65 @@
+import logging
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class FrameSignature:
+    """缩小后的帧特征：HSV三通道直方图（含亮度）、灰度小图、清晰度"""
+    
+    __slots__ = ('hist', 'gray', 'sharpness')
+    
+    def __init__(self, hist: np.ndarray, gray: np.ndarray, sharpness: float):
+        self.hist = hist
+        self.gray = gray
+        self.sharpness = sharpness
+
+class SceneChangeDetector:
+    """低成本镜头切换检测：在缩小的帧上比较颜色直方图与结构相似度（SSIM）
+    
+    差异分数 = 直方图 Bhattacharyya 距离与 (1 - SSIM) 的加权和，范围约 0-1，
+    超过 threshold 判定为镜头切换。
+    """
+    
+    def __init__(self, threshold: float = None, size: Tuple[int, int] = (128, 72),
+                 hist_weight: float = 0.5):
+        self.threshold = Config.SCENE_CHANGE_THRESHOLD if threshold is None else threshold
+        self.size = size
+        self.hist_weight = hist_weight
+    
+    def signature(self, frame: np.ndarray) -> FrameSignature:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1, 2], None, [8, 4, 8], [0, 180, 0, 256, 0, 256])
+        cv2.normalize(hist, hist, 1.0, 0.0, cv2.NORM_L1)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        return FrameSignature(hist, gray.astype(np.float32), sharpness)
+    
+    @staticmethod
+    def ssim(a: np.ndarray, b: np.ndarray) -> float:
+        """灰度图的平均SSIM（7x7高斯窗口）"""
+        c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+        
+        def blur(x):
+            return cv2.GaussianBlur(x, (7, 7), 1.5)
+        
+        mu_a, mu_b = blur(a), blur(b)
+        var_a = blur(a * a) - mu_a * mu_a
+        var_b = blur(b * b) - mu_b * mu_b
+        cov = blur(a * b) - mu_a * mu_b
+        ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+        return float(ssim_map.mean())
+    
+    def difference(self, prev: FrameSignature, cur: FrameSignature) -> float:
+        hist_distance = cv2.compareHist(prev.hist, cur.hist, cv2.HISTCMP_BHATTACHARYYA)
+        structural = min(1.0, max(0.0, 1.0 - self.ssim(prev.gray, cur.gray)))
+        return self.hist_weight * hist_distance + (1 - self.hist_weight) * structural
+    
+    def is_cut(self, prev: FrameSignature, cur: FrameSignature) -> Tuple[bool, float]:
+        score = self.difference(prev, cur)
+        return score >= self.threshold, score
\ No newline at end of file
@@ -0,0 +1,232 @@
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.online_stats import audio_summary, column_statistics
+
+logger = logging.getLogger(__name__)
+
+# 参与综合评分的分析项（与 FRAME_ANALYZERS 相同的顺序）
+SCORED_ANALYZERS = ['clarity', 'lighting', 'face', 'watermark', 'content']
+
+# 有阈值、低于阈值记为问题的分析项及对应问题
+THRESHOLD_ISSUES = [('clarity', "图像模糊"), ('lighting', "光照问题"), ('content', "内容单调")]
+
+# 人脸/水印检测结果折算的分项得分（检测到, 未检测到）
+FACE_SCORES = (100.0, 70.0)
+WATERMARK_SCORES = (50.0, 100.0)
+
+FAILED_ISSUE_PREFIX = "分析失败"
+
+def frame_metrics(values: Dict) -> Dict:
+    """各分析项原始结果转为可持久化的指标（只包含已执行的分析项）"""
+    metrics = {}
+    for name, value in values.items():
+        if name == 'face':
+            metrics[name] = {'detected': bool(value[0]), 'count': int(value[1])}
+        elif name == 'watermark':
+            metrics[name] = {'detected': bool(value[0]), 'text': value[1]}
+        else:
+            metrics[name] = float(value)
+    return metrics
+
+def default_thresholds() -> Dict[str, float]:
+    return {
+        'clarity': Config.CLARITY_THRESHOLD,
+        'lighting': Config.LIGHTING_THRESHOLD,
+        'content': Config.CONTENT_THRESHOLD
+    }
+
+class FrameMetricTable:
+    """多个分析结果的帧指标的列式表示，offsets 标记各结果在行中的起点
+    
+    新结果读取帧的 metrics；旧结果没有 metrics 时由平铺字段和 skipped_analyzers 还原。
+    帧分析失败（无 metrics 且问题为“分析失败”）的行标记为 failed，重新评分时保持原样。
+    """
+    
+    def __init__(self, frame_lists: Sequence[List[Dict]]):
+        sizes = [len(frames) for frames in frame_lists]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        
+        parts = [self._frame_arrays(frames) for frames in frame_lists]
+        width = len(SCORED_ANALYZERS)
+        self.values = np.concatenate([part[0] for part in parts]) if parts else np.zeros((0, width))
+        self.executed = np.concatenate([part[1] for part in parts]) if parts else np.zeros((0, width), dtype=bool)
+        self.face_count = np.concatenate([part[2] for part in parts]) if parts else np.zeros(0, dtype=np.int64)
+        self.failed = np.concatenate([part[3] for part in parts]) if parts else np.zeros(0, dtype=bool)
+    
+    @classmethod
+    def _frame_arrays(cls, frames) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # FrameResultTable 直接由列计算
+        if hasattr(frames, 'metric_arrays'):
+            arrays = frames.metric_arrays()
+            if arrays is not None:
+                return arrays
+        
+        # 先收集为Python列表再一次性转为数组，避免逐元素写入NumPy数组
+        rows, executed, face_count, failed = [], [], [], []
+        for frame in frames:
+            row, row_executed, count, row_failed = cls._parse(frame)
+            rows.append(row)
+            executed.append(row_executed)
+            face_count.append(count)
+            failed.append(row_failed)
+        
+        width = len(SCORED_ANALYZERS)
+        return (np.array(rows, dtype=np.float64).reshape(-1, width), np.array(executed, dtype=bool).reshape(-1, width),
+                np.array(face_count, dtype=np.int64), np.array(failed, dtype=bool))
+    
+    @staticmethod
+    def _parse(frame: Dict) -> Tuple[List[float], List[bool], int, bool]:
+        metrics = frame.get('metrics')
+        failed = False
+        if metrics is None:
+            failed = any(issue.startswith(FAILED_ISSUE_PREFIX) for issue in frame.get('issues', []))
+            skipped = set(frame.get('skipped_analyzers', []))
+            metrics = {
+                'clarity': frame.get('clarity_score', 0.0),
+                'lighting': frame.get('lighting_score', 0.0),
+                'face': {'detected': frame.get('face_detected', False), 'count': frame.get('face_count', 0)},
+                'watermark': {'detected': frame.get('watermark_detected', False)},
+                'content': frame.get('content_richness', 0.0)
+            }
+            metrics = {name: value for name, value in metrics.items() if name not in skipped}
+        
+        row, executed, face_count = [], [], 0
+        for name in SCORED_ANALYZERS:
+            value = metrics.get(name)
+            executed.append(value is not None)
+            if value is None:
+                row.append(0.0)
+            elif name == 'face':
+                row.append(float(value['detected']))
+                face_count = value['count']
+            elif name == 'watermark':
+                row.append(float(value['detected']))
+            else:
+                row.append(value)
+        return row, executed, face_count, failed
+    
+    def column(self, name: str) -> np.ndarray:
+        """指标列（未执行的分析项为 0，与帧结果中的默认值一致）"""
+        return self.values[:, SCORED_ANALYZERS.index(name)]
+    
+    def segments(self) -> List[Tuple[int, int]]:
+        return [(int(start), int(end)) for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+
+class ScoringEngine:
+    """由帧指标计算综合评分和问题列表，所有帧一次向量化计算
+    
+    weights / thresholds 中缺省的项取 Config.ANALYSIS_WEIGHTS 和 Config 中的 *_THRESHOLD。
+    未执行的分析项不参与综合评分，权重按已执行项重新归一化。
+    """
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None,
+                 thresholds: Optional[Dict[str, float]] = None):
+        unknown = set(weights or {}) - set(SCORED_ANALYZERS)
+        unknown |= set(thresholds or {}) - {name for name, _ in THRESHOLD_ISSUES}
+        if unknown:
+            raise ValueError(f"未知的评分项: {', '.join(sorted(unknown))}")
+        
+        self.weights = {**Config.ANALYSIS_WEIGHTS, **(weights or {})}
+        self.thresholds = {**default_thresholds(), **(thresholds or {})}
+        self._weight_vector = np.array([self.weights.get(name, 0.0) for name in SCORED_ANALYZERS])
+    
+    def component_scores(self, table: FrameMetricTable) -> np.ndarray:
+        """各分析项的 0-100 分项得分矩阵（行为帧）"""
+        scores = table.values.copy()
+        face = SCORED_ANALYZERS.index('face')
+        watermark = SCORED_ANALYZERS.index('watermark')
+        scores[:, face] = np.where(table.values[:, face] > 0, *FACE_SCORES)
+        scores[:, watermark] = np.where(table.values[:, watermark] > 0, *WATERMARK_SCORES)
+        return scores
+    
+    def overall_scores(self, table: FrameMetricTable) -> np.ndarray:
+        active = table.executed * self._weight_vector
+        active_weight = active.sum(axis=1)
+        overall = (self.component_scores(table) * active).sum(axis=1) / np.where(active_weight > 0, active_weight, 1.0)
+        overall[table.failed] = 0.0
+        return overall
+    
+    def issues(self, table: FrameMetricTable) -> List[List[str]]:
+        flags = []
+        for name, issue in THRESHOLD_ISSUES:
+            column = SCORED_ANALYZERS.index(name)
+            flags.append((issue, table.executed[:, column] & (table.values[:, column] < self.thresholds[name])))
+        watermark = table.values[:, SCORED_ANALYZERS.index('watermark')] > 0
+        # 问题顺序：模糊、光照、水印、内容
+        flags.insert(2, ("检测到水印", watermark))
+        
+        # 每帧的问题组合编码为位掩码，各组合的问题列表只构造一次
+        labels = [issue for issue, _ in flags]
+        codes = sum(flag.astype(np.int64) << bit for bit, (_, flag) in enumerate(flags))
+        combinations = [[label for bit, label in enumerate(labels) if code >> bit & 1]
+                        for code in range(1 << len(labels))]
+        return [list(combinations[code]) for code in np.asarray(codes).tolist()]
+    
+    def score_frame(self, metrics: Dict) -> Tuple[float, List[str]]:
+        """单帧综合评分和问题列表"""
+        table = FrameMetricTable([[{'metrics': metrics}]])
+        return float(self.overall_scores(table)[0]), self.issues(table)[0]
+    
+    def profile(self) -> Dict:
+        return {'weights': self.weights, 'thresholds': self.thresholds}
+    
+    def rescore_results(self, results: List[Dict]) -> List[Dict]:
+        """就地重新计算各结果的帧 overall_score/issues、overall_quality_score 和 summary"""
+        results = [result for result in results if result.get('frame_analyses')]
+        table = FrameMetricTable([result['frame_analyses'] for result in results])
+        overall = self.overall_scores(table)
+        issues = self.issues(table)
+        overall_list = overall.tolist()
+        failed = table.failed.tolist()
+        
+        for result, (start, end) in zip(results, table.segments()):
+            for row, frame in enumerate(result['frame_analyses'], start):
+                if failed[row]:
+                    continue
+                frame['overall_score'] = overall_list[row]
+                frame['issues'] = issues[row]
+            result['overall_quality_score'] = float(overall[start:end].mean())
+            result['summary'] = {
+                **result.get('summary', {}),
+                **summarize_table(table, start, end, overall, issues)
+            }
+            result['scoring'] = self.profile()
+        return results
+
+def summarize_table(table: FrameMetricTable, start: int, end: int, overall: np.ndarray,
+                    issues: Sequence[List[str]]) -> Dict:
+    """帧指标汇总（不含音频项），结构与 SummaryAggregator.summary 相同"""
+    return {
+        "avg_clarity": float(table.column('clarity')[start:end].mean()),
+        "avg_lighting": float(table.column('lighting')[start:end].mean()),
+        "face_detection_rate": float((table.column('face')[start:end] > 0).mean()),
+        "watermark_detection_rate": float((table.column('watermark')[start:end] > 0).mean()),
+        "avg_content_richness": float(table.column('content')[start:end].mean()),
+        "statistics": {
+            "clarity": column_statistics(table.column('clarity')[start:end]),
+            "lighting": column_statistics(table.column('lighting')[start:end]),
+            "content_richness": column_statistics(table.column('content')[start:end]),
+            "overall_score": column_statistics(overall[start:end])
+        },
+        "issue_counts": dict(Counter(issue for frame_issues in issues[start:end] for issue in frame_issues))
+    }
+
+def summarize_frames(frame_analyses: List[Dict], audio_analysis: Dict) -> Dict:
+    """分析结果的 summary：帧指标汇总 + 音频项（逐帧更新 SummaryAggregator 时无需调用）"""
+    table = FrameMetricTable([frame_analyses])
+    if hasattr(frame_analyses, 'issue_lists'):
+        # FrameResultTable：整列读取
+        overall = frame_analyses.column('overall_score')
+        issues = frame_analyses.issue_lists()
+    else:
+        overall = np.array([frame['overall_score'] for frame in frame_analyses], dtype=np.float64)
+        issues = [frame.get('issues', []) for frame in frame_analyses]
+    return {
+        **summarize_table(table, 0, len(frame_analyses), overall, issues),
+        **audio_summary(audio_analysis)
+    }
\ No newline at end of file
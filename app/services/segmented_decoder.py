@@ -0,0 +1,259 @@
+import os
+import re
+import queue
+import shutil
+import logging
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_right
+from typing import Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+from config import Config
+from app.services.frame_ring_buffer import SharedFrameRing
+from app.services.frame_sources import passthrough_args
+
+logger = logging.getLogger(__name__)
+
+def _keyframe_times_ffprobe(ffprobe: str, video_path: str) -> List[float]:
+    """ffprobe 读取数据包标记，只解析不解码"""
+    output = subprocess.run(
+        [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path],
+        capture_output=True, text=True, check=True, timeout=120
+    ).stdout
+    
+    times = []
+    for line in output.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2 or 'K' not in parts[1]:
+            continue
+        try:
+            times.append(float(parts[0]))
+        except ValueError:
+            continue
+    return times
+
+def _keyframe_times_ffmpeg(ffmpeg: str, video_path: str) -> List[float]:
+    """没有 ffprobe 时用 ffmpeg 只解码关键帧，从 showinfo 输出读取时间戳"""
+    output = subprocess.run(
+        [ffmpeg, '-hide_banner', '-nostdin', '-skip_frame', 'nokey', '-i', video_path,
+         '-an', '-sn', *passthrough_args(ffmpeg), '-vf', 'showinfo', '-f', 'null', '-'],
+        capture_output=True, text=True, check=True, timeout=600
+    ).stderr
+    return [float(match) for match in re.findall(r'pts_time:\s*(-?[\d.]+)', output)]
+
+def probe_keyframes(video_path: str, fps: float) -> List[int]:
+    """读取视频流关键帧位置（帧序号），优先 ffprobe，其次 ffmpeg；都不可用时返回空列表"""
+    if not fps:
+        return []
+    
+    try:
+        ffprobe = shutil.which('ffprobe')
+        ffmpeg = shutil.which(Config.FFMPEG_BINARY)
+        if ffprobe is not None:
+            times = _keyframe_times_ffprobe(ffprobe, video_path)
+        elif ffmpeg is not None:
+            times = _keyframe_times_ffmpeg(ffmpeg, video_path)
+        else:
+            return []
+    except Exception as e:
+        logger.warning(f"读取关键帧失败: {str(e)}")
+        return []
+    
+    return sorted({int(round(t * fps)) for t in times})
+
+def plan_segments(total_frames: int, segments: int, keyframes: List[int] = None) -> List[Tuple[int, int]]:
+    """把 [0, total_frames) 切成最多 segments 段 [start, end)，起点对齐到不晚于均分点的关键帧"""
+    boundaries = {0}
+    for k in range(1, segments):
+        target = total_frames * k // segments
+        if keyframes:
+            aligned = [kf for kf in keyframes if kf <= target]
+            target = aligned[-1] if aligned else 0
+        boundaries.add(target)
+    
+    starts = sorted(b for b in boundaries if b < total_frames)
+    ends = starts[1:] + [total_frames]
+    return list(zip(starts, ends))
+
+def _open_capture(video_path: str, threads: int) -> cv2.VideoCapture:
+    """限制单个解码器的线程数，避免多进程同时解码时线程过量"""
+    if threads and hasattr(cv2, 'CAP_PROP_N_THREADS'):
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_N_THREADS, threads])
+        if cap.isOpened():
+            return cap
+    return cv2.VideoCapture(video_path)
+
+def _iter_segment(video_path: str, start_frame: int, end_frame: int,
+                  samples: List[Tuple[int, int]], threads: int,
+                  keyframes: List[int] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """seek 到段起点后顺序解码，逐个产出采样位置的 (序号, 时间戳, BGR帧)
+    
+    已知关键帧时，若到下一个采样位置之间隔着关键帧，直接 seek 过去，跳过中间整段GOP的解码。
+    """
+    keyframes = keyframes or []
+    cap = _open_capture(video_path, threads)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        
+        pending = iter(samples)
+        next_sample = next(pending, None)
+        position = start_frame
+        while next_sample is not None and position < end_frame:
+            target = next_sample[1]
+            if target > position and bisect_right(keyframes, target) > bisect_right(keyframes, position):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            
+            # 非采样帧只 grab（解码但不转换颜色空间）
+            if not cap.grab():
+                break
+            if position == next_sample[1]:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield next_sample[0], position / fps, frame
+                next_sample = next(pending, None)
+            position += 1
+    finally:
+        cap.release()
+
+def _decode_segment(video_path: str, start_frame: int, end_frame: int,
+                    samples: List[Tuple[int, int]], output_dir: str,
+                    threads: int, keyframes: List[int] = None) -> List[Tuple[int, float, str]]:
+    """工作进程：解码一段，采样位置的帧写入 output_dir"""
+    frames = []
+    for i, timestamp, frame in _iter_segment(video_path, start_frame, end_frame, samples, threads, keyframes):
+        frame_path = os.path.join(output_dir, f"frame_{i:04d}_{timestamp:.2f}s.jpg")
+        cv2.imwrite(frame_path, frame)
+        frames.append((i, timestamp, frame_path))
+    return frames
+
+def _decode_segment_to_ring(video_path: str, start_frame: int, end_frame: int,
+                            samples: List[Tuple[int, int]], threads: int, keyframes: List[int],
+                            ring: SharedFrameRing, result_queue):
+    """工作进程：解码一段，采样帧写入共享内存槽位，只向主进程发送槽位索引"""
+    try:
+        for i, timestamp, frame in _iter_segment(video_path, start_frame, end_frame, samples, threads, keyframes):
+            slot = ring.acquire()
+            shape = ring.write(slot, frame)
+            ring.publish(slot, 1)
+            result_queue.put((slot, i, timestamp, shape))
+    except Exception as e:
+        logger.error(f"分段解码进程失败: {str(e)}")
+        result_queue.put(('error', str(e)))
+    finally:
+        result_queue.put(None)
+        ring.close()
+
+def _plan_jobs(video_path: str, frame_positions: List[int], workers: int = None) -> Tuple[List[Tuple], int, Tuple[int, ...]]:
+    """按关键帧切段并分配采样位置，返回 (各段任务, 每段解码线程数, 帧形状)
+    
+    每个任务为 (起点, 终点, [(序号, 帧序号)], 段内关键帧)，序号沿用串行路径的全局序号。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+    cap.release()
+    
+    workers = workers or Config.SEGMENTED_DECODE_WORKERS or (os.cpu_count() or 1)
+    keyframes = probe_keyframes(video_path, fps)
+    segments = plan_segments(total_frames, workers, keyframes)
+    threads = max(1, (os.cpu_count() or 1) // len(segments))
+    
+    indexed = list(enumerate(frame_positions))
+    jobs = []
+    for start, end in segments:
+        samples = [(i, pos) for i, pos in indexed if start <= pos < end]
+        if samples:
+            jobs.append((start, end, samples, [kf for kf in keyframes if start <= kf < end]))
+    
+    logger.info(f"分段解码: {len(frame_positions)} 个采样位置, {len(jobs)} 段, 每段解码线程 {threads}")
+    return jobs, threads, shape
+
+def extract_frames_segmented(video_path: str, frame_positions: List[int], workers: int = None,
+                             output_dir: str = "temp_frames") -> List[Tuple[int, float, str]]:
+    """多进程分段提取帧：时间轴按关键帧切成若干段，各进程独立打开视频解码自己的段
+    
+    frame_positions 为串行路径的采样位置（帧序号），输出与 extract_frames 相同：
+    按时间顺序的 (序号, 时间戳, 帧文件路径)。
+    """
+    jobs, threads, _ = _plan_jobs(video_path, frame_positions, workers)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(jobs) or 1, mp_context=context) as executor:
+        futures = [
+            executor.submit(_decode_segment, video_path, start, end, samples, output_dir, threads, keyframes)
+            for start, end, samples, keyframes in jobs
+        ]
+        frames = [frame for future in futures for frame in future.result()]
+    
+    frames.sort(key=lambda item: item[1])
+    return frames
+
+def iter_frames_segmented(video_path: str, frame_positions: List[int],
+                          workers: int = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """多进程分段解码，逐帧产出 (序号, 时间戳, BGR帧)，不落盘
+    
+    各段进程把采样帧解码到共享内存环，主进程复制出帧后立即释放槽位（槽位耗尽时解码进程阻塞）。
+    帧按各段解码完成的先后产出，不保证时间顺序，调用方需按时间戳排序结果。
+    """
+    jobs, threads, shape = _plan_jobs(video_path, frame_positions, workers)
+    if not jobs:
+        return
+    
+    context = multiprocessing.get_context('spawn')
+    ring = SharedFrameRing.for_frames(shape, context=context)
+    result_queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_decode_segment_to_ring,
+            args=(video_path, start, end, samples, threads, keyframes, ring, result_queue),
+            name=f"segment-decoder-{n}",
+            daemon=True
+        )
+        for n, (start, end, samples, keyframes) in enumerate(jobs)
+    ]
+    for process in processes:
+        process.start()
+    
+    try:
+        finished = 0
+        while finished < len(processes):
+            try:
+                item = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                crashed = [p.name for p in processes if p.exitcode not in (None, 0)]
+                if crashed:
+                    raise RuntimeError(f"分段解码进程异常退出: {', '.join(crashed)}")
+                continue
+            if item is None:
+                finished += 1
+                continue
+            if item[0] == 'error':
+                raise RuntimeError(f"分段解码进程失败: {item[1]}")
+            
+            slot, i, timestamp, frame_shape = item
+            # 帧会在流水线各阶段间传递，复制出槽位后立即释放
+            frame = ring.view(slot, frame_shape).copy()
+            ring.release(slot)
+            yield i, timestamp, frame
+    finally:
+        # 提前结束（流水线出错或停止）时解码进程可能阻塞在等待槽位上
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=5)
+        ring.close()
\ No newline at end of file
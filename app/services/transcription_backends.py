@@ -0,0 +1,121 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class TranscriptionBackend(ABC):
+    """语音识别后端接口
+    
+    所有后端的 transcribe 输出统一为 openai-whisper 的格式：
+    {'text': str, 'segments': [{'id', 'seek', 'start', 'end', 'text', ...}], 'language': str}
+    """
+    
+    name = "base"
+    
+    def __init__(self, model_name: str = None, device: str = None, num_threads: int = None):
+        self.model_name = model_name or Config.WHISPER_MODEL
+        self.device = device or Config.DEVICE
+        self.num_threads = num_threads or (os.cpu_count() or 1)
+        self._model = None
+    
+    @abstractmethod
+    def load(self):
+        """加载模型（重复调用不会重复加载）"""
+    
+    @abstractmethod
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> Dict:
+        """转录音频文件路径或16kHz单声道float32数组"""
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper 后端（PyTorch，默认）"""
+    
+    name = "whisper"
+    
+    def load(self):
+        if self._model is None:
+            import torch
+            import whisper
+            
+            if self.device == "cpu":
+                torch.set_num_threads(self.num_threads)
+            self._model = whisper.load_model(self.model_name).to(self.device)
+            logger.info(f"Whisper模型加载完成: {self.model_name} ({self.device})")
+        return self._model
+    
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> Dict:
+        model = self.load()
+        result = model.transcribe(audio, language=language, task="transcribe")
+        return {
+            'text': result['text'],
+            'segments': result.get('segments', []),
+            'language': result.get('language', language or 'unknown')
+        }
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """faster-whisper 后端（CTranslate2，CPU上默认int8量化）"""
+    
+    name = "faster-whisper"
+    
+    def __init__(self, model_name: str = None, device: str = None, num_threads: int = None,
+                 compute_type: str = None):
+        super().__init__(model_name, device, num_threads)
+        if compute_type is None:
+            compute_type = Config.FASTER_WHISPER_COMPUTE_TYPE if self.device == "cpu" else "float16"
+        self.compute_type = compute_type
+    
+    def load(self):
+        if self._model is None:
+            from faster_whisper import WhisperModel
+            
+            self._model = WhisperModel(
+                self.model_name,
+                device=self.device,
+                compute_type=self.compute_type,
+                cpu_threads=self.num_threads
+            )
+            logger.info(f"faster-whisper模型加载完成: {self.model_name} ({self.device}, {self.compute_type})")
+        return self._model
+    
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> Dict:
+        model = self.load()
+        segments_iter, info = model.transcribe(audio, language=language, task="transcribe")
+        
+        segments = []
+        for segment in segments_iter:
+            # 转换为与openai-whisper一致的分段字段
+            segments.append({
+                'id': len(segments),
+                'seek': segment.seek,
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text,
+                'tokens': list(segment.tokens),
+                'temperature': segment.temperature,
+                'avg_logprob': segment.avg_logprob,
+                'compression_ratio': segment.compression_ratio,
+                'no_speech_prob': segment.no_speech_prob
+            })
+        
+        return {
+            'text': ''.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': info.language or language or 'unknown'
+        }
+
+TRANSCRIPTION_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend
+}
+
+def get_transcription_backend(name: str = None, **kwargs) -> TranscriptionBackend:
+    """根据名称（默认取 Config.TRANSCRIPTION_BACKEND）创建语音识别后端"""
+    name = name or Config.TRANSCRIPTION_BACKEND
+    if name not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"不支持的语音识别后端: {name}，可选: {', '.join(TRANSCRIPTION_BACKENDS)}")
+    return TRANSCRIPTION_BACKENDS[name](**kwargs)
\ No newline at end of file
@@ -0,0 +1,316 @@
+import os
+import wave
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from app.services.transcription_backends import get_transcription_backend
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# 进程池工作进程内的识别后端（每个进程各持有一份模型）
+_worker_backend = None
+
+# 主进程内长期复用的转录进程池，及其创建参数
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[Tuple] = None
+
+def load_audio_16k(audio_path: str) -> np.ndarray:
+    """加载音频为16kHz单声道float32数组"""
+    try:
+        from whisper.audio import load_audio
+        return load_audio(audio_path, sr=SAMPLE_RATE)
+    except ImportError:
+        logger.warning("whisper.audio 不可用，使用wave模块读取音频")
+    
+    with wave.open(audio_path, 'rb') as wf:
+        channels = wf.getnchannels()
+        sample_rate = wf.getframerate()
+        sample_width = wf.getsampwidth()
+        raw = wf.readframes(wf.getnframes())
+    
+    if sample_width != 2:
+        raise ValueError(f"不支持的采样位宽: {sample_width * 8}bit")
+    
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    
+    if sample_rate != SAMPLE_RATE and len(samples) > 0:
+        # 线性插值重采样
+        target_length = int(len(samples) * SAMPLE_RATE / sample_rate)
+        source_times = np.arange(len(samples)) / sample_rate
+        target_times = np.arange(target_length) / SAMPLE_RATE
+        samples = np.interp(target_times, source_times, samples).astype(np.float32)
+    
+    return samples
+
+class VoiceActivityDetector:
+    """语音活动检测（优先WebRTC VAD，不可用时回退到能量检测）"""
+    
+    def __init__(self,
+                 frame_ms: int = None,
+                 energy_margin_db: float = None,
+                 min_speech_ms: int = None,
+                 min_silence_ms: int = None,
+                 padding_ms: int = None,
+                 aggressiveness: int = None):
+        self.frame_ms = frame_ms or Config.VAD_FRAME_MS
+        self.energy_margin_db = energy_margin_db if energy_margin_db is not None else Config.VAD_ENERGY_MARGIN_DB
+        self.min_speech_ms = min_speech_ms if min_speech_ms is not None else Config.VAD_MIN_SPEECH_MS
+        self.min_silence_ms = min_silence_ms if min_silence_ms is not None else Config.VAD_MIN_SILENCE_MS
+        self.padding_ms = padding_ms if padding_ms is not None else Config.VAD_PADDING_MS
+        self.aggressiveness = aggressiveness if aggressiveness is not None else Config.VAD_AGGRESSIVENESS
+    
+    def _frame_flags_webrtc(self, audio: np.ndarray) -> Optional[np.ndarray]:
+        """使用webrtcvad逐帧判断是否为语音"""
+        try:
+            import webrtcvad
+        except ImportError:
+            return None
+        
+        # webrtcvad 仅支持 10/20/30ms 帧
+        if self.frame_ms not in (10, 20, 30):
+            return None
+        
+        vad = webrtcvad.Vad(self.aggressiveness)
+        frame_size = SAMPLE_RATE * self.frame_ms // 1000
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        n_frames = len(pcm) // frame_size
+        
+        flags = np.zeros(n_frames, dtype=bool)
+        for i in range(n_frames):
+            chunk = pcm[i * frame_size:(i + 1) * frame_size].tobytes()
+            flags[i] = vad.is_speech(chunk, SAMPLE_RATE)
+        return flags
+    
+    def _frame_flags_energy(self, audio: np.ndarray) -> np.ndarray:
+        """基于短时能量逐帧判断是否为语音"""
+        frame_size = SAMPLE_RATE * self.frame_ms // 1000
+        n_frames = len(audio) // frame_size
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+        
+        frames = audio[:n_frames * frame_size].reshape(n_frames, frame_size)
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        energy_db = 20 * np.log10(rms + 1e-10)
+        
+        # 以低分位能量估计噪声底，高于噪声底一定余量视为语音
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = max(noise_floor + self.energy_margin_db, Config.VAD_MIN_ENERGY_DB)
+        return energy_db > threshold
+    
+    def detect(self, audio: np.ndarray) -> List[Tuple[float, float]]:
+        """检测语音区间，返回 [(start, end), ...]（秒）"""
+        flags = self._frame_flags_webrtc(audio)
+        if flags is None:
+            flags = self._frame_flags_energy(audio)
+        
+        frame_sec = self.frame_ms / 1000.0
+        duration = len(audio) / SAMPLE_RATE
+        
+        # 连续语音帧合并为区间
+        spans = []
+        start = None
+        for i, is_speech in enumerate(flags):
+            if is_speech and start is None:
+                start = i
+            elif not is_speech and start is not None:
+                spans.append([start * frame_sec, i * frame_sec])
+                start = None
+        if start is not None:
+            spans.append([start * frame_sec, len(flags) * frame_sec])
+        
+        # 合并间隔过短的区间
+        merged = []
+        for span in spans:
+            if merged and span[0] - merged[-1][1] < self.min_silence_ms / 1000.0:
+                merged[-1][1] = span[1]
+            else:
+                merged.append(span)
+        
+        # 丢弃过短的区间并添加前后余量
+        padding = self.padding_ms / 1000.0
+        result = []
+        for span_start, span_end in merged:
+            if span_end - span_start < self.min_speech_ms / 1000.0:
+                continue
+            padded_start = max(0.0, span_start - padding)
+            padded_end = min(duration, span_end + padding)
+            if result and padded_start <= result[-1][1]:
+                result[-1] = (result[-1][0], padded_end)
+            else:
+                result.append((padded_start, padded_end))
+        
+        return result
+
+def pack_speech_spans(spans: List[Tuple[float, float]], chunk_seconds: float) -> List[Tuple[float, float]]:
+    """将语音区间打包为不超过chunk_seconds的转录块"""
+    chunks = []
+    for span_start, span_end in spans:
+        # 过长的区间先按块长切分
+        while span_end - span_start > chunk_seconds:
+            chunks.append((span_start, span_start + chunk_seconds))
+            span_start += chunk_seconds
+        
+        if chunks and span_end - chunks[-1][0] <= chunk_seconds:
+            # 与上一个块合并（中间的短静音一起送入模型）
+            chunks[-1] = (chunks[-1][0], span_end)
+        else:
+            chunks.append((span_start, span_end))
+    
+    return chunks
+
+def _init_worker(backend_name: str, model_name: str, device: str, num_threads: int):
+    """工作进程初始化：加载本进程独立的识别模型"""
+    global _worker_backend
+    _worker_backend = get_transcription_backend(
+        backend_name,
+        model_name=model_name,
+        device=device,
+        num_threads=num_threads
+    )
+    _worker_backend.load()
+
+def _transcribe_chunk(chunk_index: int, audio: np.ndarray, language: Optional[str]) -> Tuple[int, Dict]:
+    """工作进程中转录单个语音块"""
+    result = _worker_backend.transcribe(audio, language=language)
+    return chunk_index, result
+
+def get_transcription_pool(backend_name: str, model_name: str, device: str, workers: int) -> ProcessPoolExecutor:
+    """长期复用的转录进程池（按需创建，每个工作进程只加载一次模型），参数变化时重建
+    
+    使用 spawn 启动：主进程中已有流水线线程和分析线程池，fork 可能复制被持有的锁而死锁
+    """
+    global _pool, _pool_key
+    key = (backend_name, model_name, device, workers)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            num_threads = max(1, (os.cpu_count() or 1) // workers)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(backend_name, model_name, device, num_threads)
+            )
+            _pool_key = key
+            logger.info(f"转录进程池已创建: {workers} 个工作进程")
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """进程池损坏（工作进程异常退出或模型加载失败）时丢弃，下次调用重建"""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is pool:
+            _pool, _pool_key = None, None
+    pool.shutdown(wait=False)
+
+def shutdown_transcription_pool():
+    """关闭转录进程池"""
+    global _pool, _pool_key
+    with _pool_lock:
+        pool, _pool, _pool_key = _pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+class TranscriptionEngine:
+    """VAD门控的分块并行转录引擎"""
+    
+    def __init__(self,
+                 backend_name: str = None,
+                 model_name: str = None,
+                 device: str = None,
+                 workers: int = None,
+                 chunk_seconds: float = None,
+                 language: Optional[str] = None,
+                 vad: VoiceActivityDetector = None):
+        self.backend_name = backend_name or Config.TRANSCRIPTION_BACKEND
+        self.model_name = model_name or Config.WHISPER_MODEL
+        self.device = device or Config.DEVICE
+        self.workers = workers or Config.TRANSCRIPTION_WORKERS
+        self.chunk_seconds = chunk_seconds or Config.TRANSCRIPTION_CHUNK_SECONDS
+        self.language = language if language is not None else Config.WHISPER_LANGUAGE
+        self.vad = vad or VoiceActivityDetector()
+    
+    def _stitch(self, chunks: List[Tuple[float, float]], results: Dict[int, Dict]) -> List[Dict]:
+        """将各块的时间戳平移回全局时间轴"""
+        segments = []
+        for chunk_index, (offset, _) in enumerate(chunks):
+            result = results.get(chunk_index)
+            if not result:
+                continue
+            for segment in result.get('segments', []):
+                stitched = dict(segment)
+                stitched['id'] = len(segments)
+                stitched['start'] = round(segment.get('start', 0) + offset, 3)
+                stitched['end'] = round(segment.get('end', 0) + offset, 3)
+                if 'seek' in stitched:
+                    # seek 以梅尔帧计（每秒100帧）
+                    stitched['seek'] = int(offset * 100) + segment.get('seek', 0)
+                segments.append(stitched)
+        return segments
+    
+    def transcribe(self, audio_path: str) -> Dict:
+        """转录音频文件，输出与whisper transcribe一致的text/segments/language"""
+        audio = load_audio_16k(audio_path)
+        duration = len(audio) / SAMPLE_RATE
+        
+        spans = self.vad.detect(audio)
+        chunks = pack_speech_spans(spans, self.chunk_seconds)
+        speech_seconds = sum(end - start for start, end in spans)
+        logger.info(f"VAD检测到 {len(spans)} 个语音区间，共 {speech_seconds:.1f}/{duration:.1f} 秒，打包为 {len(chunks)} 块")
+        
+        if not chunks:
+            return {
+                'text': '',
+                'segments': [],
+                'language': self.language or 'unknown',
+                'duration': duration
+            }
+        
+        def chunk_audio(index: int) -> np.ndarray:
+            start, end = chunks[index]
+            return audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        
+        # 进程池固定为 workers 个进程、跨视频复用，块数较少时只有部分进程参与
+        executor = get_transcription_pool(self.backend_name, self.model_name, self.device, max(1, self.workers))
+        results = {}
+        try:
+            # 首块单独转录，用于确定语言
+            _, first_result = executor.submit(_transcribe_chunk, 0, chunk_audio(0), self.language).result()
+            results[0] = first_result
+            language = self.language or first_result.get('language', 'unknown')
+            logger.info(f"转录语言: {language}")
+            
+            futures = [
+                executor.submit(_transcribe_chunk, i, chunk_audio(i), language)
+                for i in range(1, len(chunks))
+            ]
+            for future in futures:
+                chunk_index, result = future.result()
+                results[chunk_index] = result
+        except BrokenProcessPool:
+            _discard_pool(executor)
+            raise
+        
+        segments = self._stitch(chunks, results)
+        text = ''.join(results[i].get('text', '') for i in range(len(chunks)) if i in results)
+        
+        return {
+            'text': text,
+            'segments': segments,
+            'language': language,
+            'duration': duration,
+            'speech_spans': [[round(start, 3), round(end, 3)] for start, end in spans]
+        }
\ No newline at end of file
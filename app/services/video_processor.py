@@ -2,9 +2,13 @@ import cv2
 import os
 import yt_dlp
 import tempfile
-from typing import List, Tuple, Optional, Dict
+import numpy as np
+from typing import List, Tuple, Optional, Dict, Iterable, Iterator
 import logging
 
+from config import Config
+from app.services.frame_sources import FrameSource, OpenCVFrameSource
+
 logger = logging.getLogger(__name__)
 
 class VideoProcessor:
@@ -261,50 +265,164 @@ class VideoProcessor:
         logger.warning("download_youtube_video 方法已弃用，请使用 download_online_video")
         return self.download_online_video(url, output_dir)
     
-    def extract_frames(self, video_path: str, interval: int = 5) -> List[Tuple[int, float, str]]:
-        """每interval秒提取一帧"""
+    def get_sample_positions(self, video_path: str, interval: int = None) -> List[int]:
+        """每interval秒（默认 Config.FRAME_EXTRACTION_INTERVAL）一帧的采样位置（帧序号）"""
+        interval = interval or Config.FRAME_EXTRACTION_INTERVAL
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        
+        frame_interval = max(1, int(fps * interval))
+        return list(range(0, total_frames, frame_interval))
+    
+    def _use_segmented_decode(self, video_path: str, source: FrameSource = None) -> bool:
+        """OpenCV 帧来源的长视频使用分段多进程解码"""
+        if not Config.SEGMENTED_DECODE_ENABLED or (source is not None and source.name != OpenCVFrameSource.name):
+            return False
+        return self.get_video_info(video_path)['duration'] >= Config.SEGMENTED_DECODE_MIN_DURATION
+    
+    def iter_frames(self, video_path: str, interval: int = None,
+                    source: FrameSource = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """每interval秒解码一帧，逐帧产出 (序号, 时间戳, BGR帧)，不落盘
+        
+        source 为帧来源（默认 OpenCV），见 get_tier_frame_source。
+        长视频自动分段多进程解码，此时帧不按时间顺序产出
+        """
+        if self._use_segmented_decode(video_path, source):
+            from app.services.segmented_decoder import iter_frames_segmented
+            
+            return iter_frames_segmented(video_path, self.get_sample_positions(video_path, interval))
+        source = source or OpenCVFrameSource()
+        return source.iter_frames(video_path, interval or Config.FRAME_EXTRACTION_INTERVAL)
+    
+    def extract_frames(self, video_path: str, interval: int = None,
+                       source: FrameSource = None) -> List[Tuple[int, float, str]]:
+        """每interval秒提取一帧（长视频自动分段多进程解码，结果与串行一致）"""
         frames = []
         
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError("无法打开视频文件")
+            if self._use_segmented_decode(video_path, source):
+                from app.services.segmented_decoder import extract_frames_segmented
+                
+                frames = extract_frames_segmented(video_path, self.get_sample_positions(video_path, interval))
+                logger.info(f"成功提取 {len(frames)} 帧（分段解码）")
+                return frames
             
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps
+            source = source or OpenCVFrameSource()
+            for i, timestamp, frame in source.iter_frames(video_path, interval or Config.FRAME_EXTRACTION_INTERVAL):
+                # 保存帧到临时文件
+                frame_filename = f"frame_{i:04d}_{timestamp:.2f}s.jpg"
+                frame_path = os.path.join("temp_frames", frame_filename)
+                os.makedirs("temp_frames", exist_ok=True)
+                
+                cv2.imwrite(frame_path, frame)
+                frames.append((i, timestamp, frame_path))
+                
+                logger.debug(f"提取帧 {i}: {timestamp:.2f}s -> {frame_path}")
             
-            # 计算需要提取的帧
-            frame_interval = int(fps * interval)
-            frame_positions = list(range(0, total_frames, frame_interval))
+            logger.info(f"成功提取 {len(frames)} 帧")
+            return frames
             
-            logger.info(f"视频信息: {total_frames}帧, {fps}fps, {duration:.2f}秒")
-            logger.info(f"将提取 {len(frame_positions)} 帧")
+        except Exception as e:
+            logger.error(f"提取帧失败: {str(e)}")
+            raise
+    
+    def extract_frames_to_ring(self, video_path: str, ring, task_queues: List, interval: int = None,
+                               stop_event=None, skip_positions=None,
+                               frames: Iterable[Tuple[int, float, np.ndarray]] = None) -> int:
+        """每interval秒解码一帧，直接解码到共享内存槽位，只向各分析进程发送槽位索引
+        
+        task_queues 中每个队列对应一个分析进程，槽位在所有分析进程释放后回收；
+        结束（或 stop_event 置位）时向每个队列发送 None。skip_positions 中的帧序号（如检查点中
+        已分析的帧）不解码。返回写入的帧数。
+        给出 frames（如 ffmpeg 或镜头自适应帧来源的 iter_frames）时改为把其产出的帧复制到槽位，
+        此时 interval 和 skip_positions 不起作用（由帧来源和调用方过滤）。
+        """
+        from app.services.frame_ring_buffer import wait_for_slot
+        
+        if frames is not None:
+            return self._frames_to_ring(frames, ring, task_queues, stop_event)
+        
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("无法打开视频文件")
+        
+        count = 0
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            frame_positions = self.get_sample_positions(video_path, interval)
+            logger.info(f"将提取 {len(frame_positions)} 帧到共享内存 ({ring.slots} 个槽位)")
             
             for i, frame_pos in enumerate(frame_positions):
+                if skip_positions and frame_pos in skip_positions:
+                    continue
+                slot = wait_for_slot(ring, Config.FRAME_RING_WAIT_TIMEOUT, stop_event)
+                if slot is None:
+                    logger.info("分析已中止，停止提取帧")
+                    break
+                target = ring.view(slot, (height, width, 3))
+                
                 cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
-                ret, frame = cap.read()
+                ret, frame = cap.read(target)
+                if not ret:
+                    ring.publish(slot, 1)
+                    ring.release(slot)
+                    continue
+                if not np.shares_memory(frame, target):
+                    # 解码器未能原地写入（如帧尺寸与容器声明不一致），退化为一次复制
+                    ring.write(slot, frame)
                 
-                if ret:
-                    timestamp = frame_pos / fps
-                    
-                    # 保存帧到临时文件
-                    frame_filename = f"frame_{i:04d}_{timestamp:.2f}s.jpg"
-                    frame_path = os.path.join("temp_frames", frame_filename)
-                    os.makedirs("temp_frames", exist_ok=True)
-                    
-                    cv2.imwrite(frame_path, frame)
-                    frames.append((i, timestamp, frame_path))
-                    
-                    logger.debug(f"提取帧 {i}: {timestamp:.2f}s -> {frame_path}")
+                ring.publish(slot, len(task_queues))
+                for task_queue in task_queues:
+                    task_queue.put((slot, i, frame_pos / fps, frame.shape))
+                count += 1
             
+            logger.info(f"成功提取 {count} 帧到共享内存")
+            return count
+            
+        except Exception as e:
+            logger.error(f"提取帧到共享内存失败: {str(e)}")
+            raise
+        finally:
             cap.release()
-            logger.info(f"成功提取 {len(frames)} 帧")
-            return frames
+            for task_queue in task_queues:
+                task_queue.put(None)
+    
+    def _frames_to_ring(self, frames: Iterable[Tuple[int, float, np.ndarray]], ring, task_queues: List,
+                        stop_event=None) -> int:
+        """把帧来源产出的帧逐个复制到共享内存槽位"""
+        from app.services.frame_ring_buffer import wait_for_slot
+        
+        iterator = iter(frames)
+        count = 0
+        try:
+            for i, timestamp, frame in iterator:
+                slot = wait_for_slot(ring, Config.FRAME_RING_WAIT_TIMEOUT, stop_event)
+                if slot is None:
+                    logger.info("分析已中止，停止提取帧")
+                    break
+                shape = ring.write(slot, frame)
+                ring.publish(slot, len(task_queues))
+                for task_queue in task_queues:
+                    task_queue.put((slot, i, timestamp, shape))
+                count += 1
             
+            logger.info(f"成功提取 {count} 帧到共享内存")
+            return count
         except Exception as e:
-            logger.error(f"提取帧失败: {str(e)}")
+            logger.error(f"提取帧到共享内存失败: {str(e)}")
             raise
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+            for task_queue in task_queues:
+                task_queue.put(None)
     
     def get_video_info(self, video_path: str) -> dict:
         """获取视频基本信息"""
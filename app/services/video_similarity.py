@@ -0,0 +1,231 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import Config
+from app.services.feature_store import FeatureStore, get_feature_store
+
+logger = logging.getLogger(__name__)
+
+# 每个字节中1的个数，用于计算汉明距离（兼容没有 np.bitwise_count 的NumPy版本）
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def perceptual_hash(frame: np.ndarray) -> int:
+    """64位DCT感知哈希（pHash）：32x32灰度图DCT的低频8x8系数与其中位数比较"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+def hamming_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """两组64位哈希两两之间的汉明距离，形状 (len(a), len(b))"""
+    xor = np.bitwise_xor(a.astype(np.uint64)[:, None], b.astype(np.uint64)[None, :])
+    return _POPCOUNT[xor.view(np.uint8)].reshape(*xor.shape, 8).sum(axis=-1)
+
+def phash_match_ratio(query: np.ndarray, candidate: np.ndarray, max_distance: int = None) -> Optional[float]:
+    """query 中能在 candidate 里找到近似相同帧（汉明距离不超过 max_distance）的比例
+    
+    哈希为 0 的帧（未计算）不参与；任一方没有哈希时返回 None。
+    """
+    max_distance = Config.PHASH_MAX_DISTANCE if max_distance is None else max_distance
+    query, candidate = query[query != 0], candidate[candidate != 0]
+    if not len(query) or not len(candidate):
+        return None
+    return float((hamming_distances(query, candidate).min(axis=1) <= max_distance).mean())
+
+class IVFIndex:
+    """倒排文件（IVF）近似检索：球面k-means粗聚类，簇内向量按int8标量量化存储
+    
+    查询时只计算与 nprobe 个最近簇中向量的（量化）内积；构建后新增的向量放在暴力检索的尾部，
+    尾部过大时由调用方重建。
+    """
+    
+    def __init__(self, vectors: np.ndarray, nlist: int = None, iterations: int = 10,
+                 train_size: int = 50000, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        nlist = nlist or max(1, int(np.sqrt(len(vectors))))
+        sample = vectors[rng.choice(len(vectors), min(train_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for k in range(nlist):
+                members = sample[assign == k]
+                if len(members):
+                    centroids[k] = members.sum(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        self.ids = order.astype(np.int64)
+        self.codes = self._quantize(vectors[order])
+        self.list_offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self.size = len(vectors)
+    
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> np.ndarray:
+        # 向量已L2归一化，各分量在 [-1, 1]
+        return np.clip(np.round(vectors * 127), -127, 127).astype(np.int8)
+    
+    def search(self, query: np.ndarray, candidates: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回近似得分最高的 candidates 个 (向量编号, 近似内积)"""
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        ranges = [np.arange(self.list_offsets[k], self.list_offsets[k + 1]) for k in probes]
+        positions = np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+        if not len(positions):
+            return positions, np.zeros(0, dtype=np.float32)
+        scores = (self.codes[positions].astype(np.float32) @ query) / 127
+        top = np.argsort(-scores)[:candidates]
+        return self.ids[positions[top]], scores[top]
+
+class VideoSimilarityIndex:
+    """跨视频相似检索：每个视频的签名为其帧CLIP嵌入的均值（L2归一化），近重复再用帧感知哈希确认
+    
+    签名持久化在 {FEATURE_STORE_DIR}/videos（与帧特征库相同的追加式分片格式），启动时为帧特征库中
+    尚无签名的任务补建。视频数少于 SIMILARITY_IVF_THRESHOLD 时用NumPy暴力检索（精确），否则用
+    IVF 近似检索并以精确内积重排。
+    """
+    
+    def __init__(self, frame_store: FeatureStore = None, directory: str = None):
+        self.frame_store = frame_store or get_feature_store()
+        self.signatures = FeatureStore(
+            directory or os.path.join(self.frame_store.directory, 'videos'), max_detections=1
+        )
+        self.task_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        # 签名矩阵按容量倍增预留，vectors 为已用部分的视图
+        self._buffer = np.zeros((0, 0), dtype=np.float32)
+        self.vectors = self._buffer
+        self._ivf: Optional[IVFIndex] = None
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        entries = self.signatures.entries()
+        if entries:
+            self.task_ids = [entry[0] for entry in entries]
+            self.positions = {task_id: i for i, task_id in enumerate(self.task_ids)}
+            self._buffer = self.signatures.embeddings([entry[3] for entry in entries]).astype(np.float32)
+            self.vectors = self._buffer
+        
+        missing = [task_id for task_id in list(self.frame_store.tasks) if task_id not in self.positions]
+        for task_id in missing:
+            self.add_task(task_id)
+        logger.info(f"视频相似索引已加载: {len(self.task_ids)} 个视频（补建 {len(missing)} 个）")
+    
+    def video_signature(self, task_id: str) -> Optional[np.ndarray]:
+        """视频签名：帧嵌入均值（L2归一化）"""
+        entries = self.frame_store.entries([task_id])
+        if not entries:
+            return None
+        mean = self.frame_store.embeddings([entry[3] for entry in entries]).astype(np.float32).mean(axis=0)
+        norm = np.linalg.norm(mean)
+        return mean / norm if norm > 0 else None
+    
+    def _task_hashes(self, task_id: str) -> np.ndarray:
+        return self.frame_store.phashes([entry[3] for entry in self.frame_store.entries([task_id])])
+    
+    def _append_vector(self, vector: np.ndarray):
+        n = len(self.task_ids)
+        if n >= len(self._buffer):
+            grown = np.zeros((max(16, 2 * len(self._buffer)), len(vector)), dtype=np.float32)
+            if n:
+                grown[:n] = self._buffer[:n]
+            self._buffer = grown
+        self._buffer[n] = vector
+        self.vectors = self._buffer[:n + 1]
+    
+    def add_task(self, task_id: str, replace: bool = False) -> bool:
+        """任务完成后加入索引；已在索引中的任务只在 replace 时更新签名（如中断后恢复完成）"""
+        if task_id in self.positions and not replace:
+            return False
+        signature = self.video_signature(task_id)
+        if signature is None:
+            return False
+        
+        with self._lock:
+            self.signatures.append(task_id, 0, 0.0, {'clip_embedding': signature})
+            # 与持久化的float16签名保持一致
+            vector = signature.astype(np.float16).astype(np.float32)
+            if task_id in self.positions:
+                # IVF 中的量化向量不更新，检索时按精确签名重排
+                self._buffer[self.positions[task_id]] = vector
+                return True
+            self._append_vector(vector)
+            self.positions[task_id] = len(self.task_ids)
+            self.task_ids.append(task_id)
+            if self._ivf is not None and len(self.task_ids) > self._ivf.size * 1.5:
+                # 新增向量过多，下次检索时重建
+                self._ivf = None
+        return True
+    
+    def _candidates(self, query: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """得分最高的 count 个 (视频编号, 余弦相似度)"""
+        n = len(self.task_ids)
+        if n < Config.SIMILARITY_IVF_THRESHOLD:
+            scores = self.vectors @ query
+            top = np.argpartition(-scores, min(count, n - 1))[:count]
+            return top, scores[top]
+        
+        if self._ivf is None:
+            start = time.perf_counter()
+            self._ivf = IVFIndex(self.vectors)
+            logger.info(f"IVF索引构建完成: {n} 个视频, {len(self._ivf.centroids)} 个簇, "
+                        f"耗时 {time.perf_counter() - start:.2f}秒")
+        ids, _ = self._ivf.search(query, count * 4, Config.SIMILARITY_IVF_NPROBE)
+        # 构建后新增的视频暴力检索
+        tail = np.arange(self._ivf.size, n)
+        ids = np.concatenate([ids, tail])
+        # 以精确内积重排
+        scores = self.vectors[ids] @ query
+        top = np.argsort(-scores)[:count]
+        return ids[top], scores[top]
+    
+    def search(self, task_id: str, top_k: int = 10) -> List[Dict]:
+        """与指定任务最相似的 top_k 个已分析视频"""
+        if task_id not in self.positions and not self.add_task(task_id):
+            raise KeyError(task_id)
+        
+        with self._lock:
+            query = self.vectors[self.positions[task_id]]
+            ids, scores = self._candidates(query, min(top_k + 1, len(self.task_ids)))
+        
+        order = np.argsort(-scores)
+        query_hashes = self._task_hashes(task_id)
+        results = []
+        for i in order:
+            candidate = self.task_ids[int(ids[i])]
+            if candidate == task_id:
+                continue
+            similarity = float(scores[i])
+            phash_match = phash_match_ratio(query_hashes, self._task_hashes(candidate))
+            near_duplicate = similarity >= Config.DUPLICATE_SIMILARITY and (
+                phash_match is None or phash_match >= Config.DUPLICATE_PHASH_MATCH
+            )
+            results.append({
+                'task_id': candidate,
+                'similarity': round(similarity, 4),
+                'phash_match': None if phash_match is None else round(phash_match, 4),
+                'near_duplicate': near_duplicate
+            })
+            if len(results) >= top_k:
+                break
+        return results
+
+# 进程内共享的相似索引
+_similarity_index = None
+_similarity_index_lock = threading.Lock()
+
+def get_similarity_index() -> VideoSimilarityIndex:
+    """获取共享的视频相似索引（首次调用时加载并补建签名）"""
+    global _similarity_index
+    with _similarity_index_lock:
+        if _similarity_index is None:
+            _similarity_index = VideoSimilarityIndex()
+        return _similarity_index
\ No newline at end of file
@@ -0,0 +1,114 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def file_etag(file_path: str, *parts: Any) -> str:
+    """由文件修改时间、大小和查询参数生成弱ETag，不读取文件内容
+    
+    结果文件每次保存（包括列式文件）都会重写，修改时间变化即视为新版本。
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()[:16]
+    return f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 的弱比较"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in candidates)
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """按 Accept-Encoding 选择压缩方式：支持 br（需要 brotli）时优先，其次 gzip"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.RESPONSE_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL)
+    return body
+
+class ResponseCache:
+    """按 (ETag, 压缩方式) 缓存已序列化、已压缩的响应体（LRU）"""
+    
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_ENTRIES
+        self._entries: 'OrderedDict[Tuple[str, Optional[str]], Tuple[bytes, Optional[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple[str, Optional[str]]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """缓存的 (响应体, 实际压缩方式)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: Tuple[str, Optional[str]], entry: Tuple[bytes, Optional[str]]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_response_cache = ResponseCache()
+
+def cached_json_response(request: Request, etag: str, build: Callable[[], Any]) -> Response:
+    """带 ETag 与压缩协商的JSON响应
+    
+    If-None-Match 命中时直接返回 304，不调用 build；否则 build() 返回要序列化的对象
+    （或已序列化的JSON字节），序列化和压缩结果按 (ETag, 压缩方式) 缓存。
+    """
+    headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    
+    requested = negotiate_encoding(request.headers.get('accept-encoding'))
+    entry = _response_cache.get((etag, requested))
+    if entry is None:
+        payload = build()
+        body = payload if isinstance(payload, bytes) else json.dumps(
+            payload, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+        ).encode('utf-8')
+        # 小响应不压缩
+        encoding = requested if len(body) >= Config.RESPONSE_COMPRESS_MIN_BYTES else None
+        entry = (compress(body, encoding), encoding)
+        _response_cache.put((etag, requested), entry)
+    body, encoding = entry
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type='application/json', headers=headers)
\ No newline at end of file
@@ -1,57 +1,180 @@
 import json
-import pandas as pd
+import numpy as np
+from collections import Counter
+from openpyxl import Workbook
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle
+from reportlab.graphics.shapes import Drawing
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.charts.legends import Legend
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from typing import Dict, Any, List
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+import threading
 import logging
 import os
 
+from config import Config
+from app.services.result_storage import ColumnarResultStore
+from app.services.frame_results import FrameResultTable, SCALAR_FIELDS, dump_json
+
 logger = logging.getLogger(__name__)
 
+# 帧分析详情工作表的表头
+FRAME_SHEET_HEADER = ['帧号', '时间戳(秒)', '清晰度评分', '光照评分', '人脸检测', '人脸数量', '水印检测', '水印文字',
+                      '内容丰富度', '综合评分', '问题']
+
+# 列式帧结果每次转换的行数
+EXCEL_CHUNK_ROWS = 4096
+
+# 中文字体：优先使用 static/fonts/msyh.ttc，不存在时使用 reportlab 内置的CID字体
+CHINESE_FONT_PATH = os.path.join('static', 'fonts', 'msyh.ttc')
+FALLBACK_CHINESE_FONT = 'STSong-Light'
+
+# 评分时间线的曲线：(帧结果字段, 图例, 颜色)
+TIMELINE_SERIES = [
+    ('overall_score', '综合评分', colors.HexColor('#1f77b4')),
+    ('clarity_score', '清晰度', colors.HexColor('#2ca02c')),
+    ('lighting_score', '光照', colors.HexColor('#ff7f0e'))
+]
+
+# 字体和段落样式在进程内只创建一次，各报告共享
+_font_lock = threading.Lock()
+_chinese_font: Optional[str] = None
+_sample_styles = None
+_style_cache: Dict[Tuple, ParagraphStyle] = {}
+
+def _register_chinese_font() -> str:
+    try:
+        if os.path.exists(CHINESE_FONT_PATH):
+            pdfmetrics.registerFont(TTFont('MSYH', CHINESE_FONT_PATH))
+            logger.info("中文字体注册成功")
+            return 'MSYH'
+        logger.warning("中文字体文件不存在，使用内置CID字体")
+    except Exception as e:
+        logger.warning(f"中文字体注册失败: {str(e)}")
+    pdfmetrics.registerFont(UnicodeCIDFont(FALLBACK_CHINESE_FONT))
+    return FALLBACK_CHINESE_FONT
+
+def get_chinese_font() -> str:
+    """注册中文字体（每个进程只注册一次），返回字体名"""
+    global _chinese_font, _sample_styles
+    with _font_lock:
+        if _chinese_font is None:
+            _chinese_font = _register_chinese_font()
+            _sample_styles = getSampleStyleSheet()
+        return _chinese_font
+
+def get_chinese_style(style_name: str, **kwargs) -> ParagraphStyle:
+    """支持中文的段落样式，按 (样式名, 参数) 缓存；样式只读使用，可在各报告间共享"""
+    key = (style_name, tuple(sorted(kwargs.items())))
+    style = _style_cache.get(key)
+    if style is None:
+        font = get_chinese_font()
+        style = _style_cache[key] = ParagraphStyle(
+            f'Chinese{style_name}',
+            parent=_sample_styles[style_name],
+            fontName=font,
+            **kwargs
+        )
+    return style
+
+def bucket_means(x: np.ndarray, y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """点数超过 max_points 时按相邻分桶取均值"""
+    if len(x) <= max_points:
+        return x, y
+    starts = np.linspace(0, len(x), max_points + 1).astype(np.int64)[:-1]
+    counts = np.diff(np.append(starts, len(x)))
+    return np.add.reduceat(x, starts) / counts, np.add.reduceat(y, starts) / counts
+
+def frame_column(frame_analyses, name: str) -> np.ndarray:
+    """帧结果字段的整列数组（FrameResultTable 直接取列）"""
+    if isinstance(frame_analyses, FrameResultTable) and frame_analyses.regular:
+        return frame_analyses.column(name).astype(np.float64)
+    return np.fromiter((frame.get(name, 0) for frame in frame_analyses), dtype=np.float64, count=len(frame_analyses))
+
 class ReportGenerator:
     """报告生成器"""
     
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._register_chinese_font()
-    
-    def _register_chinese_font(self):
-        """注册中文字体"""
-        try:
-            font_path = os.path.join('static', 'fonts', 'msyh.ttc')
-            if os.path.exists(font_path):
-                pdfmetrics.registerFont(TTFont('MSYH', font_path))
-                logger.info("中文字体注册成功")
-            else:
-                logger.warning("中文字体文件不存在，使用默认字体")
-        except Exception as e:
-            logger.warning(f"中文字体注册失败: {str(e)}")
+        self.font = get_chinese_font()
     
     def _get_chinese_style(self, style_name, **kwargs):
-        """获取支持中文的样式"""
-        try:
-            base_style = self.styles[style_name]
-            chinese_style = ParagraphStyle(
-                f'Chinese{style_name}',
-                parent=base_style,
-                fontName='MSYH',
-                **kwargs
-            )
-            return chinese_style
-        except:
-            return self.styles[style_name]
+        """获取支持中文的样式（进程内缓存）"""
+        return get_chinese_style(style_name, **kwargs)
+    
+    def _long_tables(self, header: List, rows: Iterable[List], col_widths: List[float],
+                     style: TableStyle) -> Iterator[LongTable]:
+        """长表格按 PDF_TABLE_CHUNK_ROWS 行分块为多个 LongTable（各块重复表头），避免整表一次排版和反复拆分"""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == Config.PDF_TABLE_CHUNK_ROWS:
+                yield self._long_table(header, chunk, col_widths, style)
+                chunk = []
+        if chunk:
+            yield self._long_table(header, chunk, col_widths, style)
+    
+    @staticmethod
+    def _long_table(header: List, rows: List[List], col_widths: List[float], style: TableStyle) -> LongTable:
+        table = LongTable(header + rows, colWidths=col_widths, repeatRows=len(header))
+        table.setStyle(style)
+        return table
+    
+    def _score_timeline(self, frame_analyses) -> Optional[Drawing]:
+        """逐帧评分时间线，由整列数组绘制；帧数超过 PDF_CHART_MAX_POINTS 时分桶取均值"""
+        if len(frame_analyses) < 2:
+            return None
+        timestamps = frame_column(frame_analyses, 'timestamp')
+        width, height = 6.5 * inch, 2.6 * inch
+        plot = LinePlot()
+        plot.x, plot.y = 36, 24
+        plot.width, plot.height = width - 48, height - 48
+        plot.data = []
+        for i, (field, _, color) in enumerate(TIMELINE_SERIES):
+            x, y = bucket_means(timestamps, frame_column(frame_analyses, field), Config.PDF_CHART_MAX_POINTS)
+            plot.data.append(list(zip(x.tolist(), y.tolist())))
+            plot.lines[i].strokeColor = color
+            plot.lines[i].strokeWidth = 1
+        plot.xValueAxis.valueMin = float(timestamps.min())
+        plot.xValueAxis.valueMax = float(timestamps.max())
+        plot.xValueAxis.labelTextFormat = '%.0fs'
+        plot.yValueAxis.valueMin, plot.yValueAxis.valueMax, plot.yValueAxis.valueStep = 0, 100, 20
+        for axis in (plot.xValueAxis, plot.yValueAxis):
+            axis.labels.fontName = self.font
+            axis.labels.fontSize = 7
+        
+        legend = Legend()
+        legend.x, legend.y = width - 12, height - 6
+        legend.alignment = 'right'
+        legend.columnMaximum = 1
+        legend.deltax = 70
+        legend.fontName = self.font
+        legend.fontSize = 8
+        legend.colorNamePairs = [(color, label) for _, label, color in TIMELINE_SERIES]
+        
+        drawing = Drawing(width, height)
+        drawing.add(plot)
+        drawing.add(legend)
+        return drawing
     
     def save_json_result(self, result: Dict[str, Any], file_path: str):
-        """保存JSON格式结果"""
+        """保存JSON格式结果
+        
+        启用列式存储时逐帧结果和转录分段写入同目录的列式文件，JSON只保存其余部分和文件引用。
+        """
         try:
+            if Config.COLUMNAR_RESULTS_ENABLED:
+                store = ColumnarResultStore(os.path.dirname(file_path) or '.')
+                result = store.save(result, result['video_id'])
             with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+                dump_json(result, f, indent=2)
             logger.info(f"JSON结果已保存: {file_path}")
         except Exception as e:
             logger.error(f"保存JSON结果失败: {str(e)}")
@@ -92,7 +215,7 @@ class ReportGenerator:
                 ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
                 ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                 ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, -1), 'MSYH'),
+                ('FONTNAME', (0, 0), (-1, -1), self.font),
                 ('FONTSIZE', (0, 0), (-1, -1), 10),
                 ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -123,7 +246,7 @@ class ReportGenerator:
                 ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
                 ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                 ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, -1), 'MSYH'),
+                ('FONTNAME', (0, 0), (-1, -1), self.font),
                 ('FONTSIZE', (0, 0), (-1, -1), 10),
                 ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black)
@@ -131,6 +254,15 @@ class ReportGenerator:
             story.append(summary_table)
             story.append(Spacer(1, 20))
             
+            # 评分时间线
+            frame_analyses = result.get('frame_analyses', [])
+            timeline = self._score_timeline(frame_analyses)
+            if timeline is not None:
+                story.append(Paragraph("评分时间线", self._get_chinese_style('Heading2')))
+                story.append(Spacer(1, 12))
+                story.append(timeline)
+                story.append(Spacer(1, 20))
+            
             # 音频分析结果
             audio_analysis = result.get('audio_analysis', {})
             if audio_analysis.get('success', False):
@@ -156,7 +288,7 @@ class ReportGenerator:
                     ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
                     ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                     ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('FONTNAME', (0, 0), (-1, -1), 'MSYH'),
+                    ('FONTNAME', (0, 0), (-1, -1), self.font),
                     ('FONTSIZE', (0, 0), (-1, -1), 10),
                     ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
                     ('GRID', (0, 0), (-1, -1), 1, colors.black)
@@ -169,45 +301,39 @@ class ReportGenerator:
                 if segments:
                     story.append(Paragraph("音频分段转录", self._get_chinese_style('Heading2')))
                     story.append(Spacer(1, 12))
-                    header = [["序号", "起始时间", "结束时间", "文本"]]
-                    seg_table_data = [[Paragraph(str(cell), self._get_chinese_style('Normal', fontSize=8, alignment=TA_CENTER)) for cell in row] for row in header]
+                    header_style = self._get_chinese_style('Normal', fontSize=8, alignment=TA_CENTER)
+                    text_style = self._get_chinese_style('Normal', fontSize=8, alignment=TA_LEFT)
+                    header = [[Paragraph(cell, header_style) for cell in ["序号", "起始时间", "结束时间", "文本"]]]
+                    # 只有需要换行的文本列使用 Paragraph，其余列为纯文本单元格
+                    seg_rows = ([
+                        str(idx + 1),
+                        f"{seg.get('start', 0):.2f}s",
+                        f"{seg.get('end', 0):.2f}s",
+                        Paragraph(escape(seg.get('text', '')), text_style)
+                    ] for idx, seg in enumerate(segments))
                     
-                    for idx, seg in enumerate(segments):
-                        start = f"{seg.get('start', 0):.2f}s"
-                        end = f"{seg.get('end', 0):.2f}s"
-                        text = seg.get('text', '')
-                        
-                        row_data = [
-                            Paragraph(str(idx+1), self._get_chinese_style('Normal', fontSize=8, alignment=TA_LEFT)),
-                            Paragraph(start, self._get_chinese_style('Normal', fontSize=8, alignment=TA_LEFT)),
-                            Paragraph(end, self._get_chinese_style('Normal', fontSize=8, alignment=TA_LEFT)),
-                            Paragraph(text, self._get_chinese_style('Normal', fontSize=8, alignment=TA_LEFT))
-                        ]
-                        seg_table_data.append(row_data)
-
-                    seg_table = Table(seg_table_data, colWidths=[0.5*inch, 0.8*inch, 0.8*inch, 3.9*inch])
-                    seg_table.setStyle(TableStyle([
+                    seg_style = TableStyle([
                         ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
                         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('FONTNAME', (0, 0), (-1, -1), 'MSYH'),
+                        ('FONTNAME', (0, 0), (-1, -1), self.font),
                         ('FONTSIZE', (0, 0), (-1, -1), 8),
                         ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
                         ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    story.append(seg_table)
+                    ])
+                    story.extend(self._long_tables(header, seg_rows, [0.5*inch, 0.8*inch, 0.8*inch, 3.9*inch], seg_style))
                     story.append(Spacer(1, 20))
             
             # 帧分析详情（前10帧）
             story.append(Paragraph("帧分析详情（前10帧）", self._get_chinese_style('Heading2')))
             story.append(Spacer(1, 12))
             
-            frame_analyses = result.get('frame_analyses', [])
             if frame_analyses:
                 # 准备表格数据
-                header = [["帧号", "时间戳", "清晰度", "光照", "人脸", "水印", "内容丰富度", "综合评分"]]
-                table_data = [[Paragraph(str(cell), self._get_chinese_style('Normal', fontSize=8, alignment=TA_CENTER)) for cell in row] for row in header]
+                cell_style = self._get_chinese_style('Normal', fontSize=8, alignment=TA_CENTER)
+                header = [[Paragraph(cell, cell_style) for cell in ["帧号", "时间戳", "清晰度", "光照", "人脸", "水印", "内容丰富度", "综合评分"]]]
+                frame_rows = []
                 
                 for frame in frame_analyses[:10]:  # 只显示前10帧
                     row_data = [
@@ -220,20 +346,19 @@ class ReportGenerator:
                         f"{frame.get('content_richness', 0):.1f}",
                         f"{frame.get('overall_score', 0):.1f}"
                     ]
-                    table_data.append([Paragraph(cell, self._get_chinese_style('Normal', fontSize=8, alignment=TA_CENTER)) for cell in row_data])
+                    frame_rows.append([Paragraph(cell, cell_style) for cell in row_data])
                 
-                frame_table = Table(table_data, colWidths=[0.5*inch, 0.8*inch, 0.6*inch, 0.6*inch, 0.5*inch, 0.5*inch, 0.8*inch, 0.7*inch])
-                frame_table.setStyle(TableStyle([
+                frame_style = TableStyle([
                     ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                     ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
                     ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('FONTNAME', (0, 0), (-1, -1), 'MSYH'),
+                    ('FONTNAME', (0, 0), (-1, -1), self.font),
                     ('FONTSIZE', (0, 0), (-1, -1), 8),
                     ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
                     ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                story.append(frame_table)
+                ])
+                story.extend(self._long_tables(header, frame_rows, [0.5*inch, 0.8*inch, 0.6*inch, 0.6*inch, 0.5*inch, 0.5*inch, 0.8*inch, 0.7*inch], frame_style))
             
             # 生成PDF
             doc.build(story)
@@ -243,148 +368,154 @@ class ReportGenerator:
             logger.error(f"生成PDF报告失败: {str(e)}")
             raise
     
+    @staticmethod
+    def _write_sheet(workbook: Workbook, title: str, header: List[str], rows: Iterable[Sequence]):
+        """逐行写入工作表（只写模式下行写出后即释放）"""
+        sheet = workbook.create_sheet(title)
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+    
+    @staticmethod
+    def _frame_rows(frame_analyses) -> Iterator[List]:
+        """帧分析详情的行；列式帧结果按块整列转换，不逐帧构造字典"""
+        if isinstance(frame_analyses, FrameResultTable) and frame_analyses.regular:
+            for start in range(0, len(frame_analyses), EXCEL_CHUNK_ROWS):
+                end = start + EXCEL_CHUNK_ROWS
+                columns = {name: frame_analyses.column(name)[start:end].tolist() for name in SCALAR_FIELDS}
+                for i, (watermark_text, issues) in enumerate(zip(frame_analyses.watermark_texts(start, end),
+                                                                 frame_analyses.issue_lists(start, end))):
+                    yield [
+                        columns['frame_number'][i],
+                        f"{columns['timestamp'][i]:.2f}",
+                        columns['clarity_score'][i],
+                        columns['lighting_score'][i],
+                        '是' if columns['face_detected'][i] else '否',
+                        columns['face_count'][i],
+                        '是' if columns['watermark_detected'][i] else '否',
+                        watermark_text,
+                        columns['content_richness'][i],
+                        columns['overall_score'][i],
+                        ', '.join(issues)
+                    ]
+            return
+        
+        for frame in frame_analyses:
+            yield [
+                frame.get('frame_number', 0),
+                f"{frame.get('timestamp', 0):.2f}",
+                frame.get('clarity_score', 0),
+                frame.get('lighting_score', 0),
+                '是' if frame.get('face_detected', False) else '否',
+                frame.get('face_count', 0),
+                '是' if frame.get('watermark_detected', False) else '否',
+                frame.get('watermark_text', ''),
+                frame.get('content_richness', 0),
+                frame.get('overall_score', 0),
+                ', '.join(frame.get('issues', []))
+            ]
+    
+    @staticmethod
+    def _issue_counts(frame_analyses) -> List[Tuple[str, int]]:
+        """各问题出现次数，按次数降序（次数相同时按首次出现顺序）"""
+        if isinstance(frame_analyses, FrameResultTable):
+            counts = frame_analyses.issue_counts()
+        else:
+            counts = Counter()
+            for frame in frame_analyses:
+                counts.update(frame.get('issues', []))
+        return sorted(counts.items(), key=lambda item: -item[1])
+    
     def generate_excel_report(self, result: Dict[str, Any], file_path: str):
-        """生成Excel报告"""
+        """生成Excel报告
+        
+        openpyxl 只写模式逐行流式写入，帧和转录分段直接由结果生成行（不构造 DataFrame），
+        内存占用与帧数、分段数无关。
+        """
         try:
-            # 创建Excel写入器
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                
-                # 基本信息工作表
-                basic_data = {
-                    '项目': ['视频名称', '视频时长(秒)', '总帧数', '分析帧数', '综合质量评分'],
-                    '数值': [
-                        result.get('video_name', 'N/A'),
-                        f"{result.get('duration', 0):.2f}",
-                        result.get('total_frames', 0),
-                        result.get('analyzed_frames', 0),
-                        f"{result.get('overall_quality_score', 0):.1f}/100"
-                    ]
-                }
-                basic_df = pd.DataFrame(basic_data)
-                basic_df.to_excel(writer, sheet_name='基本信息', index=False)
-                
-                # 分析摘要工作表
-                summary = result.get('summary', {})
-                summary_data = {
-                    '指标': ['平均清晰度', '平均光照质量', '人脸检测率', '水印检测率', '平均内容丰富度', '音频质量评分', '音频转录状态'],
-                    '数值': [
-                        f"{summary.get('avg_clarity', 0):.1f}/100",
-                        f"{summary.get('avg_lighting', 0):.1f}/100",
-                        f"{summary.get('face_detection_rate', 0)*100:.1f}%",
-                        f"{summary.get('watermark_detection_rate', 0)*100:.1f}%",
-                        f"{summary.get('avg_content_richness', 0):.1f}/100",
-                        f"{summary.get('audio_quality_score', 0):.1f}/100",
-                        "有转录" if summary.get('has_audio_transcription', False) else "无转录"
-                    ]
-                }
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, sheet_name='分析摘要', index=False)
+            workbook = Workbook(write_only=True)
+            
+            # 基本信息工作表
+            self._write_sheet(workbook, '基本信息', ['项目', '数值'], [
+                ['视频名称', result.get('video_name', 'N/A')],
+                ['视频时长(秒)', f"{result.get('duration', 0):.2f}"],
+                ['总帧数', result.get('total_frames', 0)],
+                ['分析帧数', result.get('analyzed_frames', 0)],
+                ['综合质量评分', f"{result.get('overall_quality_score', 0):.1f}/100"]
+            ])
+            
+            # 分析摘要工作表
+            summary = result.get('summary', {})
+            self._write_sheet(workbook, '分析摘要', ['指标', '数值'], [
+                ['平均清晰度', f"{summary.get('avg_clarity', 0):.1f}/100"],
+                ['平均光照质量', f"{summary.get('avg_lighting', 0):.1f}/100"],
+                ['人脸检测率', f"{summary.get('face_detection_rate', 0)*100:.1f}%"],
+                ['水印检测率', f"{summary.get('watermark_detection_rate', 0)*100:.1f}%"],
+                ['平均内容丰富度', f"{summary.get('avg_content_richness', 0):.1f}/100"],
+                ['音频质量评分', f"{summary.get('audio_quality_score', 0):.1f}/100"],
+                ['音频转录状态', "有转录" if summary.get('has_audio_transcription', False) else "无转录"]
+            ])
+            
+            # 音频分析工作表
+            audio_analysis = result.get('audio_analysis', {})
+            if audio_analysis.get('success', False):
+                transcription = audio_analysis.get('transcription', {})
+                audio_quality = audio_analysis.get('audio_quality', {})
                 
-                # 音频分析工作表
-                audio_analysis = result.get('audio_analysis', {})
-                if audio_analysis.get('success', False):
-                    transcription = audio_analysis.get('transcription', {})
-                    audio_quality = audio_analysis.get('audio_quality', {})
-                    
-                    # 音频基本信息
-                    audio_basic_data = {
-                        '项目': ['音频时长(秒)', '采样率(Hz)', '声道数', '音频质量评分', '识别语言', '转录文本长度(字符)'],
-                        '数值': [
-                            f"{audio_quality.get('duration', 0):.2f}",
-                            audio_quality.get('sample_rate', 0),
-                            audio_quality.get('channels', 0),
-                            f"{audio_quality.get('quality_score', 0):.1f}/100",
-                            transcription.get('language', 'unknown'),
-                            len(transcription.get('text', ''))
-                        ]
-                    }
-                    audio_basic_df = pd.DataFrame(audio_basic_data)
-                    audio_basic_df.to_excel(writer, sheet_name='音频分析', index=False)
-                    
-                    # 音频转录内容
-                    if transcription.get('text'):
-                        transcription_data = {
-                            '转录内容': [transcription.get('text', '')]
-                        }
-                        transcription_df = pd.DataFrame(transcription_data)
-                        transcription_df.to_excel(writer, sheet_name='音频转录', index=False)
-                    
-                    # 音频分段转录
-                    segments = transcription.get('segments', [])
-                    if segments:
-                        seg_data = []
-                        for idx, seg in enumerate(segments):
-                            seg_data.append({
-                                '序号': idx+1,
-                                '起始时间': f"{seg.get('start', 0):.2f}s",
-                                '结束时间': f"{seg.get('end', 0):.2f}s",
-                                '文本': seg.get('text', '')
-                            })
-                        seg_df = pd.DataFrame(seg_data)
-                        seg_df.to_excel(writer, sheet_name='音频分段转录', index=False)
-                    
-                    # 音频质量详情
-                    volume_stats = audio_quality.get('volume_stats', {})
-                    audio_detail_data = {
-                        '项目': ['最小音量', '最大音量', '平均音量', 'RMS音量', '动态范围(dB)', '音频问题'],
-                        '数值': [
-                            volume_stats.get('min', 0),
-                            volume_stats.get('max', 0),
-                            f"{volume_stats.get('mean', 0):.1f}",
-                            f"{volume_stats.get('rms', 0):.1f}",
-                            f"{audio_quality.get('dynamic_range', 0):.1f}",
-                            ', '.join(audio_quality.get('issues', []))
-                        ]
-                    }
-                    audio_detail_df = pd.DataFrame(audio_detail_data)
-                    audio_detail_df.to_excel(writer, sheet_name='音频质量详情', index=False)
-                else:
-                    # 音频分析失败
-                    audio_error_data = {
-                        '项目': ['音频分析状态'],
-                        '数值': [audio_analysis.get('error', '视频中无音频轨道或音频分析失败')]
-                    }
-                    audio_error_df = pd.DataFrame(audio_error_data)
-                    audio_error_df.to_excel(writer, sheet_name='音频分析', index=False)
+                # 音频基本信息
+                self._write_sheet(workbook, '音频分析', ['项目', '数值'], [
+                    ['音频时长(秒)', f"{audio_quality.get('duration', 0):.2f}"],
+                    ['采样率(Hz)', audio_quality.get('sample_rate', 0)],
+                    ['声道数', audio_quality.get('channels', 0)],
+                    ['音频质量评分', f"{audio_quality.get('quality_score', 0):.1f}/100"],
+                    ['识别语言', transcription.get('language', 'unknown')],
+                    ['转录文本长度(字符)', len(transcription.get('text', ''))]
+                ])
                 
-                # 帧分析详情工作表
-                frame_analyses = result.get('frame_analyses', [])
-                if frame_analyses:
-                    frame_data = []
-                    for frame in frame_analyses:
-                        frame_data.append({
-                            '帧号': frame.get('frame_number', 0),
-                            '时间戳(秒)': f"{frame.get('timestamp', 0):.2f}",
-                            '清晰度评分': frame.get('clarity_score', 0),
-                            '光照评分': frame.get('lighting_score', 0),
-                            '人脸检测': '是' if frame.get('face_detected', False) else '否',
-                            '人脸数量': frame.get('face_count', 0),
-                            '水印检测': '是' if frame.get('watermark_detected', False) else '否',
-                            '水印文字': frame.get('watermark_text', ''),
-                            '内容丰富度': frame.get('content_richness', 0),
-                            '综合评分': frame.get('overall_score', 0),
-                            '问题': ', '.join(frame.get('issues', []))
-                        })
-                    
-                    frame_df = pd.DataFrame(frame_data)
-                    frame_df.to_excel(writer, sheet_name='帧分析详情', index=False)
+                # 音频转录内容
+                if transcription.get('text'):
+                    self._write_sheet(workbook, '音频转录', ['转录内容'], [[transcription.get('text', '')]])
                 
-                # 问题统计工作表
-                all_issues = []
-                for frame in frame_analyses:
-                    all_issues.extend(frame.get('issues', []))
+                # 音频分段转录
+                segments = transcription.get('segments', [])
+                if segments:
+                    self._write_sheet(workbook, '音频分段转录', ['序号', '起始时间', '结束时间', '文本'], (
+                        [idx+1, f"{seg.get('start', 0):.2f}s", f"{seg.get('end', 0):.2f}s", seg.get('text', '')]
+                        for idx, seg in enumerate(segments)
+                    ))
                 
-                if all_issues:
-                    issue_counts = pd.Series(all_issues).value_counts()
-                    issue_df = pd.DataFrame({
-                        '问题类型': issue_counts.index,
-                        '出现次数': issue_counts.values,
-                        '出现频率': (issue_counts.values / len(frame_analyses) * 100).round(1)
-                    })
-                    issue_df.to_excel(writer, sheet_name='问题统计', index=False)
+                # 音频质量详情
+                volume_stats = audio_quality.get('volume_stats', {})
+                self._write_sheet(workbook, '音频质量详情', ['项目', '数值'], [
+                    ['最小音量', volume_stats.get('min', 0)],
+                    ['最大音量', volume_stats.get('max', 0)],
+                    ['平均音量', f"{volume_stats.get('mean', 0):.1f}"],
+                    ['RMS音量', f"{volume_stats.get('rms', 0):.1f}"],
+                    ['动态范围(dB)', f"{audio_quality.get('dynamic_range', 0):.1f}"],
+                    ['音频问题', ', '.join(audio_quality.get('issues', []))]
+                ])
+            else:
+                # 音频分析失败
+                self._write_sheet(workbook, '音频分析', ['项目', '数值'], [
+                    ['音频分析状态', audio_analysis.get('error', '视频中无音频轨道或音频分析失败')]
+                ])
+            
+            # 帧分析详情工作表
+            frame_analyses = result.get('frame_analyses', [])
+            if frame_analyses:
+                self._write_sheet(workbook, '帧分析详情', FRAME_SHEET_HEADER, self._frame_rows(frame_analyses))
+            
+            # 问题统计工作表
+            issue_counts = self._issue_counts(frame_analyses)
+            if issue_counts:
+                self._write_sheet(workbook, '问题统计', ['问题类型', '出现次数', '出现频率'], (
+                    [issue, count, float(np.round(count / len(frame_analyses) * 100, 1))]
+                    for issue, count in issue_counts
+                ))
             
+            workbook.save(file_path)
             logger.info(f"Excel报告已生成: {file_path}")
             
         except Exception as e:
             logger.error(f"生成Excel报告失败: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
\ No newline at end of file
@@ -0,0 +1 @@
+# Performance Benchmarks Package
\ No newline at end of file
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+CLIP批量预处理校验与基准：比较 ClipBatchPreprocessor 与 CLIPProcessor 的数值误差和耗时
+
+用法:
+    python -m benchmarks.clip_preprocess [--frames 32] [--fixture dynamic_1080p] [--fixtures-dir DIR]
+
+样本帧取自 benchmarks.fixtures 的合成视频。基准套件的 inference/clip_preprocess 项以默认容差自动执行该校验
+（transformers 或 CLIP 模型不可用时跳过）。
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import cv2
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.services.clip_preprocess import ClipBatchPreprocessor, validate_against_processor
+from benchmarks.fixtures import VIDEO_FIXTURES, FixtureCache
+
+# 默认容差：归一化数值空间的平均绝对误差上限、逐图余弦相似度下限
+MAX_MEAN_ERROR = 0.01
+MIN_COSINE = 0.999
+
+def preprocess_violations(errors: dict, max_mean_error: float = MAX_MEAN_ERROR, min_cosine: float = MIN_COSINE) -> list:
+    """超出容差的项（空列表表示通过）"""
+    violations = []
+    if errors['mean_abs_error'] > max_mean_error:
+        violations.append(f"平均绝对误差 {errors['mean_abs_error']:.5f} > {max_mean_error}")
+    if errors['min_cosine'] < min_cosine:
+        violations.append(f"最小余弦 {errors['min_cosine']:.6f} < {min_cosine}")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIP批量预处理校验与基准")
+    parser.add_argument('--frames', type=int, default=32)
+    parser.add_argument('--fixture', default='dynamic_1080p', choices=list(VIDEO_FIXTURES), help="取帧的合成视频")
+    parser.add_argument('--fixtures-dir', help="合成媒体缓存目录（指定时保留复用），默认临时目录")
+    parser.add_argument('--max-mean-error', type=float, default=MAX_MEAN_ERROR, help="平均绝对误差上限")
+    parser.add_argument('--min-cosine', type=float, default=MIN_COSINE, help="逐图余弦相似度下限")
+    args = parser.parse_args()
+    
+    from transformers import CLIPProcessor
+    processor = CLIPProcessor.from_pretrained(Config.CLIP_MODEL)
+    preprocessor = ClipBatchPreprocessor.from_processor(processor)
+    fixtures_dir = args.fixtures_dir or tempfile.mkdtemp(prefix="clip_preprocess_")
+    try:
+        frames = FixtureCache(fixtures_dir).frames(args.fixture, args.frames)
+    finally:
+        if not args.fixtures_dir:
+            shutil.rmtree(fixtures_dir, ignore_errors=True)
+    
+    errors = validate_against_processor(frames, processor, preprocessor)
+    
+    start = time.perf_counter()
+    preprocessor(frames)
+    fast_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for frame in frames:
+        processor(images=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), return_tensors="np")
+    reference_seconds = time.perf_counter() - start
+    
+    height, width = frames[0].shape[:2]
+    print(f"帧数: {len(frames)}  分辨率: {width}x{height}")
+    print(f"误差: 最大 {errors['max_abs_error']:.4f}  平均 {errors['mean_abs_error']:.5f}  "
+          f"P99 {errors['p99_abs_error']:.4f}  最小余弦 {errors['min_cosine']:.6f}")
+    print(f"CLIPProcessor 逐图: {reference_seconds * 1000 / len(frames):.2f} ms/帧")
+    print(f"批量预处理:        {fast_seconds * 1000 / len(frames):.2f} ms/帧  (加速 {reference_seconds / fast_seconds:.1f}x)")
+    
+    violations = preprocess_violations(errors, args.max_mean_error, args.min_cosine)
+    passed = not violations
+    print("✅ 数值误差在容差范围内" if passed else f"❌ 数值误差超出容差: {'; '.join(violations)}")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
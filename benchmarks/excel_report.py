@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Excel报告基准：流式只写模式的 generate_excel_report 与 pandas DataFrame + ExcelWriter（普通模式）
+的耗时和峰值内存对比；帧数扩大后流式写入的峰值内存应基本不变
+
+用法:
+    python -m benchmarks.excel_report [--frames 10000] [--segments 2000] [--scale 4]
+"""
+
+import os
+import sys
+import gc
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.frame_results import FrameResultTable
+from app.utils.report_generator import FRAME_SHEET_HEADER, ReportGenerator
+from benchmarks.result_storage import synthesize_result
+
+def pandas_baseline(result: dict, file_path: str):
+    """原实现方式：帧和转录分段先构造 DataFrame，再经 ExcelWriter 在内存中建立整个工作簿"""
+    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+        segments = result['audio_analysis']['transcription']['segments']
+        pd.DataFrame([{
+            '序号': idx + 1, '起始时间': f"{seg['start']:.2f}s", '结束时间': f"{seg['end']:.2f}s", '文本': seg['text']
+        } for idx, seg in enumerate(segments)]).to_excel(writer, sheet_name='音频分段转录', index=False)
+        pd.DataFrame(list(ReportGenerator._frame_rows(result['frame_analyses'])),
+                     columns=FRAME_SHEET_HEADER).to_excel(writer, sheet_name='帧分析详情', index=False)
+
+def measure(write, result: dict, file_path: str) -> dict:
+    """写入耗时，以及写入过程中的峰值内存（不含已在内存中的结果）"""
+    start = time.perf_counter()
+    write(result, file_path)
+    seconds = time.perf_counter() - start
+    
+    gc.collect()
+    tracemalloc.start()
+    try:
+        write(result, file_path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak, 'file_bytes': os.path.getsize(file_path)}
+
+def frame_sheet_rows(file_path: str) -> int:
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        # 只写模式不记录工作表尺寸，逐行计数
+        return sum(1 for _ in workbook['帧分析详情'].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel报告基准")
+    parser.add_argument('--frames', type=int, default=10000, help="帧数")
+    parser.add_argument('--segments', type=int, default=2000, help="转录分段数")
+    parser.add_argument('--scale', type=int, default=4, help="校验峰值内存时帧数和分段数的放大倍数")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="excel_report_")
+    try:
+        generator = ReportGenerator()
+        rows = []
+        for scale in (1, args.scale):
+            result = synthesize_result('benchmark', args.frames * scale, args.segments * scale)
+            table_result = {**result, 'frame_analyses': FrameResultTable(result['frame_analyses'])}
+            for name, write, data in (
+                ('pandas', pandas_baseline, result),
+                ('流式/字典', generator.generate_excel_report, result),
+                ('流式/列式', generator.generate_excel_report, table_result)
+            ):
+                if name == 'pandas' and scale != 1:
+                    continue
+                file_path = os.path.join(work_dir, f"report_{scale}.xlsx")
+                row = measure(write, data, file_path)
+                row['complete'] = frame_sheet_rows(file_path) == len(result['frame_analyses']) + 1
+                rows.append((name, args.frames * scale, row))
+        
+        print(f"{'方式':<10}{'帧数':>8}{'耗时':>10}{'峰值内存':>12}{'文件':>10}")
+        for name, frames, row in rows:
+            print(f"{name:<10}{frames:>8}{row['seconds']:>9.2f}s{row['peak_bytes'] / 2 ** 20:>10.1f}MB"
+                  f"{row['file_bytes'] / 2 ** 20:>8.1f}MB")
+        
+        # 流式写入的峰值内存不随帧数、分段数增长
+        streaming = [row for name, _, row in rows if name.startswith('流式')]
+        base, scaled = streaming[0]['peak_bytes'], streaming[2]['peak_bytes']
+        bounded = scaled <= base * 1.5
+        complete = all(row['complete'] for _, _, row in rows)
+        print(f"{'✅' if bounded else '❌'} 帧数放大 {args.scale} 倍后峰值内存 {base / 2 ** 20:.1f}MB -> {scaled / 2 ** 20:.1f}MB")
+        print(f"{'✅' if complete else '❌'} 帧分析详情工作表行数完整")
+        sys.exit(0 if bounded and complete else 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
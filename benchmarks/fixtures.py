@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+基准测试用的确定性合成媒体：cv2.VideoWriter 生成的视频（分辨率、时长、编码、静态/动态画面、
+烧录文字可配置）和 16kHz 单声道 WAV 音频（纯音、噪声、类语音）。相同规格和种子生成的内容相同
+
+用法:
+    python -m benchmarks.fixtures [--output fixtures] [--videos dynamic_720p] [--audio speech]
+"""
+
+import os
+import sys
+import json
+import wave
+import shutil
+import hashlib
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+AUDIO_SAMPLE_RATE = 16000
+
+# 视频规格：codec 为 VideoWriter 的 fourcc，content 为 static（画面不变）或 dynamic（运动、亮度和清晰度随时间变化），
+# text 为烧录在画面上的文字（None 表示无文字）
+VIDEO_FIXTURES = {
+    'static_480p': {'width': 854, 'height': 480, 'fps': 25, 'duration': 20, 'codec': 'MJPG', 'ext': '.avi',
+                    'content': 'static', 'text': None},
+    'dynamic_720p': {'width': 1280, 'height': 720, 'fps': 25, 'duration': 30, 'codec': 'mp4v', 'ext': '.mp4',
+                     'content': 'dynamic', 'text': 'SAMPLE WATERMARK'},
+    'dynamic_1080p': {'width': 1920, 'height': 1080, 'fps': 30, 'duration': 20, 'codec': 'mp4v', 'ext': '.mp4',
+                      'content': 'dynamic', 'text': 'COPYRIGHT DEMO'},
+    'long_360p': {'width': 640, 'height': 360, 'fps': 25, 'duration': 120, 'codec': 'XVID', 'ext': '.avi',
+                  'content': 'dynamic', 'text': 'LOGO'}
+}
+
+# 音频规格：kind 为 tone（440Hz 纯音）、noise（白噪声）或 speech（类语音：基频起伏的谐波 + 音节包络 + 停顿）
+AUDIO_FIXTURES = {
+    'tone': {'kind': 'tone', 'duration': 60},
+    'noise': {'kind': 'noise', 'duration': 60},
+    'speech': {'kind': 'speech', 'duration': 120}
+}
+
+def spec_digest(spec: Dict, seed: int) -> str:
+    """规格和种子的摘要，用于缓存文件名（规格变化后重新生成）"""
+    return hashlib.sha1(json.dumps({**spec, 'seed': seed}, sort_keys=True).encode()).hexdigest()[:8]
+
+def _texture(height: int, width: int, rng: np.random.Generator) -> np.ndarray:
+    """带细节的底图：彩色渐变 + 模糊噪声 + 几何图形"""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.stack([
+        128 + 100 * np.sin(x / width * 6.0),
+        128 + 100 * np.cos(y / height * 4.0),
+        128 + 100 * np.sin((x + y) / (width + height) * 8.0)
+    ], axis=-1)
+    noise = cv2.GaussianBlur(rng.normal(0, 40, (height, width, 3)).astype(np.float32), (0, 0), 1.0)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+    for _ in range(12):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(height // 40, height // 8)), color, -1)
+    return image
+
+def _burn_text(frame: np.ndarray, text: str) -> np.ndarray:
+    """右下角烧录半透明白色文字（与常见水印相同，文字边缘不主导清晰度评分）"""
+    height, width = frame.shape[:2]
+    scale = height / 640
+    thickness = max(1, int(2 * scale))
+    (text_width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    origin = (width - text_width - int(20 * scale), height - int(20 * scale))
+    overlay = frame.copy()
+    cv2.putText(overlay, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), thickness, cv2.LINE_AA)
+    return cv2.addWeighted(overlay, 0.4, frame, 0.6, 0)
+
+def synthesize_video(path: str, spec: Dict, seed: int = 0):
+    """按规格生成合成视频；动态画面每5秒交替清晰/模糊，亮度缓慢起伏，方块横向移动"""
+    width, height, fps = spec['width'], spec['height'], spec['fps']
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*spec['codec']), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"VideoWriter 不支持编码 {spec['codec']}（{spec['ext']}）")
+    
+    try:
+        rng = np.random.default_rng(seed)
+        base = _texture(height, width, rng)
+        box = max(height // 5, 8)
+        for n in range(int(spec['duration'] * fps)):
+            if spec['content'] == 'static':
+                frame = base.copy()
+            else:
+                seconds = n / fps
+                frame = np.roll(base, n * 2, axis=1)
+                x = (n * 8) % max(width - box, 1)
+                cv2.rectangle(frame, (x, height // 3), (x + box, height // 3 + box), (255, 255, 255), -1)
+                if int(seconds // 5) % 2 == 1:
+                    frame = cv2.GaussianBlur(frame, (0, 0), 8 + 3 * np.sin(seconds))
+                gain = 0.2 + 0.9 * (1 + np.sin(2 * np.pi * seconds / 20)) / 2
+                frame = cv2.convertScaleAbs(frame, alpha=gain)
+            if spec['text']:
+                frame = _burn_text(frame, spec['text'])
+            writer.write(frame)
+    finally:
+        writer.release()
+
+def synthesize_audio(kind: str, duration: float, sample_rate: int = AUDIO_SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """合成音频（float32，[-1, 1]）"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    if kind == 'tone':
+        samples = 0.5 * np.sin(2 * np.pi * 440 * t) + 0.1 * np.sin(2 * np.pi * 880 * t)
+    elif kind == 'noise':
+        samples = np.clip(rng.normal(0, 0.1, len(t)), -1, 1)
+    elif kind == 'speech':
+        # 基频在 100-220Hz 间缓慢起伏，前10个谐波按共振峰近似加权
+        f0 = 160 + 60 * np.sin(2 * np.pi * 0.3 * t) + 10 * np.sin(2 * np.pi * 5 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        harmonics = np.arange(1, 11)
+        weights = np.exp(-((harmonics * 160 - 700) / 600) ** 2) + 0.3 / harmonics
+        voiced = (weights[:, None] * np.sin(harmonics[:, None] * phase[None, :])).sum(axis=0)
+        voiced /= np.abs(voiced).max()
+        
+        # 1-4秒的语句之间有 0.3-1.2 秒停顿，语句内约4Hz的音节包络
+        envelope = np.zeros(len(t))
+        position = 0.5
+        while position < duration:
+            length = float(rng.uniform(1, 4))
+            start, end = int(position * sample_rate), int(min(position + length, duration) * sample_rate)
+            syllables = 0.5 * (1 - np.cos(2 * np.pi * float(rng.uniform(3, 5)) * t[:end - start]))
+            envelope[start:end] = syllables
+            position += length + float(rng.uniform(0.3, 1.2))
+        samples = 0.6 * voiced * envelope + rng.normal(0, 0.005, len(t))
+    else:
+        raise ValueError(f"未知的音频类型: {kind}")
+    return np.clip(samples, -1, 1).astype(np.float32)
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE):
+    """写入16bit单声道WAV"""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((samples * 32767).astype(np.int16).tobytes())
+
+def sample_frames(video_path: str, count: int) -> List[np.ndarray]:
+    """视频中均匀取 count 帧（BGR数组）"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = []
+        for position in np.linspace(0, max(total - 1, 0), count).astype(int).tolist():
+            cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        return frames
+    finally:
+        cap.release()
+
+def mux_audio(video_path: str, audio_path: str, output_path: str) -> bool:
+    """用ffmpeg将音频封装进视频（视频流直接复制）；ffmpeg不可用或失败时返回False"""
+    command = [Config.FFMPEG_BINARY, '-v', 'error', '-y', '-i', video_path, '-i', audio_path,
+               '-c:v', 'copy', '-c:a', 'aac', '-shortest', output_path]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=300)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️  音频封装失败（{type(e).__name__}），视频不含音轨")
+        return False
+
+class FixtureCache:
+    """按需生成并缓存合成媒体；目录中已有相同规格的文件时直接复用"""
+    
+    def __init__(self, directory: str, seed: int = 0):
+        self.directory = directory
+        self.seed = seed
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, name: str, spec: Dict, ext: str) -> str:
+        return os.path.join(self.directory, f"{name}_{spec_digest(spec, self.seed)}{ext}")
+    
+    def video(self, name: str) -> str:
+        spec = VIDEO_FIXTURES[name]
+        path = self._path(name, spec, spec['ext'])
+        if not os.path.exists(path):
+            partial = path + '.partial' + spec['ext']
+            synthesize_video(partial, spec, self.seed)
+            os.replace(partial, path)
+        return path
+    
+    def audio(self, name: str) -> str:
+        spec = AUDIO_FIXTURES[name]
+        path = self._path(name, spec, '.wav')
+        if not os.path.exists(path):
+            write_wav(path + '.partial', synthesize_audio(spec['kind'], spec['duration'], seed=self.seed))
+            os.replace(path + '.partial', path)
+        return path
+    
+    def frames(self, name: str, count: int) -> List[np.ndarray]:
+        """合成视频中均匀取 count 帧"""
+        return sample_frames(self.video(name), count)
+    
+    def video_with_audio(self, video_name: str, audio_name: str = 'speech') -> Optional[str]:
+        """带音轨的视频（mp4 封装）；无法封装时返回 None"""
+        spec = {**VIDEO_FIXTURES[video_name], 'audio': AUDIO_FIXTURES[audio_name]}
+        path = self._path(f"{video_name}_{audio_name}", spec, '.mp4')
+        if not os.path.exists(path):
+            partial = path + '.partial.mp4'
+            if not mux_audio(self.video(video_name), self.audio(audio_name), partial):
+                return None
+            os.replace(partial, path)
+        return path
+
+def main():
+    parser = argparse.ArgumentParser(description="生成基准测试用的合成媒体")
+    parser.add_argument('--output', default='fixtures', help="输出目录")
+    parser.add_argument('--videos', nargs='*', default=list(VIDEO_FIXTURES), help="视频规格名")
+    parser.add_argument('--audio', nargs='*', default=list(AUDIO_FIXTURES), help="音频规格名")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+    
+    cache = FixtureCache(args.output, args.seed)
+    failed: List[str] = []
+    for name in args.videos:
+        try:
+            path = cache.video(name)
+            print(f"✅ {name}: {path} ({os.path.getsize(path) / 2 ** 20:.1f}MB)")
+        except Exception as e:
+            failed.append(name)
+            print(f"❌ {name}: {str(e)}")
+    for name in args.audio:
+        path = cache.audio(name)
+        print(f"✅ {name}: {path} ({os.path.getsize(path) / 2 ** 20:.1f}MB)")
+    if shutil.which(Config.FFMPEG_BINARY) is None:
+        print("⚠️  未找到ffmpeg，无法生成带音轨的视频")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+逐帧结果内存表示基准：比较帧结果字典列表与 FrameResultTable（列式数组）的内存占用、
+追加耗时、转为JSON和展开为列式存储列的耗时，并校验两者还原出的帧结果一致
+
+用法:
+    python -m benchmarks.frame_results [--frames 100000]
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.frame_results import FrameResultTable
+from app.services.result_storage import flatten_records
+from benchmarks.result_storage import synthesize_result
+
+def traced_bytes(build):
+    """build() 返回的对象在构造过程中新分配并仍被持有的内存"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = build()
+        return value, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def timed(function):
+    start = time.perf_counter()
+    value = function()
+    return value, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="逐帧结果内存表示基准")
+    parser.add_argument('--frames', type=int, default=100000, help="帧数")
+    args = parser.parse_args()
+    
+    # 经过JSON往返，与实际帧结果一样都是Python原生类型
+    text = json.dumps(synthesize_result('benchmark', args.frames, 1)['frame_analyses'])
+    frames, list_bytes = traced_bytes(lambda: json.loads(text))
+    table, append_seconds = timed(lambda: FrameResultTable(frames))
+    
+    # 转JSON：字典列表为 json.dumps（C编码器）；列式数组为 json_rows 整列编码（结果保存时 dump_json 的路径）
+    table_text, table_json_seconds = timed(lambda: '[' + ', '.join(table.json_rows()) + ']')
+    _, list_json_seconds = timed(lambda: json.dumps(frames, ensure_ascii=False))
+    _, flat_seconds = timed(table.flat_columns)
+    _, list_flat_seconds = timed(lambda: flatten_records(frames))
+    identical = table.to_records() == frames and json.loads(table_text) == frames and table.regular
+    
+    print(f"帧数: {args.frames}")
+    print(f"{'':<12}{'内存':>12}{'每帧':>10}{'转JSON':>10}{'展开列':>10}")
+    print(f"{'字典列表':<12}{list_bytes / 2 ** 20:>10.1f}MB{list_bytes / args.frames:>8.0f}B"
+          f"{list_json_seconds:>9.3f}s{list_flat_seconds:>9.3f}s")
+    print(f"{'列式数组':<12}{table.nbytes / 2 ** 20:>10.1f}MB{table.nbytes / args.frames:>8.0f}B"
+          f"{table_json_seconds:>9.3f}s{flat_seconds:>9.3f}s")
+    print(f"内存缩减: {list_bytes / max(table.nbytes, 1):.1f}x  逐帧追加: {append_seconds / args.frames * 1e6:.1f}µs/帧")
+    print(f"{'✅' if identical else '❌'} 列式数组还原的帧结果{'与原结果一致' if identical else '与原结果不一致'}")
+    sys.exit(0 if identical else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
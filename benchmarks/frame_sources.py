@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+帧来源解码基准：比较 OpenCV 与 ffmpeg 子进程（interval / keyframe 模式、解码端缩放）的抽帧吞吐
+
+用法:
+    python -m benchmarks.frame_sources [--video path] [--fixture dynamic_720p] [--fixtures-dir DIR]
+                                       [--interval 5] [--scale-width 640]
+
+未指定 --video 时使用 benchmarks.fixtures 的合成视频。
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.frame_sources import get_frame_source
+from benchmarks.fixtures import VIDEO_FIXTURES, FixtureCache
+
+def run_source(source, video_path: str, interval: int):
+    """完整迭代一遍，返回 (耗时, 帧列表)"""
+    start = time.perf_counter()
+    frames = list(source.iter_frames(video_path, interval))
+    return time.perf_counter() - start, frames
+
+def main():
+    parser = argparse.ArgumentParser(description="帧来源解码基准")
+    parser.add_argument('--video', help="视频路径，不指定时使用合成视频")
+    parser.add_argument('--fixture', default='dynamic_720p', choices=list(VIDEO_FIXTURES), help="合成视频规格")
+    parser.add_argument('--fixtures-dir', help="合成媒体缓存目录（指定时保留复用），默认在临时目录中生成")
+    parser.add_argument('--interval', type=int, default=5, help="采样间隔（秒）")
+    parser.add_argument('--scale-width', type=int, default=640, help="解码端缩放宽度")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="frame_sources_")
+    try:
+        video_path = args.video or FixtureCache(args.fixtures_dir or work_dir).video(args.fixture)
+        
+        baseline_seconds, baseline = run_source(get_frame_source('opencv'), video_path, args.interval)
+        print(f"opencv:                {baseline_seconds:.2f}秒  {len(baseline)} 帧  "
+              f"{len(baseline) / baseline_seconds:.1f} 帧/秒")
+        
+        passed = True
+        candidates = [
+            ('ffmpeg interval', {'mode': 'interval'}),
+            (f'ffmpeg interval {args.scale_width}w', {'mode': 'interval', 'scale_width': args.scale_width}),
+            (f'ffmpeg keyframe {args.scale_width}w', {'mode': 'keyframe', 'scale_width': args.scale_width})
+        ]
+        for label, kwargs in candidates:
+            try:
+                source = get_frame_source('ffmpeg', **kwargs)
+                seconds, frames = run_source(source, video_path, args.interval)
+            except RuntimeError as e:
+                print(f"{label}: ❌ {str(e)}")
+                passed = False
+                continue
+            
+            line = (f"{label + ':':<22} {seconds:.2f}秒  {len(frames)} 帧  {len(frames) / seconds:.1f} 帧/秒  "
+                    f"(相对OpenCV {baseline_seconds / seconds:.2f}x)")
+            if kwargs == {'mode': 'interval'}:
+                # 全分辨率 interval 模式应与 OpenCV 采样位置和像素一致
+                same_positions = [ts for _, ts, _ in frames] == [ts for _, ts, _ in baseline]
+                max_diff = max((int(np.abs(a[2].astype(np.int16) - b[2]).max()) for a, b in zip(frames, baseline)),
+                               default=0)
+                consistent = same_positions and max_diff <= 2
+                passed = passed and consistent
+                line += f"  {'✅' if consistent else '❌'} 采样位置一致: {same_positions}, 最大像素差 {max_diff}"
+            print(line)
+        
+        sys.exit(0 if passed else 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+帧传输基准：比较共享内存环形缓冲区与 multiprocessing.Queue（pickle 序列化帧）的跨进程传输吞吐
+
+用法:
+    python -m benchmarks.frame_transport [--frames 300] [--consumers 2] [--width 1920 --height 1080]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.frame_ring_buffer import SharedFrameRing
+
+def make_frame(index: int, shape) -> np.ndarray:
+    """每帧内容不同的合成帧（用于校验传输正确性）"""
+    frame = np.empty(shape, dtype=np.uint8)
+    frame[:] = index % 251
+    frame[0, :, 0] = np.arange(shape[1]) % 256
+    return frame
+
+def checksum(frame: np.ndarray) -> int:
+    """消费端读取整帧像素，模拟分析负载"""
+    return int(frame.sum(dtype=np.uint64))
+
+def pickle_consumer(task_queue, result_queue):
+    total = 0
+    while True:
+        frame = task_queue.get()
+        if frame is None:
+            break
+        total += checksum(frame)
+    result_queue.put(total)
+
+def ring_consumer(ring, task_queue, result_queue):
+    total = 0
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        slot, _, shape = task
+        frame = ring.view(slot, shape)
+        total += checksum(frame)
+        del frame
+        ring.release(slot)
+    result_queue.put(total)
+    ring.close()
+
+def run_pickle(context, frames: int, consumers: int, shape) -> tuple:
+    task_queues = [context.Queue(maxsize=8) for _ in range(consumers)]
+    result_queue = context.Queue()
+    workers = [context.Process(target=pickle_consumer, args=(q, result_queue)) for q in task_queues]
+    for worker in workers:
+        worker.start()
+    
+    start = time.perf_counter()
+    for i in range(frames):
+        frame = make_frame(i, shape)
+        for q in task_queues:
+            q.put(frame)
+    for q in task_queues:
+        q.put(None)
+    totals = [result_queue.get() for _ in workers]
+    seconds = time.perf_counter() - start
+    
+    for worker in workers:
+        worker.join()
+    return seconds, totals
+
+def run_ring(context, frames: int, consumers: int, shape, slots: int) -> tuple:
+    ring = SharedFrameRing.for_frames(shape, slots, context)
+    task_queues = [context.Queue() for _ in range(consumers)]
+    result_queue = context.Queue()
+    workers = [context.Process(target=ring_consumer, args=(ring, q, result_queue)) for q in task_queues]
+    for worker in workers:
+        worker.start()
+    
+    start = time.perf_counter()
+    for i in range(frames):
+        slot = ring.acquire()
+        # 生成帧的一次写入对应解码器写入槽位
+        ring.write(slot, make_frame(i, shape))
+        ring.publish(slot, consumers)
+        for q in task_queues:
+            q.put((slot, i, shape))
+    for q in task_queues:
+        q.put(None)
+    totals = [result_queue.get() for _ in workers]
+    seconds = time.perf_counter() - start
+    
+    for worker in workers:
+        worker.join()
+    ring.close()
+    return seconds, totals
+
+def main():
+    parser = argparse.ArgumentParser(description="跨进程帧传输基准")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--consumers', type=int, default=2, help="消费进程数（每帧被所有消费者读取）")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--slots', type=int, default=16)
+    args = parser.parse_args()
+    
+    context = multiprocessing.get_context('spawn')
+    shape = (args.height, args.width, 3)
+    frame_mb = np.prod(shape) / 1024 / 1024
+    expected = sum(checksum(make_frame(i, shape)) for i in range(args.frames))
+    
+    print(f"帧数: {args.frames}  分辨率: {args.width}x{args.height}  消费进程: {args.consumers}  槽位: {args.slots}")
+    results = {}
+    for name, runner in (('pickle队列', lambda: run_pickle(context, args.frames, args.consumers, shape)),
+                         ('共享内存环', lambda: run_ring(context, args.frames, args.consumers, shape, args.slots))):
+        seconds, totals = runner()
+        correct = all(total == expected for total in totals)
+        results[name] = (seconds, correct)
+        print(f"{name}: {seconds:.2f}秒  {args.frames / seconds:.1f} 帧/秒  "
+              f"{args.frames * args.consumers * frame_mb / seconds:.0f} MB/秒  {'✅' if correct else '❌ 校验和不一致'}")
+    
+    baseline, ring = results['pickle队列'][0], results['共享内存环'][0]
+    print(f"共享内存环加速: {baseline / ring:.2f}x")
+    sys.exit(0 if all(correct for _, correct in results.values()) else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+推理后端精度漂移检查：在样本帧上比较候选后端（默认ONNX Runtime）与PyTorch后端的输出
+
+用法:
+    python -m benchmarks.inference_drift [图像/视频 ...] [--candidate onnxruntime] [--int8] [--fixtures-dir DIR]
+
+比较项：人物检测数一致率、CLIP图像嵌入余弦相似度、CLIP logits 与内容丰富度评分的偏差。
+未指定输入时样本帧取自 benchmarks.fixtures 的合成视频。超出容差时以非零状态码退出。
+基准套件的 inference/onnx_int8_drift 项以默认容差自动执行int8检查（onnxruntime 不可用时跳过）。
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.inference_backends import get_inference_backend
+from app.services.image_analyzer import RICH_DESCRIPTIONS, POOR_DESCRIPTIONS, content_richness_from_logits
+from benchmarks.fixtures import FixtureCache, sample_frames
+
+FIXTURE_VIDEO = 'dynamic_720p'  # 未指定输入时取帧的合成视频（含烧录文字）
+FRAMES_PER_VIDEO = 8
+
+# 默认容差：内容丰富度评分最大偏差、图像嵌入最小余弦相似度、人物数最低一致率
+MAX_SCORE_DRIFT = 2.0
+MIN_COSINE = 0.99
+MIN_DETECTION_AGREEMENT = 0.9
+
+def load_frames(paths: list, per_video: int = FRAMES_PER_VIDEO) -> list:
+    """读取图像，或从视频中均匀采样帧"""
+    frames = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is not None:
+            frames.append(image)
+        else:
+            frames.extend(sample_frames(path, per_video))
+    return frames
+
+def fixture_frames(fixtures_dir: str = None) -> list:
+    """合成视频中均匀采样的帧；未指定缓存目录时用临时目录并在取帧后删除"""
+    directory = fixtures_dir or tempfile.mkdtemp(prefix="inference_drift_")
+    try:
+        return FixtureCache(directory).frames(FIXTURE_VIDEO, FRAMES_PER_VIDEO)
+    finally:
+        if not fixtures_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+def measure_drift(reference, candidate, frames: list) -> dict:
+    """逐帧比较两个推理后端的检测和CLIP输出"""
+    prompts = RICH_DESCRIPTIONS + POOR_DESCRIPTIONS
+    count_matches = 0
+    cosines, logit_drifts, score_drifts = [], [], []
+    for frame in frames:
+        ref_persons = sum(1 for d in reference.detect(frame) if d['class_id'] == 0)
+        cand_persons = sum(1 for d in candidate.detect(frame) if d['class_id'] == 0)
+        count_matches += int(ref_persons == cand_persons)
+        
+        ref_embed = reference.encode_images([frame])[0]
+        cand_embed = candidate.encode_images([frame])[0]
+        cosines.append(float(ref_embed @ cand_embed))
+        
+        ref_logits = reference.clip_logits(frame, prompts)
+        cand_logits = candidate.clip_logits(frame, prompts)
+        logit_drifts.append(float(np.max(np.abs(ref_logits - cand_logits))))
+        score_drifts.append(abs(content_richness_from_logits(ref_logits) - content_richness_from_logits(cand_logits)))
+    
+    return {
+        'frames': len(frames),
+        'detection_agreement': count_matches / len(frames),
+        'min_cosine': min(cosines),
+        'mean_cosine': float(np.mean(cosines)),
+        'max_logit_drift': max(logit_drifts),
+        'mean_logit_drift': float(np.mean(logit_drifts)),
+        'max_score_drift': max(score_drifts),
+        'mean_score_drift': float(np.mean(score_drifts))
+    }
+
+def drift_violations(drift: dict, max_score_drift: float = MAX_SCORE_DRIFT, min_cosine: float = MIN_COSINE,
+                     min_detection_agreement: float = MIN_DETECTION_AGREEMENT) -> list:
+    """超出容差的项（空列表表示通过）"""
+    violations = []
+    if drift['detection_agreement'] < min_detection_agreement:
+        violations.append(f"人物数一致率 {drift['detection_agreement']:.3f} < {min_detection_agreement}")
+    if drift['min_cosine'] < min_cosine:
+        violations.append(f"嵌入余弦相似度 {drift['min_cosine']:.5f} < {min_cosine}")
+    if drift['max_score_drift'] > max_score_drift:
+        violations.append(f"内容丰富度评分偏差 {drift['max_score_drift']:.3f} > {max_score_drift}")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="推理后端精度漂移检查")
+    parser.add_argument('inputs', nargs='*', help="图像或视频文件")
+    parser.add_argument('--candidate', default='onnxruntime')
+    parser.add_argument('--int8', action='store_true', help="候选后端使用int8量化模型")
+    parser.add_argument('--max-score-drift', type=float, default=MAX_SCORE_DRIFT, help="内容丰富度评分最大允许偏差")
+    parser.add_argument('--min-cosine', type=float, default=MIN_COSINE, help="图像嵌入最小余弦相似度")
+    parser.add_argument('--min-detection-agreement', type=float, default=MIN_DETECTION_AGREEMENT, help="人物数一致率下限")
+    parser.add_argument('--fixtures-dir', help="合成媒体缓存目录（指定时保留复用），默认临时目录")
+    args = parser.parse_args()
+    
+    frames = load_frames(args.inputs) if args.inputs else fixture_frames(args.fixtures_dir)
+    if not frames:
+        print("❌ 没有可用的样本帧")
+        sys.exit(1)
+    
+    reference = get_inference_backend('pytorch')
+    candidate_kwargs = {'quantize': args.int8} if args.candidate == 'onnxruntime' else {}
+    candidate = get_inference_backend(args.candidate, **candidate_kwargs)
+    drift = measure_drift(reference, candidate, frames)
+    print(f"样本帧数: {len(frames)}  候选后端: {candidate.name}{' (int8)' if args.int8 else ''}")
+    print(f"人物数一致率: {drift['detection_agreement']:.3f}")
+    print(f"嵌入余弦相似度: min={drift['min_cosine']:.5f} mean={drift['mean_cosine']:.5f}")
+    print(f"CLIP logits 最大偏差: max={drift['max_logit_drift']:.4f} mean={drift['mean_logit_drift']:.4f}")
+    print(f"内容丰富度评分偏差: max={drift['max_score_drift']:.3f} mean={drift['mean_score_drift']:.3f}")
+    
+    violations = drift_violations(drift, args.max_score_drift, args.min_cosine, args.min_detection_agreement)
+    passed = not violations
+    print("✅ 精度漂移在容差范围内" if passed else f"❌ 精度漂移超出容差: {'; '.join(violations)}")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
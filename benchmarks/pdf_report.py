@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+PDF报告基准：转录分段和帧数扩大后 generate_pdf_report 的耗时和峰值内存应近似线性增长
+（默认放大后约为2小时视频的转录分段数）
+
+用法:
+    python -m benchmarks.pdf_report [--frames 2000] [--segments 600] [--scale 4]
+"""
+
+import os
+import sys
+import gc
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.frame_results import FrameResultTable
+from app.utils.report_generator import ReportGenerator
+from benchmarks.result_storage import synthesize_result
+
+def measure(generator: ReportGenerator, result: dict, file_path: str) -> dict:
+    """生成耗时，以及生成过程中的峰值内存（不含已在内存中的结果）"""
+    start = time.perf_counter()
+    generator.generate_pdf_report(result, file_path)
+    seconds = time.perf_counter() - start
+    
+    gc.collect()
+    tracemalloc.start()
+    try:
+        generator.generate_pdf_report(result, file_path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak, 'file_bytes': os.path.getsize(file_path)}
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF报告基准")
+    parser.add_argument('--frames', type=int, default=2000, help="帧数")
+    parser.add_argument('--segments', type=int, default=600, help="转录分段数")
+    parser.add_argument('--scale', type=int, default=4, help="校验线性增长时帧数和分段数的放大倍数")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="pdf_report_")
+    try:
+        generator = ReportGenerator()
+        rows = []
+        for scale in (1, args.scale):
+            result = synthesize_result('benchmark', args.frames * scale, args.segments * scale)
+            result['audio_analysis']['success'] = True
+            result['frame_analyses'] = FrameResultTable(result['frame_analyses'])
+            row = measure(generator, result, os.path.join(work_dir, f"report_{scale}.pdf"))
+            rows.append((args.frames * scale, args.segments * scale, row))
+        
+        print(f"{'帧数':>8}{'分段数':>8}{'耗时':>10}{'峰值内存':>12}{'文件':>10}")
+        for frames, segments, row in rows:
+            print(f"{frames:>8}{segments:>8}{row['seconds']:>9.2f}s{row['peak_bytes'] / 2 ** 20:>10.1f}MB"
+                  f"{row['file_bytes'] / 2 ** 20:>8.1f}MB")
+        
+        # 放大 scale 倍后耗时和峰值内存的增长不超过 1.5 倍的线性增长
+        base, scaled = rows[0][2], rows[1][2]
+        time_ratio = scaled['seconds'] / max(base['seconds'], 1e-9)
+        memory_ratio = scaled['peak_bytes'] / max(base['peak_bytes'], 1)
+        linear_time = time_ratio <= args.scale * 1.5
+        linear_memory = memory_ratio <= args.scale * 1.5
+        print(f"{'✅' if linear_time else '❌'} 放大 {args.scale} 倍后耗时增长 {time_ratio:.1f} 倍")
+        print(f"{'✅' if linear_memory else '❌'} 放大 {args.scale} 倍后峰值内存增长 {memory_ratio:.1f} 倍")
+        sys.exit(0 if linear_time and linear_memory else 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+结果存储基准：比较完整JSON结果与列式存储（精简JSON + Parquet/npz）的磁盘占用、序列化耗时、
+还原耗时和典型请求的响应大小，并校验还原后的结果与原结果一致
+
+用法:
+    python -m benchmarks.result_storage [--frames 7200] [--segments 1500] [--formats npz parquet]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.services.result_storage import ColumnarResultStore, load_result_file
+from app.services.scoring import summarize_frames
+from app.utils.report_generator import ReportGenerator
+
+def synthesize_result(task_id: str, frames: int, segments: int, seed: int = 0) -> dict:
+    """生成结构与 run_video_analysis 输出一致的合成结果（含Whisper风格的分段 tokens）"""
+    rng = np.random.default_rng(seed)
+    frame_analyses = []
+    for i in range(frames):
+        clarity, lighting, content = (float(v) for v in rng.uniform(0, 100, 3))
+        watermark = bool(rng.random() < 0.2)
+        face_count = int(rng.integers(0, 3))
+        frame = {
+            'clarity_score': clarity,
+            'lighting_score': lighting,
+            'face_detected': face_count > 0,
+            'face_count': face_count,
+            'watermark_detected': watermark,
+            'watermark_text': "示例水印" if watermark else None,
+            'content_richness': content,
+            'overall_score': (clarity + lighting + content) / 3,
+            'issues': ["图像模糊"] if clarity < Config.CLARITY_THRESHOLD else [],
+            'metrics': {
+                'clarity': clarity,
+                'lighting': lighting,
+                'face': {'detected': face_count > 0, 'count': face_count},
+                'watermark': {'detected': watermark, 'text': "示例水印" if watermark else None},
+                'content': content
+            },
+            'timings': {name: float(rng.uniform(0.001, 0.05)) for name in ('clarity', 'lighting', 'face', 'watermark', 'content')},
+            'frame_number': i * 25,
+            'timestamp': float(i)
+        }
+        if i % 50 == 49:
+            # 部分帧按时间预算跳过内容分析
+            del frame['metrics']['content']
+            frame['skipped_analyzers'] = ['content']
+        frame_analyses.append(frame)
+    
+    duration = float(frames)
+    segment_list = []
+    for i in range(segments):
+        start = duration * i / max(segments, 1)
+        segment_list.append({
+            'id': i,
+            'seek': int(start * 100),
+            'start': round(start, 3),
+            'end': round(start + duration / max(segments, 1), 3),
+            'text': f"这是第{i}段合成的转录文本，用于测试结果存储",
+            'tokens': rng.integers(0, 51865, int(rng.integers(10, 40))).tolist(),
+            'temperature': 0.0,
+            'avg_logprob': float(rng.uniform(-1, 0)),
+            'compression_ratio': float(rng.uniform(1, 2)),
+            'no_speech_prob': float(rng.uniform(0, 0.3))
+        })
+    audio_analysis = {
+        'success': True,
+        'transcription': {'text': ''.join(s['text'] for s in segment_list), 'segments': segment_list,
+                          'language': 'zh', 'duration': duration},
+        'audio_quality': {'quality_score': 80.0}
+    }
+    return {
+        'video_id': task_id,
+        'video_name': 'synthetic.mp4',
+        'video_path': '/tmp/synthetic.mp4',
+        'duration': duration,
+        'total_frames': frames * 25,
+        'analyzed_frames': frames,
+        'analysis_time': 1.0,
+        'overall_quality_score': float(np.mean([f['overall_score'] for f in frame_analyses])),
+        'frame_analyses': frame_analyses,
+        'audio_analysis': audio_analysis,
+        'summary': summarize_frames(frame_analyses, audio_analysis)
+    }
+
+def directory_size(directory: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+def measure(result: dict, directory: str, fmt: str = None) -> dict:
+    """保存、完整还原、典型请求读取的耗时与大小；fmt 为 None 时为完整JSON"""
+    os.makedirs(directory)
+    result_file = os.path.join(directory, f"{result['video_id']}_result.json")
+    Config.COLUMNAR_RESULTS_ENABLED = fmt is not None
+    if fmt is not None:
+        Config.COLUMNAR_RESULT_FORMAT = fmt
+    
+    start = time.perf_counter()
+    ReportGenerator().save_json_result(result, result_file)
+    save_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    restored = load_result_file(result_file)
+    load_seconds = time.perf_counter() - start
+    
+    # 典型请求：一分钟时间范围内的两个指标
+    start = time.perf_counter()
+    if fmt is None:
+        frames = [{'timestamp': f['timestamp'], 'clarity_score': f['clarity_score']}
+                  for f in load_result_file(result_file)['frame_analyses'] if 60 <= f['timestamp'] <= 120]
+        range_payload = len(json.dumps(frames, ensure_ascii=False))
+    else:
+        with open(result_file, 'r', encoding='utf-8') as f:
+            slim = json.load(f)
+        values, _, _ = ColumnarResultStore(directory).read(slim, 'frames', ['timestamp', 'clarity_score'], 60, 120)
+        range_payload = len(json.dumps(values, ensure_ascii=False))
+    range_seconds = time.perf_counter() - start
+    
+    return {
+        'disk_bytes': directory_size(directory),
+        'result_json_bytes': os.path.getsize(result_file),
+        'save_seconds': save_seconds,
+        'load_seconds': load_seconds,
+        'range_seconds': range_seconds,
+        'range_payload_bytes': range_payload,
+        'identical': json.loads(json.dumps(restored)) == json.loads(json.dumps(result))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="结果存储基准")
+    parser.add_argument('--frames', type=int, default=7200, help="帧数（默认2小时每秒1帧）")
+    parser.add_argument('--segments', type=int, default=1500, help="转录分段数")
+    parser.add_argument('--formats', nargs='+', default=['npz', 'parquet'])
+    args = parser.parse_args()
+    
+    result = synthesize_result('benchmark', args.frames, args.segments)
+    work_dir = tempfile.mkdtemp(prefix="result_storage_")
+    try:
+        rows = [('json', measure(result, os.path.join(work_dir, 'json')))]
+        for fmt in args.formats:
+            if fmt == 'parquet':
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError:
+                    print("未安装 pyarrow，跳过 parquet")
+                    continue
+            rows.append((fmt, measure(result, os.path.join(work_dir, fmt), fmt)))
+        
+        print(f"帧数: {args.frames}  分段数: {args.segments}")
+        print(f"{'格式':<8}{'磁盘':>12}{'结果JSON':>12}{'保存':>10}{'完整还原':>10}{'区间查询':>10}{'区间响应':>10}  一致")
+        passed = True
+        for name, row in rows:
+            passed = passed and row['identical']
+            print(f"{name:<8}{row['disk_bytes'] / 1024:>10.0f}KB{row['result_json_bytes'] / 1024:>10.0f}KB"
+                  f"{row['save_seconds']:>9.3f}s{row['load_seconds']:>9.3f}s{row['range_seconds']:>9.3f}s"
+                  f"{row['range_payload_bytes'] / 1024:>8.1f}KB  {'✅' if row['identical'] else '❌'}")
+        sys.exit(0 if passed else 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
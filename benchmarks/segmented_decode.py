@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+分段并行解码校验与基准：比较 extract_frames_segmented、iter_frames_segmented 与串行解码的采样结果和耗时
+
+用法:
+    python -m benchmarks.segmented_decode [--video path] [--fixture long_360p] [--fixtures-dir DIR]
+                                          [--interval 1] [--workers 1 2 4]
+
+未指定 --video 时使用 benchmarks.fixtures 的合成视频（动态画面每帧不同，便于发现错帧）。
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.video_processor import VideoProcessor
+from app.services.frame_sources import OpenCVFrameSource
+from app.services.segmented_decoder import extract_frames_segmented, iter_frames_segmented
+from benchmarks.fixtures import VIDEO_FIXTURES, FixtureCache
+
+def main():
+    parser = argparse.ArgumentParser(description="分段并行解码校验与基准")
+    parser.add_argument('--video', help="视频路径，不指定时使用合成视频")
+    parser.add_argument('--fixture', default='long_360p', choices=list(VIDEO_FIXTURES), help="合成视频规格")
+    parser.add_argument('--fixtures-dir', help="合成媒体缓存目录（指定时保留复用），默认在临时目录中生成")
+    parser.add_argument('--interval', type=int, default=1, help="采样间隔（秒）")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="segmented_decode_")
+    try:
+        video_path = args.video or FixtureCache(args.fixtures_dir or work_dir).video(args.fixture)
+        
+        processor = VideoProcessor()
+        positions = processor.get_sample_positions(video_path, args.interval)
+        
+        # 串行路径：逐位置 seek 解码，保存 JPEG 编码结果作为参照
+        start = time.perf_counter()
+        reference = [(i, timestamp, cv2.imencode('.jpg', frame)[1].tobytes())
+                     for i, timestamp, frame in OpenCVFrameSource().iter_frames(video_path, args.interval)]
+        serial_seconds = time.perf_counter() - start
+        print(f"采样位置: {len(positions)}  串行: {serial_seconds:.2f}秒")
+        
+        passed = True
+        for workers in args.workers:
+            output_dir = os.path.join(work_dir, f"frames_{workers}")
+            start = time.perf_counter()
+            frames = extract_frames_segmented(video_path, positions, workers=workers, output_dir=output_dir)
+            seconds = time.perf_counter() - start
+            
+            identical = len(frames) == len(reference) and all(
+                i == ref_i and abs(timestamp - ref_timestamp) < 1e-9 and open(path, 'rb').read() == ref_bytes
+                for (i, timestamp, path), (ref_i, ref_timestamp, ref_bytes) in zip(frames, reference)
+            )
+            passed = passed and identical
+            print(f"{workers} 进程: {seconds:.2f}秒  (相对串行 {serial_seconds / seconds:.2f}x)  "
+                  f"{'✅ 与串行结果一致' if identical else '❌ 与串行结果不一致'}")
+            
+            # 流式分段解码（流水线模式），帧不按时间顺序到达
+            start = time.perf_counter()
+            streamed = sorted(((i, timestamp, cv2.imencode('.jpg', frame)[1].tobytes())
+                               for i, timestamp, frame in iter_frames_segmented(video_path, positions, workers=workers)),
+                              key=lambda item: item[1])
+            seconds = time.perf_counter() - start
+            
+            identical = len(streamed) == len(reference) and all(
+                i == ref_i and abs(timestamp - ref_timestamp) < 1e-9 and data == ref_bytes
+                for (i, timestamp, data), (ref_i, ref_timestamp, ref_bytes) in zip(streamed, reference)
+            )
+            passed = passed and identical
+            print(f"{workers} 进程（流式）: {seconds:.2f}秒  (相对串行 {serial_seconds / seconds:.2f}x)  "
+                  f"{'✅ 与串行结果一致' if identical else '❌ 与串行结果不一致'}")
+        
+        sys.exit(0 if passed else 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+基准测试套件：以确定性合成媒体（见 benchmarks.fixtures）测量帧提取、ImageAnalyzer 各分析方法、
+CLIP批量预处理和 int8 ONNX 推理（与参照实现的误差超出容差记为失败）、AudioProcessor 各阶段、报告生成和端到端 run_video_analysis 的耗时（及可选的峰值内存）。
+结果保存为JSON基线，compare 对比两次结果并标出超过阈值的性能回退
+
+用法:
+    python -m benchmarks.suite list
+    python -m benchmarks.suite run [--cases 'image/*' ...] [--repeat 3] [--memory] [--save NAME | --output PATH]
+                                   [--compare BASELINE] [--fixtures-dir DIR]
+    python -m benchmarks.suite compare BASELINE [CURRENT] [--threshold 0.2]
+
+BASELINE / CURRENT 为 benchmarks/baselines/ 下的基线名或JSON文件路径；compare 省略 CURRENT 时对比 latest。
+依赖（模型、ffmpeg、moviepy、pydub、语音识别后端）不可用的项记为跳过，不影响其他项
+"""
+
+import os
+import gc
+import sys
+import glob
+import json
+import time
+import shutil
+import asyncio
+import fnmatch
+import argparse
+import platform
+import importlib.util
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.services.audio_processor import AudioProcessor
+from app.services.frame_results import frame_result_container
+from app.services.image_analyzer import ImageAnalyzer
+from app.services.transcription_engine import VoiceActivityDetector, load_audio_16k
+from app.services.video_processor import VideoProcessor
+from app.utils.report_generator import ReportGenerator
+from benchmarks.fixtures import AUDIO_FIXTURES, VIDEO_FIXTURES, FixtureCache
+from benchmarks.result_storage import synthesize_result
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# 回退判定：中位耗时（峰值内存）增长超过阈值比例，且绝对增量超过噪声下限
+DEFAULT_TIME_THRESHOLD = 0.2
+DEFAULT_MEMORY_THRESHOLD = 0.2
+MIN_TIME_DELTA = 0.005  # 秒
+MIN_MEMORY_DELTA = 1024 * 1024  # 字节
+
+EXTRACT_INTERVAL = 1  # 帧提取基准的采样间隔（秒）
+IMAGE_SAMPLE_VIDEO = 'dynamic_1080p'  # 单帧分析基准取帧的视频（含烧录文字）
+IMAGE_SAMPLE_FRAMES = 12
+REPORT_FRAMES = 2000
+REPORT_SEGMENTS = 600
+E2E_VIDEO = 'dynamic_720p'
+E2E_TASK_ID = 'benchmark_e2e'
+
+# 仅依赖OpenCV的分析方法，模型加载失败时仍可测量
+MODEL_FREE_METHODS = ['analyze_clarity', 'analyze_lighting']
+IMAGE_METHODS = MODEL_FREE_METHODS + ['detect_faces', 'detect_watermark', 'analyze_content_richness', 'analyze_frame']
+
+class BenchmarkSkipped(Exception):
+    """基准项依赖不可用，跳过"""
+
+class Case:
+    """一个基准项：run() 为计时部分；check(value) 校验预热结果（依赖不可用时抛出 BenchmarkSkipped）；
+    cleanup(value) 清理每次运行的产物，不计时。items/unit 用于换算单位耗时"""
+    
+    def __init__(self, run: Callable[[], Any], items: int = 1, unit: str = '次',
+                 check: Callable[[Any], None] = None, cleanup: Callable[[Any], None] = None,
+                 overrides: Dict[str, Any] = None, info: Dict[str, Any] = None):
+        self.run = run
+        self.items = items
+        self.unit = unit
+        self.check = check
+        self.cleanup = cleanup or (lambda value: None)
+        self.overrides = overrides or {}
+        self.info = info or {}
+
+@contextmanager
+def config_override(values: Dict[str, Any]):
+    """临时修改 Config 属性，退出时恢复"""
+    previous = {name: getattr(Config, name) for name in values}
+    try:
+        for name, value in values.items():
+            setattr(Config, name, value)
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+class SuiteContext:
+    """各基准项共享的合成媒体、解码帧和服务实例（按需创建）"""
+    
+    def __init__(self, fixtures: FixtureCache, work_dir: str):
+        self.fixtures = fixtures
+        self.work_dir = work_dir
+        self._frames: Dict[Tuple[str, int], List[np.ndarray]] = {}
+        self._image_analyzer = None
+        self._image_analyzer_error: Optional[str] = None
+    
+    def frames(self, video: str, count: int = IMAGE_SAMPLE_FRAMES) -> List[np.ndarray]:
+        """合成视频中均匀取 count 帧（BGR数组）"""
+        key = (video, count)
+        if key not in self._frames:
+            self._frames[key] = self.fixtures.frames(video, count)
+        return self._frames[key]
+    
+    def image_analyzer(self) -> ImageAnalyzer:
+        """加载全部模型的 ImageAnalyzer；加载失败时（只尝试一次）跳过依赖模型的基准项"""
+        if self._image_analyzer is None and self._image_analyzer_error is None:
+            try:
+                self._image_analyzer = ImageAnalyzer()
+            except Exception as e:
+                self._image_analyzer_error = f"模型加载失败: {str(e)}"
+        if self._image_analyzer is None:
+            raise BenchmarkSkipped(self._image_analyzer_error)
+        return self._image_analyzer
+
+def extract_frames_case(ctx: SuiteContext, video: str) -> Case:
+    path = ctx.fixtures.video(video)
+    processor = VideoProcessor()
+    positions = processor.get_sample_positions(path, EXTRACT_INTERVAL)
+    return Case(
+        lambda: processor.extract_frames(path, EXTRACT_INTERVAL),
+        items=len(positions), unit='帧',
+        cleanup=lambda frames: processor.cleanup_temp_files([frame[2] for frame in frames]),
+        info={'codec': VIDEO_FIXTURES[video]['codec'],
+              'resolution': f"{VIDEO_FIXTURES[video]['width']}x{VIDEO_FIXTURES[video]['height']}"}
+    )
+
+def image_method_case(ctx: SuiteContext, method: str) -> Case:
+    if method in MODEL_FREE_METHODS:
+        try:
+            analyzer = ctx.image_analyzer()
+        except BenchmarkSkipped:
+            # 这两项只使用OpenCV，不需要加载模型
+            analyzer = ImageAnalyzer(['clarity', 'lighting'])
+    else:
+        analyzer = ctx.image_analyzer()
+    function = getattr(analyzer, method)
+    frames = ctx.frames(IMAGE_SAMPLE_VIDEO)
+    return Case(lambda: [function(frame) for frame in frames], items=len(frames), unit='帧')
+
+def clip_preprocess_case(ctx: SuiteContext) -> Case:
+    """ClipBatchPreprocessor 批量预处理，预热结果与 CLIPProcessor 比较，超出默认容差时记为失败"""
+    from benchmarks.clip_preprocess import preprocess_violations
+    from app.services.clip_preprocess import ClipBatchPreprocessor, validate_against_processor
+    
+    try:
+        from transformers import CLIPProcessor
+        processor = CLIPProcessor.from_pretrained(Config.CLIP_MODEL)
+    except Exception as e:
+        raise BenchmarkSkipped(f"CLIPProcessor 不可用: {str(e)}")
+    preprocessor = ClipBatchPreprocessor.from_processor(processor)
+    frames = ctx.frames(IMAGE_SAMPLE_VIDEO)
+    
+    def check(pixel_values):
+        violations = preprocess_violations(validate_against_processor(frames, processor, preprocessor))
+        if violations:
+            raise AssertionError(f"批量预处理与 CLIPProcessor 的误差超出容差: {'; '.join(violations)}")
+    
+    return Case(lambda: preprocessor(frames), items=len(frames), unit='帧', check=check)
+
+def onnx_int8_drift_case(ctx: SuiteContext) -> Case:
+    """int8 量化的 ONNX Runtime 后端相对 PyTorch 后端的精度漂移，超出默认容差时记为失败"""
+    from benchmarks.inference_drift import FRAMES_PER_VIDEO, drift_violations, measure_drift
+    from app.services.inference_backends import get_inference_backend
+    
+    if importlib.util.find_spec('onnxruntime') is None:
+        raise BenchmarkSkipped("onnxruntime 未安装")
+    try:
+        reference = get_inference_backend('pytorch')
+        candidate = get_inference_backend('onnxruntime', quantize=True)
+    except Exception as e:
+        raise BenchmarkSkipped(f"推理后端加载失败: {str(e)}")
+    frames = ctx.frames(IMAGE_SAMPLE_VIDEO, FRAMES_PER_VIDEO)
+    
+    def check(drift):
+        violations = drift_violations(drift)
+        if violations:
+            raise AssertionError(f"int8 精度漂移超出容差: {'; '.join(violations)}")
+    
+    return Case(lambda: measure_drift(reference, candidate, frames), items=len(frames), unit='帧', check=check)
+
+def extract_audio_case(ctx: SuiteContext) -> Case:
+    path = ctx.fixtures.video_with_audio(E2E_VIDEO)
+    if path is None:
+        raise BenchmarkSkipped("ffmpeg不可用，无法生成带音轨的视频")
+    processor = AudioProcessor()
+    
+    def check(audio_path):
+        if audio_path is None:
+            raise BenchmarkSkipped("音频提取失败（moviepy不可用？）")
+    
+    def cleanup(audio_path):
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+    
+    return Case(lambda: processor.extract_audio_from_video(path), items=VIDEO_FIXTURES[E2E_VIDEO]['duration'],
+                unit='秒音频', check=check, cleanup=cleanup)
+
+def vad_case(ctx: SuiteContext, audio: str) -> Case:
+    samples = load_audio_16k(ctx.fixtures.audio(audio))
+    detector = VoiceActivityDetector()
+    return Case(lambda: detector.detect(samples), items=AUDIO_FIXTURES[audio]['duration'], unit='秒音频')
+
+def audio_quality_case(ctx: SuiteContext, audio: str) -> Case:
+    path = ctx.fixtures.audio(audio)
+    processor = AudioProcessor()
+    
+    def check(result):
+        if not result.get('duration'):
+            raise BenchmarkSkipped(f"音频质量分析不可用: {', '.join(result.get('issues', []))}")
+    
+    return Case(lambda: processor.analyze_audio_quality(path), items=AUDIO_FIXTURES[audio]['duration'],
+                unit='秒音频', check=check)
+
+def transcribe_case(ctx: SuiteContext, audio: str) -> Case:
+    path = ctx.fixtures.audio(audio)
+    processor = AudioProcessor()
+    
+    def check(result):
+        if result.get('error'):
+            raise BenchmarkSkipped(f"语音识别不可用: {result['error']}")
+    
+    return Case(lambda: processor.transcribe_audio_whisper(path), items=AUDIO_FIXTURES[audio]['duration'],
+                unit='秒音频', check=check, info={'backend': Config.TRANSCRIPTION_BACKEND, 'model': Config.WHISPER_MODEL})
+
+def report_case(ctx: SuiteContext, kind: str) -> Case:
+    result = synthesize_result('benchmark', REPORT_FRAMES, REPORT_SEGMENTS)
+    frame_analyses = frame_result_container()
+    frame_analyses.extend(result['frame_analyses'])
+    result['frame_analyses'] = frame_analyses
+    
+    generator = ReportGenerator()
+    write, ext = {
+        'json': (generator.save_json_result, '_result.json'),
+        'excel': (generator.generate_excel_report, '_report.xlsx'),
+        'pdf': (generator.generate_pdf_report, '_report.pdf')
+    }[kind]
+    file_path = os.path.join(ctx.work_dir, f"benchmark{ext}")
+    return Case(lambda: write(result, file_path), items=REPORT_FRAMES, unit='帧',
+                info={'segments': REPORT_SEGMENTS})
+
+def run_video_analysis_case(ctx: SuiteContext, video: str) -> Case:
+    # 先确认模型可加载，run_video_analysis 自身的加载失败会被记为任务失败
+    ctx.image_analyzer()
+    from app.api import routes
+    from app.models.schemas import AnalysisProgress, VideoAnalysisRequest
+    
+    path = ctx.fixtures.video_with_audio(video)
+    has_audio = path is not None
+    path = path or ctx.fixtures.video(video)
+    
+    def run():
+        routes.analysis_tasks[E2E_TASK_ID] = AnalysisProgress(
+            task_id=E2E_TASK_ID,
+            status="pending",
+            progress=0.0,
+            current_frame=0,
+            total_frames=0,
+            message="基准测试"
+        )
+        asyncio.run(routes.run_video_analysis(E2E_TASK_ID, VideoAnalysisRequest(video_file=path)))
+        task = routes.analysis_tasks.pop(E2E_TASK_ID)
+        if task.status != "completed":
+            raise RuntimeError(task.message)
+    
+    def cleanup(value):
+        for file_path in glob.glob(os.path.join("outputs", f"{E2E_TASK_ID}_*")):
+            os.remove(file_path)
+    
+    return Case(
+        run,
+        items=int(VIDEO_FIXTURES[video]['duration'] // EXTRACT_INTERVAL), unit='帧',
+        cleanup=cleanup,
+        # 不写入结果索引、特征库和检查点，避免基准结果混入正式数据
+        overrides={'FRAME_EXTRACTION_INTERVAL': EXTRACT_INTERVAL, 'RESULTS_INDEX_ENABLED': False,
+                   'FEATURE_STORE_ENABLED': False, 'CHECKPOINT_ENABLED': False},
+        info={'audio': has_audio}
+    )
+
+# 基准项名 -> 构造 Case 的函数（参数为 SuiteContext）
+BENCHMARKS: Dict[str, Callable[[SuiteContext], Case]] = {}
+for _video in VIDEO_FIXTURES:
+    BENCHMARKS[f'video/extract_frames/{_video}'] = partial(extract_frames_case, video=_video)
+for _method in IMAGE_METHODS:
+    BENCHMARKS[f'image/{_method}'] = partial(image_method_case, method=_method)
+BENCHMARKS['inference/clip_preprocess'] = clip_preprocess_case
+BENCHMARKS['inference/onnx_int8_drift'] = onnx_int8_drift_case
+BENCHMARKS['audio/extract_audio_from_video'] = extract_audio_case
+for _audio in AUDIO_FIXTURES:
+    BENCHMARKS[f'audio/vad/{_audio}'] = partial(vad_case, audio=_audio)
+    BENCHMARKS[f'audio/analyze_audio_quality/{_audio}'] = partial(audio_quality_case, audio=_audio)
+BENCHMARKS['audio/transcribe/speech'] = partial(transcribe_case, audio='speech')
+for _kind in ('json', 'excel', 'pdf'):
+    BENCHMARKS[f'report/{_kind}'] = partial(report_case, kind=_kind)
+BENCHMARKS[f'e2e/run_video_analysis/{E2E_VIDEO}'] = partial(run_video_analysis_case, video=E2E_VIDEO)
+
+def select_benchmarks(patterns: Optional[List[str]]) -> List[str]:
+    """按 fnmatch 模式选择基准项（保持注册顺序）"""
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+def measure(case: Case, repeat: int, memory: bool) -> Dict:
+    """预热一次（模型懒加载、文件缓存，同时校验依赖），再计时 repeat 次；memory 时另跑一次测峰值内存"""
+    value = case.run()
+    if case.check:
+        case.check(value)
+    case.cleanup(value)
+    
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = case.run()
+        runs.append(time.perf_counter() - start)
+        case.cleanup(value)
+    
+    result = {
+        'status': 'ok',
+        'median': statistics.median(runs),
+        'min': min(runs),
+        'mean': statistics.mean(runs),
+        'stdev': statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        'runs': runs,
+        'items': case.items,
+        'unit': case.unit,
+        **case.info
+    }
+    
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            value = case.run()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        case.cleanup(value)
+    return result
+
+def run_benchmark(name: str, ctx: SuiteContext, repeat: int, memory: bool) -> Dict:
+    try:
+        case = BENCHMARKS[name](ctx)
+        with config_override(case.overrides):
+            return measure(case, repeat, memory)
+    except BenchmarkSkipped as e:
+        return {'status': 'skipped', 'reason': str(e)}
+    except Exception as e:
+        return {'status': 'error', 'reason': f"{type(e).__name__}: {str(e)}"}
+
+def format_result(name: str, result: Dict) -> str:
+    if result['status'] == 'skipped':
+        return f"⚠️  {name}  跳过: {result['reason']}"
+    if result['status'] == 'error':
+        return f"❌ {name}  失败: {result['reason']}"
+    line = (f"✅ {name}  中位 {result['median'] * 1000:.1f}ms  "
+            f"(每{result['unit']} {result['median'] / max(result['items'], 1) * 1000:.2f}ms, ±{result['stdev'] * 1000:.1f}ms)")
+    if 'peak_bytes' in result:
+        line += f"  峰值内存 {result['peak_bytes'] / 2 ** 20:.1f}MB"
+    return line
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(BASELINE_DIR)).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment() -> Dict:
+    """影响耗时的运行环境；compare 时环境不同会给出提示"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'device': Config.DEVICE,
+        'inference_backend': Config.INFERENCE_BACKEND,
+        'transcription_backend': Config.TRANSCRIPTION_BACKEND,
+        'commit': git_commit()
+    }
+
+def baseline_path(reference: str) -> str:
+    """基线名或文件路径 -> 文件路径"""
+    if os.path.exists(reference) or reference.endswith('.json'):
+        return reference
+    return os.path.join(BASELINE_DIR, f"{reference}.json")
+
+def load_baseline(reference: str) -> Dict:
+    with open(baseline_path(reference), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(report: Dict, file_path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_TIME_THRESHOLD,
+            memory_threshold: float = DEFAULT_MEMORY_THRESHOLD) -> int:
+    """打印两次结果的对比，返回回退项数（基线中成功、当前失败的项也计为回退）"""
+    for key, value in baseline.get('environment', {}).items():
+        if key != 'commit' and current.get('environment', {}).get(key) != value:
+            print(f"⚠️  运行环境不同 {key}: {value} -> {current['environment'].get(key)}")
+    
+    regressions = 0
+    base_results, current_results = baseline['results'], current['results']
+    print(f"{'基准项':<44}{'基线':>10}{'当前':>10}{'变化':>9}")
+    for name in list(base_results) + [name for name in current_results if name not in base_results]:
+        base, cur = base_results.get(name), current_results.get(name)
+        if base is None or cur is None:
+            print(f"{name:<44}{'仅当前' if base is None else '仅基线':>29}")
+            continue
+        if base['status'] != 'ok' or cur['status'] != 'ok':
+            failed = base['status'] == 'ok' and cur['status'] == 'error'
+            regressions += failed
+            print(f"{name:<44}{base['status']:>10}{cur['status']:>10}{'':>9}  {'❌' if failed else '⚠️ '}")
+            continue
+        
+        ratio = cur['median'] / max(base['median'], 1e-12)
+        slower = ratio > 1 + threshold and cur['median'] - base['median'] > MIN_TIME_DELTA
+        line = (f"{name:<44}{base['median'] * 1000:>8.1f}ms{cur['median'] * 1000:>8.1f}ms"
+                f"{(ratio - 1) * 100:>+8.1f}%")
+        if 'peak_bytes' in base and 'peak_bytes' in cur:
+            memory_ratio = cur['peak_bytes'] / max(base['peak_bytes'], 1)
+            larger = (memory_ratio > 1 + memory_threshold
+                      and cur['peak_bytes'] - base['peak_bytes'] > MIN_MEMORY_DELTA)
+            line += f"  内存{(memory_ratio - 1) * 100:+.1f}%"
+        else:
+            larger = False
+        regressions += slower or larger
+        print(f"{line}  {'❌' if slower or larger else '✅'}")
+    
+    print(f"{'❌' if regressions else '✅'} {regressions} 项性能回退"
+          f"（耗时阈值 {threshold * 100:.0f}%，内存阈值 {memory_threshold * 100:.0f}%）")
+    return regressions
+
+def run_command(args) -> int:
+    names = select_benchmarks(args.cases)
+    if not names:
+        print(f"❌ 没有匹配的基准项: {' '.join(args.cases)}")
+        return 1
+    
+    fixtures_dir = args.fixtures_dir or tempfile.mkdtemp(prefix="benchmark_fixtures_")
+    work_dir = tempfile.mkdtemp(prefix="benchmark_suite_")
+    try:
+        ctx = SuiteContext(FixtureCache(fixtures_dir, args.seed), work_dir)
+        results = {}
+        for name in names:
+            results[name] = run_benchmark(name, ctx, args.repeat, args.memory)
+            print(format_result(name, results[name]), flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if not args.fixtures_dir:
+            shutil.rmtree(fixtures_dir, ignore_errors=True)
+    
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results
+    }
+    output = args.output or baseline_path(args.save)
+    save_baseline(report, output)
+    print(f"结果已保存: {output}")
+    
+    errors = sum(result['status'] == 'error' for result in results.values())
+    regressions = 0
+    if args.compare:
+        print()
+        regressions = compare(load_baseline(args.compare), report, args.threshold, args.memory_threshold)
+    return 1 if errors or regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="基准测试套件")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    commands.add_parser('list', help="列出基准项")
+    
+    run_parser = commands.add_parser('run', help="运行基准并保存结果")
+    run_parser.add_argument('--cases', nargs='*', help="基准项名或 fnmatch 模式，如 'image/*'，默认全部")
+    run_parser.add_argument('--repeat', type=int, default=3, help="每项计时次数（另有一次预热）")
+    run_parser.add_argument('--memory', action='store_true', help="另跑一次测量峰值内存（tracemalloc）")
+    run_parser.add_argument('--seed', type=int, default=0, help="合成媒体的随机种子")
+    run_parser.add_argument('--fixtures-dir', help="合成媒体缓存目录（指定时保留复用），默认临时目录")
+    run_parser.add_argument('--save', default='latest', help="保存为 benchmarks/baselines/<名称>.json")
+    run_parser.add_argument('--output', help="结果文件路径（优先于 --save）")
+    run_parser.add_argument('--compare', help="运行后与该基线对比")
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_TIME_THRESHOLD, help="耗时回退阈值（比例）")
+    run_parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD, help="峰值内存回退阈值（比例）")
+    
+    compare_parser = commands.add_parser('compare', help="对比两次结果")
+    compare_parser.add_argument('baseline', help="基线名或文件路径")
+    compare_parser.add_argument('current', nargs='?', default='latest', help="当前结果名或文件路径")
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_TIME_THRESHOLD, help="耗时回退阈值（比例）")
+    compare_parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD, help="峰值内存回退阈值（比例）")
+    args = parser.parse_args()
+    
+    if args.command == 'list':
+        for name in BENCHMARKS:
+            print(name)
+        sys.exit(0)
+    if args.command == 'run':
+        sys.exit(run_command(args))
+    regressions = compare(load_baseline(args.baseline), load_baseline(args.current), args.threshold, args.memory_threshold)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
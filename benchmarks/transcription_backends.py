@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+语音识别后端基准测试：比较各后端的实时率（RTF）与峰值内存
+
+用法:
+    python -m benchmarks.transcription_backends [音频文件 ...] [--backends whisper faster-whisper] [--fixtures-dir DIR]
+
+未指定音频文件时使用 uploads/ 下的音频/视频，仍没有则使用 benchmarks.fixtures 的合成类语音音频。
+每个后端在独立子进程中运行，以便单独统计峰值内存。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import difflib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import AUDIO_SAMPLE_RATE, FixtureCache
+
+def _peak_rss_mb() -> float:
+    """当前进程峰值常驻内存（MB）"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def _run_backend(backend_name: str, audio_path: str) -> dict:
+    """子进程中加载后端并转录"""
+    from app.services.transcription_backends import get_transcription_backend
+    from app.services.transcription_engine import load_audio_16k
+    
+    audio = load_audio_16k(audio_path)
+    audio_seconds = len(audio) / AUDIO_SAMPLE_RATE
+    
+    backend = get_transcription_backend(backend_name)
+    
+    start = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    result = backend.transcribe(audio)
+    transcribe_seconds = time.perf_counter() - start
+    
+    return {
+        'backend': backend_name,
+        'audio': os.path.basename(audio_path),
+        'audio_seconds': round(audio_seconds, 2),
+        'load_seconds': round(load_seconds, 3),
+        'transcribe_seconds': round(transcribe_seconds, 3),
+        'rtf': round(transcribe_seconds / audio_seconds, 4) if audio_seconds else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'language': result['language'],
+        'segments': len(result['segments']),
+        'text': result['text']
+    }
+
+def find_audio_files() -> list:
+    """查找可用于测试的音频/视频文件"""
+    files = []
+    if os.path.isdir('uploads'):
+        for name in sorted(os.listdir('uploads')):
+            if name.lower().endswith(('.wav', '.mp3', '.flac', '.mp4', '.mkv', '.mov', '.avi')):
+                files.append(os.path.join('uploads', name))
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description="语音识别后端基准测试")
+    parser.add_argument('audio', nargs='*', help="音频或视频文件")
+    parser.add_argument('--backends', nargs='+', default=['whisper', 'faster-whisper'])
+    parser.add_argument('--output', help="将结果写入JSON文件")
+    parser.add_argument('--fixtures-dir', help="合成媒体缓存目录，默认系统临时目录下的 benchmark_fixtures")
+    args = parser.parse_args()
+    
+    audio_files = args.audio or find_audio_files()
+    if not audio_files:
+        fixtures_dir = args.fixtures_dir or os.path.join(tempfile.gettempdir(), 'benchmark_fixtures')
+        synthetic_path = FixtureCache(fixtures_dir).audio('speech')
+        audio_files = [synthetic_path]
+        print(f"未找到测试音频，使用合成音频: {synthetic_path}")
+    
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for audio_path in audio_files:
+        for backend_name in args.backends:
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    results.append(executor.submit(_run_backend, backend_name, audio_path).result())
+            except Exception as e:
+                print(f"❌ {backend_name} @ {audio_path}: {str(e)}")
+    
+    print(f"\n{'后端':<16}{'音频':<32}{'时长(s)':>9}{'加载(s)':>9}{'转录(s)':>9}{'RTF':>8}{'峰值内存(MB)':>14}")
+    for r in results:
+        print(f"{r['backend']:<16}{r['audio'][:30]:<32}{r['audio_seconds']:>9}{r['load_seconds']:>9}"
+              f"{r['transcribe_seconds']:>9}{r['rtf']:>8}{r['peak_rss_mb']:>14}")
+    
+    # 同一音频上各后端转录文本的一致性
+    by_audio = {}
+    for r in results:
+        by_audio.setdefault(r['audio'], []).append(r)
+    for audio_name, runs in by_audio.items():
+        for other in runs[1:]:
+            similarity = difflib.SequenceMatcher(None, runs[0]['text'], other['text']).ratio()
+            print(f"文本一致性 {audio_name}: {runs[0]['backend']} vs {other['backend']} = {similarity:.3f}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
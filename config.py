@@ -29,6 +29,139 @@ class Config:
     YOLO_MODEL = "yolov8n.pt"
     CLIP_MODEL = "openai/clip-vit-base-patch32"
     OCR_LANGUAGES = ['ch_sim', 'en']
+    WHISPER_MODEL = "base"
+    
+    # 推理后端配置
+    INFERENCE_BACKEND = "pytorch"  # pytorch 或 onnxruntime
+    ONNX_QUANTIZE_INT8 = False  # 对导出的ONNX模型做动态int8量化
+    YOLO_IMAGE_SIZE = 640
+    YOLO_CONF_THRESHOLD = 0.25
+    YOLO_IOU_THRESHOLD = 0.7
+    CLIP_FAST_PREPROCESS = True  # 使用cv2/NumPy批量预处理代替逐图 CLIPProcessor
+    
+    # 帧分析并行配置
+    PARALLEL_FRAME_ANALYSIS = True  # analyze_frame 内各项分析并发执行
+    FRAME_ANALYSIS_THREADS = 0  # 分析线程池大小，0 表示自动（分析项数与CPU核数取小）
+    
+    # 分析流水线配置（解码 -> 预处理 -> 批量推理 -> 聚合）
+    PIPELINE_ENABLED = True
+    PIPELINE_QUEUE_SIZE = 8  # 阶段间有界队列容量
+    PIPELINE_BATCH_SIZE = 8  # 推理阶段每批最大帧数
+    
+    # 多进程帧分析配置（解码帧经共享内存环形缓冲区传给分析进程）
+    MULTIPROCESS_ANALYSIS = False  # 启用后优先于流水线模式
+    FRAME_RING_SLOTS = 16  # 共享内存帧槽位数
+    FRAME_RING_WAIT_TIMEOUT = 300  # 等待空闲槽位的最长秒数
+    ANALYZER_PROCESS_GROUPS = [['clarity', 'lighting', 'face', 'content'], ['watermark']]  # 每组一个分析进程
+    
+    # 分段并行解码配置（长视频按关键帧切段，多进程各自解码一段，
+    # 用于 extract_frames 和 iter_frames（流水线模式），多进程分析模式仍串行解码到共享内存环）
+    SEGMENTED_DECODE_ENABLED = True
+    SEGMENTED_DECODE_MIN_DURATION = 600  # 视频时长（秒）不小于该值时才分段
+    SEGMENTED_DECODE_WORKERS = 0  # 分段数（进程数），0 表示CPU核数
+    
+    # 帧来源配置（opencv：VideoCapture 全分辨率；ffmpeg：子进程解码，支持仅关键帧和解码端缩放）
+    FFMPEG_BINARY = "ffmpeg"
+    FFMPEG_THREADS = 0  # ffmpeg解码线程数，0 表示自动
+    FRAME_SOURCE_TIERS = {
+        'full': {'backend': 'opencv'},
+        # 各档均为原始分辨率：清晰度（拉普拉斯方差）在缩小后的帧上偏高，会掩盖模糊，
+        # 在清晰度改为全分辨率计算或阈值按分辨率归一化之前不要设置 scale_width
+        'quick': {'backend': 'ffmpeg', 'mode': 'keyframe'},
+        'custom': {'backend': 'ffmpeg', 'mode': 'interval'}
+    }
+    
+    # 镜头自适应采样配置（顺序解码时检测镜头切换，每个镜头取一帧代表帧）
+    FRAME_SAMPLING = "interval"  # interval（固定间隔）或 scene（按镜头自适应采样）
+    SCENE_DETECT_FPS = 4  # 镜头检测每秒分析的帧数
+    SCENE_CHANGE_THRESHOLD = 0.35  # 直方图/SSIM差异分数阈值
+    SCENE_MIN_GAP = 1.0  # 相邻采样最小间隔（秒）
+    SCENE_MAX_GAP = 30.0  # 长镜头最大采样间隔（秒）
+    SCENE_FRAME_BUDGET = 300  # 单个视频最多采样帧数
+    
+    # 采样规划配置（请求指定帧数预算或完成时限时生效）
+    PLANNER_RESERVED_FRACTION = 0.25  # 时限中预留给音频分析和报告生成的比例
+    PLANNER_MIN_FRAMES = 10  # 去掉分析项前至少保证的帧数
+    PLANNER_DROP_ORDER = ['watermark', 'face', 'content']  # 时间不足时依次跳过的分析项
+    PLANNER_CALIBRATION_FRAMES = 2  # 无历史耗时数据时现场标定的帧数
+    # 无法现场标定（多进程分析模式下主进程不加载模型）时使用的单帧耗时估计（秒，CPU），任务完成后由实测耗时更新
+    PLANNER_DEFAULT_COSTS = {'decode': 0.01, 'clarity': 0.005, 'lighting': 0.003, 'face': 0.08,
+                             'watermark': 0.4, 'content': 0.1}
+    
+    # 渐进分析配置（稀疏首轮 + 逐轮二分细化可疑区间）
+    PROGRESSIVE_INITIAL_INTERVAL = 30  # 首轮采样间隔（秒）
+    PROGRESSIVE_MIN_INTERVAL = 1  # 细化后相邻采样的最小间隔（秒）
+    PROGRESSIVE_CHANGE_THRESHOLD = 15  # 清晰度/光照评分差值超过该值的区间需要细化
+    PROGRESSIVE_MAX_LEVELS = 6  # 最多细化轮数
+    PROGRESSIVE_REFINE_ISSUES = ["图像模糊", "光照问题"]  # 出现这些问题的区间需要细化
+    
+    # 质量判定模式配置（随机分层采样，置信区间越过阈值即停止）
+    VERDICT_CONFIDENCE = 0.95  # 置信水平
+    VERDICT_MIN_SAMPLES = 8  # 判定前至少分析的帧数
+    VERDICT_MAX_SAMPLES = 200  # 最多分析的帧数
+    VERDICT_STRATA = 16  # 时间分层数
+    VERDICT_MIN_STD = 1.0  # 置信区间使用的评分标准差下限（分），避免评分相同时区间宽度为0而过早判定
+    
+    # 检查点配置（逐帧追加写，任务中断后可恢复）
+    CHECKPOINT_ENABLED = True
+    CHECKPOINT_DIR = "checkpoints"
+    CHECKPOINT_FSYNC_EVERY = 16  # 每追加多少条记录落盘一次
+    
+    # 帧特征库配置（CLIP嵌入与YOLO检测结果，内存映射分片）
+    FEATURE_STORE_ENABLED = True
+    FEATURE_STORE_DIR = "features"
+    FEATURE_SHARD_ROWS = 4096  # 每个分片的帧数
+    FEATURE_MAX_DETECTIONS = 32  # 每帧最多保存的检测框数
+    
+    # 跨视频相似检索配置
+    SIMILARITY_IVF_THRESHOLD = 20000  # 视频数达到该值后改用IVF近似检索
+    SIMILARITY_IVF_NPROBE = 8  # IVF检索的簇数
+    PHASH_MAX_DISTANCE = 10  # 感知哈希汉明距离不超过该值视为相同画面
+    DUPLICATE_SIMILARITY = 0.95  # 签名余弦相似度达到该值视为近重复候选
+    DUPLICATE_PHASH_MATCH = 0.5  # 近重复还需至少该比例的帧能匹配到相同画面
+    
+    # 结果索引配置（summary 与逐帧指标写入 SQLite，供过滤/排序查询）
+    RESULTS_INDEX_ENABLED = True
+    RESULTS_INDEX_PATH = os.path.join("outputs", "results_index.db")
+    RESULTS_QUERY_MAX_LIMIT = 1000  # 单次查询最多返回的行数
+    
+    # 列式结果存储配置（逐帧结果和转录分段不写入结果JSON）
+    COLUMNAR_RESULTS_ENABLED = True
+    COLUMNAR_RESULT_FORMAT = "parquet"  # parquet（需要 pyarrow）或 npz
+    
+    # 结果查询响应配置（ETag 协商缓存与压缩）
+    RESPONSE_COMPRESS_MIN_BYTES = 1024  # 小于该大小的响应不压缩
+    RESPONSE_GZIP_LEVEL = 6
+    RESPONSE_BROTLI_QUALITY = 5  # br 压缩需要 brotli
+    RESPONSE_CACHE_ENTRIES = 64  # 缓存的已压缩响应数
+    
+    # 逐帧结果在内存中以列式数组保存（FrameResultTable），而不是字典列表
+    COMPACT_FRAME_RESULTS = True
+    
+    # PDF报告配置
+    PDF_TABLE_CHUNK_ROWS = 50  # 长表格（转录分段等）每块的行数，各块重复表头
+    PDF_CHART_MAX_POINTS = 500  # 评分时间线每条曲线最多绘制的点数，帧数更多时分桶取均值
+    
+    # 汇总统计配置
+    SUMMARY_PERCENTILES = [5, 50, 95]  # summary.statistics 中各指标的分位数（百分位）
+    SUMMARY_EXACT_SAMPLES = 256  # 帧数不超过该值时分位数精确计算，超过后用 P² 流式估计
+    
+    # 语音识别配置
+    TRANSCRIPTION_BACKEND = "whisper"  # whisper（openai-whisper）或 faster-whisper（CTranslate2）
+    FASTER_WHISPER_COMPUTE_TYPE = "int8"  # faster-whisper 在CPU上的计算精度
+    WHISPER_LANGUAGE = None  # None 表示从首个语音块自动检测
+    TRANSCRIPTION_VAD_ENABLED = False  # 先做语音活动检测，只转录语音区间（会丢弃非语音内容、按首段语音检测语言，并在结果中增加 speech_spans）
+    TRANSCRIPTION_CHUNK_SECONDS = 30  # 语音区间打包的块长（秒）
+    TRANSCRIPTION_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # 并行转录进程数
+    
+    # 语音活动检测（VAD）配置
+    VAD_FRAME_MS = 30
+    VAD_AGGRESSIVENESS = 2  # webrtcvad 灵敏度 0-3
+    VAD_ENERGY_MARGIN_DB = 12  # 能量检测：高于噪声底多少dB视为语音
+    VAD_MIN_ENERGY_DB = -50  # 能量检测：语音最低能量
+    VAD_MIN_SPEECH_MS = 250
+    VAD_MIN_SILENCE_MS = 500
+    VAD_PADDING_MS = 200
     
     # 分析配置
     ANALYSIS_WEIGHTS = {
@@ -89,7 +222,9 @@ class Config:
         return {
             'yolo_model': cls.YOLO_MODEL,
             'clip_model': cls.CLIP_MODEL,
-            'ocr_languages': cls.OCR_LANGUAGES
+            'ocr_languages': cls.OCR_LANGUAGES,
+            'whisper_model': cls.WHISPER_MODEL,
+            'inference_backend': cls.INFERENCE_BACKEND
         }
     
     @classmethod
@@ -45,6 +45,12 @@ async def health_check():
     """健康检查"""
     return {"status": "healthy", "message": "视频质量分析器运行正常"}
 
+@app.on_event("shutdown")
+def shutdown_worker_pools():
+    """关闭长期复用的转录进程池"""
+    from app.services.transcription_engine import shutdown_transcription_pool
+    shutdown_transcription_pool()
+
 if __name__ == "__main__":
     # 创建必要的目录
     os.makedirs("uploads", exist_ok=True)